@@ -0,0 +1,117 @@
+"""
+Compare WebSocket frame encodings for session traffic.
+
+Run with: python benchmark_framing.py
+
+Prints bytes on the wire and encode/decode time per frame for JSON,
+MessagePack (as sent by chat/framing.py) and, if installed, CBOR.
+"""
+import random
+import timeit
+
+from chat import framing
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+
+def whiteboard_path(points=250):
+    """A freehand stroke as Fabric.js serializes it."""
+    rng = random.Random(1)
+    x, y = 120.5, 80.25
+    path = [['M', x, y]]
+    for _ in range(points):
+        x2, y2 = x + rng.uniform(-3, 3), y + rng.uniform(-3, 3)
+        path.append(['Q', round(x, 3), round(y, 3), round(x2, 3), round(y2, 3)])
+        x, y = x2, y2
+    path.append(['L', round(x, 3), round(y, 3)])
+    return {
+        'type': 'whiteboard',
+        'seq': 1042,
+        'data': {'type': 'add', 'object': {
+            'type': 'path', 'version': '5.3.0', 'id': 'obj_1697461234567_k3j9x',
+            'originX': 'left', 'originY': 'top', 'left': 95.5, 'top': 60.25,
+            'width': 187.34, 'height': 143.92, 'fill': None, 'stroke': '#000000',
+            'strokeWidth': 3, 'strokeLineCap': 'round', 'strokeLineJoin': 'round',
+            'scaleX': 1, 'scaleY': 1, 'angle': 0, 'opacity': 1, 'visible': True,
+            'path': path,
+        }},
+    }
+
+
+def whiteboard_modify():
+    return {
+        'type': 'whiteboard',
+        'seq': 1043,
+        'data': {'type': 'modify', 'object': {
+            'type': 'rect', 'id': 'obj_1697461234999_a81kd', 'left': 311.2,
+            'top': 140.75, 'width': 120, 'height': 80, 'fill': 'transparent',
+            'stroke': '#1976d2', 'strokeWidth': 3, 'scaleX': 1.25, 'scaleY': 0.9,
+            'angle': 15,
+        }},
+    }
+
+
+def code_delta():
+    return {
+        'type': 'code_delta',
+        'version': 318,
+        'language': 'python',
+        'ops': [{'offset': 1204, 'length': 0, 'text': 'r'}],
+    }
+
+
+def code_resync(lines=150):
+    text = '\n'.join(f'    value_{i} = compute(value_{i - 1}, step={i})  # line {i}' for i in range(lines))
+    return {'type': 'code_resync', 'code': text, 'version': 318, 'language': 'python'}
+
+
+def batch_frame():
+    return {'type': 'batch', 'events': [whiteboard_modify() for _ in range(6)] + [code_delta() for _ in range(4)]}
+
+
+def codecs():
+    """(encode, decode) per encoding; JSON and MessagePack go through chat/framing.py itself."""
+    result = {'json': (
+        lambda m: framing.encode(m, framing.JSON)['text_data'],
+        lambda b: framing.decode(text_data=b),
+    )}
+    if framing.msgpack is not None:
+        result['msgpack'] = (
+            lambda m: framing.encode(m, framing.MSGPACK)['bytes_data'],
+            lambda b: framing.decode(bytes_data=b),
+        )
+    if cbor2 is not None:
+        # Not offered by the server; the same [type, body] envelope for comparison
+        result['cbor'] = (
+            lambda m: cbor2.dumps([m['type'], {k: v for k, v in m.items() if k != 'type'}]),
+            lambda b: cbor2.loads(b),
+        )
+    return result
+
+
+def bench():
+    payloads = {
+        'whiteboard path (250 pts)': whiteboard_path(),
+        'whiteboard modify': whiteboard_modify(),
+        'code delta': code_delta(),
+        'code resync (150 lines)': code_resync(),
+        'batch (6 modify + 4 delta)': batch_frame(),
+    }
+    print(f"{'payload':<28} {'codec':<8} {'bytes':>7} {'encode us':>10} {'decode us':>10}")
+    for name, payload in payloads.items():
+        for codec, (encode, decode) in codecs().items():
+            data = encode(payload)
+            # Text frames go out as UTF-8
+            size = len(data.encode()) if isinstance(data, str) else len(data)
+            number = 2000
+            enc = timeit.timeit(lambda: encode(payload), number=number) / number * 1e6
+            dec = timeit.timeit(lambda: decode(data), number=number) / number * 1e6
+            print(f'{name:<28} {codec:<8} {size:>7} {enc:>10.1f} {dec:>10.1f}')
+        print()
+
+
+if __name__ == '__main__':
+    bench()
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ChatMessage, DirectMessage
+from .models import ChatMessage, Conversation, DirectMessage, WhiteboardOp, WhiteboardSnapshot
 
 
 @admin.register(ChatMessage)
@@ -10,5 +10,20 @@ class ChatMessageAdmin(admin.ModelAdmin):
 
 @admin.register(DirectMessage)
 class DirectMessageAdmin(admin.ModelAdmin):
-    list_display = ('sender', 'receiver', 'content', 'is_read', 'created_at')
-    list_filter = ('is_read', 'created_at')
+    list_display = ('sender', 'receiver', 'content', 'created_at')
+    list_filter = ('created_at',)
+
+
+@admin.register(Conversation)
+class ConversationAdmin(admin.ModelAdmin):
+    list_display = ('user1', 'user2', 'last_activity', 'user1_unread', 'user2_unread')
+
+
+@admin.register(WhiteboardOp)
+class WhiteboardOpAdmin(admin.ModelAdmin):
+    list_display = ('session', 'seq', 'created_at')
+
+
+@admin.register(WhiteboardSnapshot)
+class WhiteboardSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('session', 'seq', 'created_at')
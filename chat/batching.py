@@ -0,0 +1,147 @@
+"""
+Per-room batching of high-frequency session events.
+
+Whiteboard ops, IDE deltas and video signals are queued on the room's
+RoomBatcher instead of being sent to the channel layer one by one. Every
+ROOM_BATCH_TICK_MS the queue goes out as a single `room_batch` group
+message, and each consumer answers it with one WebSocket frame.
+
+While queued, superseded events are merged:
+
+* a whiteboard `modify` replaces an earlier queued `modify` of the same
+  object (the op carries the whole object);
+* consecutive IDE deltas from the same sender are concatenated, since
+  peers apply them in order anyway.
+
+Video signals are never merged. Counts of what was received, coalesced
+and sent per event type are kept in `counters` and logged at DEBUG level.
+"""
+import asyncio
+import logging
+from collections import Counter
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# '<event type>.received' / '.coalesced' / '.sent', plus 'frames'
+counters = Counter()
+
+
+def _merge_whiteboard(pending, event):
+    op = event['data']
+    if op.get('type') != 'modify':
+        return False
+    object_id = (op.get('object') or {}).get('id')
+    if object_id is None:
+        return False
+    
+    # Walk back to the newest queued op that touches this object.
+    for i in range(len(pending) - 1, -1, -1):
+        queued = pending[i]
+        if queued['type'] != 'whiteboard_update':
+            continue
+        queued_op = queued['data']
+        if queued_op.get('type') == 'clear' or object_id in (queued_op.get('ids') or ()):
+            return False
+        if (queued_op.get('object') or {}).get('id') == object_id:
+            if queued_op.get('type') != 'modify':
+                return False
+            del pending[i]
+            pending.append(event)
+            return True
+    return False
+
+
+def _merge_code(pending, event):
+    last = pending[-1] if pending else None
+    if (last is None or last['type'] != 'code_update'
+            or last['sender_channel_name'] != event['sender_channel_name']):
+        return False
+    last['ops'] = last['ops'] + event['ops']
+    last['version'] = event['version']
+    last['language'] = event['language']
+    return True
+
+
+MERGERS = {
+    'whiteboard_update': _merge_whiteboard,
+    'code_update': _merge_code,
+}
+
+
+class RoomBatcher:
+    """Collects one room's events and fans them out once per tick."""
+    
+    def __init__(self, group_name, channel_layer):
+        self.group_name = group_name
+        self.channel_layer = channel_layer
+        self.members = 0
+        self.pending = []
+        self.scheduled = None
+        # Keeps batches in order if a group_send outlasts a tick.
+        self.send_lock = asyncio.Lock()
+    
+    @property
+    def tick(self):
+        return settings.ROOM_BATCH_TICK_MS / 1000
+    
+    async def add(self, event):
+        """Queue a group event (a dict with a consumer handler `type`)."""
+        event_type = event['type']
+        counters[f'{event_type}.received'] += 1
+        
+        if self.tick <= 0:
+            counters[f'{event_type}.sent'] += 1
+            await self.channel_layer.group_send(self.group_name, event)
+            return
+        
+        merge = MERGERS.get(event_type)
+        if merge and merge(self.pending, event):
+            counters[f'{event_type}.coalesced'] += 1
+        else:
+            self.pending.append(event)
+        
+        if self.scheduled is None:
+            loop = asyncio.get_running_loop()
+            self.scheduled = loop.call_later(
+                self.tick, lambda: loop.create_task(self.flush())
+            )
+    
+    async def flush(self):
+        self.scheduled = None
+        events, self.pending = self.pending, []
+        if not events:
+            return
+        
+        for event in events:
+            counters[f"{event['type']}.sent"] += 1
+        counters['frames'] += 1
+        async with self.send_lock:
+            await self.channel_layer.group_send(
+                self.group_name,
+                {'type': 'room_batch', 'events': events}
+            )
+        logger.debug('Flushed %d events to %s; totals %s', len(events), self.group_name, dict(counters))
+
+
+# group name -> RoomBatcher for rooms with consumers in this process
+batchers = {}
+
+
+def join(group_name, channel_layer):
+    batcher = batchers.get(group_name)
+    if batcher is None:
+        batcher = batchers[group_name] = RoomBatcher(group_name, channel_layer)
+    batcher.members += 1
+    return batcher
+
+
+def leave(group_name):
+    batcher = batchers.get(group_name)
+    if batcher is None:
+        return
+    batcher.members -= 1
+    if batcher.members <= 0:
+        # A scheduled flush still holds the batcher and delivers what's queued.
+        del batchers[group_name]
@@ -0,0 +1,78 @@
+"""
+Write-behind buffer for session chat messages.
+
+Consumers queue messages here instead of writing each one. The queue is
+written with one bulk_create once it reaches CHAT_BUFFER_SIZE messages or
+CHAT_BUFFER_SECONDS after the first queued message, whichever comes first.
+It is also flushed when a consumer disconnects and at interpreter exit.
+
+Messages are broadcast before they are written, so `created_at` is the
+flush time; it can trail the send time by up to CHAT_BUFFER_SECONDS.
+"""
+import asyncio
+import atexit
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import IntegrityError
+
+from .models import ChatMessage
+
+
+class ChatMessageBuffer:
+    """Per-process queue of unsaved ChatMessage rows."""
+    
+    def __init__(self):
+        self.pending = []
+        self.scheduled = None
+    
+    async def add(self, session_id, sender_id, content):
+        """Queue a message; uses ids only so no Session/User is loaded."""
+        self.pending.append(ChatMessage(
+            session_id=session_id, sender_id=sender_id, content=content
+        ))
+        if len(self.pending) >= settings.CHAT_BUFFER_SIZE:
+            await self.flush()
+        elif self.scheduled is None:
+            loop = asyncio.get_running_loop()
+            self.scheduled = loop.call_later(
+                settings.CHAT_BUFFER_SECONDS, lambda: loop.create_task(self.flush())
+            )
+    
+    async def flush(self):
+        batch = self.take()
+        if batch:
+            await database_sync_to_async(self.write)(batch)
+    
+    def flush_sync(self):
+        """Flush from synchronous code, e.g. at shutdown."""
+        batch = self.take()
+        if batch:
+            self.write(batch)
+    
+    def take(self):
+        if self.scheduled is not None:
+            self.scheduled.cancel()
+            self.scheduled = None
+        batch, self.pending = self.pending, []
+        return batch
+    
+    @staticmethod
+    def write(batch):
+        try:
+            ChatMessage.objects.bulk_create(batch)
+        except IntegrityError:
+            # A session was deleted while its messages were queued; drop those.
+            from users.models import Session
+            
+            session_ids = {message.session_id for message in batch}
+            existing = set(
+                Session.objects.filter(pk__in=session_ids).values_list('pk', flat=True)
+            )
+            ChatMessage.objects.bulk_create(
+                [message for message in batch if message.session_id in existing]
+            )
+
+
+chat_buffer = ChatMessageBuffer()
+atexit.register(chat_buffer.flush_sync)
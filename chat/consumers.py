@@ -1,35 +1,55 @@
 """
 WebSocket consumers for real-time chat.
 """
-import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
 
+from users.models import Session, TimerError
+from .models import WhiteboardOp, WhiteboardSnapshot
+from . import batching, framing, ide, inbox
+from .buffer import chat_buffer
+
 
 class SessionChatConsumer(AsyncWebsocketConsumer):
     """WebSocket consumer for session chat."""
     
     async def connect(self):
-        self.session_id = self.scope['url_route']['kwargs']['session_id']
+        self.session_id = int(self.scope['url_route']['kwargs']['session_id'])
         self.room_group_name = f'session_{self.session_id}'
+        self.context = None
+        
+        # Membership is checked once here and cached for the connection.
+        user = self.scope['user']
+        if user.is_authenticated:
+            self.context = await self.load_session_context(user.id)
+        if self.context is None:
+            await self.close()
+            return
         
         # Join room group
         await self.channel_layer.group_add(
             self.room_group_name,
             self.channel_name
         )
+        self.batcher = batching.join(self.room_group_name, self.channel_layer)
         
-        await self.accept()
+        self.subprotocol = framing.choose_subprotocol(self.scope.get('subprotocols', []))
+        await self.accept(subprotocol=self.subprotocol)
     
     async def disconnect(self, close_code):
+        if self.context is None:
+            return
         await self.channel_layer.group_discard(
             self.room_group_name,
             self.channel_name
         )
+        batching.leave(self.room_group_name)
+        await self.leave_document()
+        await chat_buffer.flush()
     
-    async def receive(self, text_data):
-        data = json.loads(text_data)
+    async def receive(self, text_data=None, bytes_data=None):
+        data = framing.decode(text_data, bytes_data)
         message_type = data.get('type', 'chat')
         
         if message_type == 'chat':
@@ -38,6 +58,12 @@ class SessionChatConsumer(AsyncWebsocketConsumer):
             await self.handle_timer_event(data)
         elif message_type == 'whiteboard':
             await self.handle_whiteboard_event(data)
+        elif message_type == 'whiteboard_sync':
+            await self.handle_whiteboard_sync(data)
+        elif message_type == 'code_delta':
+            await self.handle_code_delta(data)
+        elif message_type == 'code_sync':
+            await self.handle_code_sync(data)
         elif message_type == 'code_change':
             await self.handle_code_change(data)
         elif message_type == 'video_signal':
@@ -45,129 +71,333 @@ class SessionChatConsumer(AsyncWebsocketConsumer):
     
     async def handle_chat_message(self, data):
         content = data.get('content', '')
-        user = self.scope['user']
         
-        if user.is_authenticated and content:
-            # Save message to database
-            await self.save_message(content)
+        if content:
+            # Queue for a batched write
+            await chat_buffer.add(self.session_id, self.context['user_id'], content)
             
             # Broadcast to room
             await self.channel_layer.group_send(
                 self.room_group_name,
                 {
                     'type': 'chat_message',
-                    'sender': user.name,
-                    'sender_id': user.id,
+                    'sender': self.context['user_name'],
+                    'sender_id': self.context['user_id'],
                     'content': content,
                 }
             )
     
     async def handle_timer_event(self, data):
-        user = self.scope['user']
         action = data.get('action')  # 'start', 'stop'
         
+        try:
+            if not self.context['is_active']:
+                raise TimerError('Session ended')
+            state = await self.apply_timer_action(action)
+        except TimerError as e:
+            await self.send_payload({
+                'type': 'timer_error',
+                'action': action,
+                'error': str(e),
+            })
+            return
+        
         await self.channel_layer.group_send(
             self.room_group_name,
             {
                 'type': 'timer_update',
                 'action': action,
-                'user_id': user.id,
-                'user_name': user.name,
+                'user_id': self.context['user_id'],
+                'user_name': self.context['user_name'],
+                'state': state,
             }
         )
     
     async def handle_whiteboard_event(self, data):
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'whiteboard_update',
-                'data': data.get('data'),
-                'sender_channel_name': self.channel_name
-            }
-        )
+        op = data.get('data')
+        if not isinstance(op, dict) or op.get('type') not in WhiteboardOp.OP_TYPES:
+            return
+        
+        seq = await self.append_whiteboard_op(op)
+        await self.batcher.add({
+            'type': 'whiteboard_update',
+            'data': op,
+            'seq': seq,
+            'sender_channel_name': self.channel_name
+        })
+    
+    async def handle_whiteboard_sync(self, data):
+        """Send this client the ops it missed since the sequence it has."""
+        try:
+            since = int(data.get('since') or 0)
+        except (TypeError, ValueError):
+            since = 0
+        board = await self.load_whiteboard_since(since)
+        await self.send_payload({'type': 'whiteboard_sync', **board})
 
+    async def handle_code_delta(self, data):
+        """Commit a batch of editor ops made against `base_version`."""
+        doc = await self.get_document()
+        if doc is None:
+            return
+        try:
+            ops = ide.clean_ops(data.get('ops'))
+            base_version = int(data.get('base_version', -1))
+        except (ide.ConflictError, TypeError, ValueError):
+            await self.send_code_resync(doc)
+            return
+        
+        async with doc.lock:
+            try:
+                ops = doc.commit(ops, base_version, self.channel_name)
+            except ide.ConflictError:
+                await self.send_code_resync(doc)
+                return
+            if data.get('language'):
+                doc.language = data['language']
+            await self.broadcast_code_ops(doc, ops)
+        await self.maybe_checkpoint(doc)
+    
+    async def handle_code_sync(self, data):
+        """Send this client the full document and its version."""
+        doc = await self.get_document()
+        if doc is not None:
+            await self.send_code_resync(doc)
+    
     async def handle_code_change(self, data):
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'code_update',
-                'code': data.get('code'),
-                'language': data.get('language'),
-                'sender_channel_name': self.channel_name
-            }
-        )
+        """Whole-buffer update from clients that don't send deltas."""
+        code = data.get('code')
+        if not isinstance(code, str):
+            return
+        
+        doc = await self.get_document()
+        if doc is None:
+            return
+        async with doc.lock:
+            ops = doc.replace_all(code, self.channel_name)
+            if data.get('language'):
+                doc.language = data['language']
+            await self.broadcast_code_ops(doc, ops)
+        await self.maybe_checkpoint(doc)
+    
+    async def broadcast_code_ops(self, doc, ops):
+        # Called under doc.lock so every member receives versions in order.
+        await self.batcher.add({
+            'type': 'code_update',
+            'ops': ops,
+            'version': doc.version,
+            'language': doc.language,
+            'sender_channel_name': self.channel_name
+        })
+    
+    async def send_code_resync(self, doc):
+        await self.send_payload({
+            'type': 'code_resync',
+            'code': doc.text,
+            'version': doc.version,
+            'language': doc.language,
+        })
 
     async def handle_video_signal(self, data):
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'video_signal_message',
-                'data': data.get('data'),
-                'sender_channel_name': self.channel_name
-            }
-        )
+        await self.batcher.add({
+            'type': 'video_signal_message',
+            'data': data.get('data'),
+            'sender_channel_name': self.channel_name
+        })
     
     async def chat_message(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send_payload({
             'type': 'chat',
             'sender': event['sender'],
             'sender_id': event['sender_id'],
             'content': event['content'],
-        }))
+        })
     
     async def timer_update(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send_payload({
             'type': 'timer',
             'action': event['action'],
             'user_id': event['user_id'],
             'user_name': event['user_name'],
-        }))
+            'state': event['state'],
+        })
+    
+    async def room_batch(self, event):
+        """One tick's worth of room events, sent to the client as one frame."""
+        payloads = []
+        for queued in event['events']:
+            payload = getattr(self, f"{queued['type']}_payload")(queued)
+            if payload is not None:
+                payloads.append(payload)
+        if payloads:
+            await self.send_payload({'type': 'batch', 'events': payloads})
     
     async def whiteboard_update(self, event):
+        await self.send_payload(self.whiteboard_update_payload(event))
+    
+    async def code_update(self, event):
+        await self.send_payload(self.code_update_payload(event))
+    
+    async def video_signal_message(self, event):
+        await self.send_payload(self.video_signal_message_payload(event))
+    
+    async def send_payload(self, payload):
+        if payload is not None:
+            await self.send(**framing.encode(payload, self.subprotocol))
+    
+    def whiteboard_update_payload(self, event):
         if event.get('sender_channel_name') == self.channel_name:
-            return
-            
-        await self.send(text_data=json.dumps({
+            return None
+        return {
             'type': 'whiteboard',
             'data': event['data'],
-        }))
-
-    async def code_update(self, event):
+            'seq': event.get('seq'),
+        }
+    
+    def code_update_payload(self, event):
         if event.get('sender_channel_name') == self.channel_name:
-            return
-
-        await self.send(text_data=json.dumps({
-            'type': 'code_change',
-            'code': event['code'],
+            # Our own batch, now ordered among everyone else's.
+            return {'type': 'code_ack', 'version': event['version']}
+        return {
+            'type': 'code_delta',
+            'ops': event['ops'],
+            'version': event['version'],
             'language': event.get('language'),
-        }))
-
-    async def video_signal_message(self, event):
+        }
+    
+    def video_signal_message_payload(self, event):
         if event.get('sender_channel_name') == self.channel_name:
-            return
-
-        await self.send(text_data=json.dumps({
+            return None
+        return {
             'type': 'video_signal',
             'data': event['data'],
-        }))
+        }
 
     async def session_ended_message(self, event):
-        await self.send(text_data=json.dumps({
+        self.context['is_active'] = False
+        await self.send_payload({
             'type': 'session_ended',
             'redirect_url': event['redirect_url']
-        }))
+        })
+    
+    @database_sync_to_async
+    def load_session_context(self, user_id):
+        """Participants, names and active flag in one query; None for non-members."""
+        row = Session.objects.filter(pk=self.session_id).values(
+            'is_active', 'user1_id', 'user1__name', 'user2_id', 'user2__name'
+        ).first()
+        if row is None or user_id not in (row['user1_id'], row['user2_id']):
+            return None
+        names = {
+            row['user1_id']: row['user1__name'],
+            row['user2_id']: row['user2__name'],
+        }
+        return {
+            'is_active': row['is_active'],
+            'user_id': user_id,
+            'user_name': names[user_id],
+            'participants': names,
+        }
+    
+    async def get_document(self):
+        """This process's copy of the session's document, or None if another worker owns it."""
+        doc = ide.documents.get(self.session_id)
+        if doc is None or doc.lease_due:
+            if not await database_sync_to_async(ide.claim)(self.session_id):
+                await self.send_payload({
+                    'type': 'code_unavailable',
+                    'error': "This session's editor is served by another worker",
+                })
+                return None
+            if doc is not None:
+                doc.renew_lease()
+        if doc is None:
+            loaded = await database_sync_to_async(ide.IdeDocument.load)(self.session_id)
+            # Another consumer may have loaded it while we were waiting.
+            doc = ide.documents.setdefault(self.session_id, loaded)
+        doc.clients.add(self.channel_name)
+        return doc
+    
+    async def maybe_checkpoint(self, doc):
+        if doc.needs_checkpoint:
+            await database_sync_to_async(doc.checkpoint)()
+    
+    async def leave_document(self):
+        doc = ide.documents.get(self.session_id)
+        if doc is None:
+            return
+        doc.clients.discard(self.channel_name)
+        if not doc.clients:
+            ide.documents.pop(self.session_id, None)
+            if doc.version != doc.checkpointed_version:
+                await database_sync_to_async(doc.checkpoint)()
+            # A client may have reopened the document while we checkpointed.
+            if self.session_id not in ide.documents:
+                await database_sync_to_async(ide.release)(self.session_id)
+    
+    @database_sync_to_async
+    def apply_timer_action(self, action):
+        return Session.apply_timer_action(self.session_id, self.scope['user'], action)
+    
+    @database_sync_to_async
+    def append_whiteboard_op(self, op):
+        return WhiteboardOp.append(self.session_id, op)
     
     @database_sync_to_async
-    def save_message(self, content):
-        from chat.models import ChatMessage
-        from users.models import Session
+    def load_whiteboard_since(self, since):
+        base = WhiteboardSnapshot.latest_for(self.session_id)
+        if base and base.seq > since:
+            # Too far behind: the ops it needs were compacted away.
+            return WhiteboardSnapshot.load(self.session_id)
+        return {'seq': since, 'snapshot': None, 'ops': WhiteboardOp.since(self.session_id, since)}
+
+
+class InboxConsumer(AsyncWebsocketConsumer):
+    """Per-user socket for direct messages, read receipts and unread counts."""
+    
+    async def connect(self):
+        self.user = self.scope['user']
+        self.group_name = None
+        if not self.user.is_authenticated:
+            await self.close()
+            return
         
-        try:
-            session = Session.objects.get(pk=self.session_id)
-            ChatMessage.objects.create(
-                session=session,
-                sender=self.scope['user'],
-                content=content
-            )
-        except Session.DoesNotExist:
-            pass
+        self.group_name = inbox.group_name(self.user.id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        self.subprotocol = framing.choose_subprotocol(self.scope.get('subprotocols', []))
+        await self.accept(subprotocol=self.subprotocol)
+        
+        count = await database_sync_to_async(inbox.unread_count)(self.user.id)
+        await self.send_payload({'type': 'unread', 'unread_count': count})
+    
+    async def disconnect(self, close_code):
+        if self.group_name:
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+    
+    async def receive(self, text_data=None, bytes_data=None):
+        data = framing.decode(text_data, bytes_data)
+        if data.get('type') == 'mark_read':
+            try:
+                other_user_id = int(data.get('user_id'))
+            except (TypeError, ValueError):
+                return
+            await database_sync_to_async(inbox.mark_read)(self.user.id, other_user_id)
+    
+    async def send_payload(self, payload):
+        await self.send(**framing.encode(payload, self.subprotocol))
+    
+    async def inbox_message(self, event):
+        payload = {'type': 'dm', 'message': event['message']}
+        if event.get('unread_count') is not None:
+            payload['unread_count'] = event['unread_count']
+        await self.send_payload(payload)
+    
+    async def inbox_read(self, event):
+        await self.send_payload({
+            'type': 'dm_read',
+            'reader_id': event['reader_id'],
+            'up_to_id': event['up_to_id'],
+        })
+    
+    async def inbox_unread(self, event):
+        await self.send_payload({'type': 'unread', 'unread_count': event['unread_count']})
@@ -0,0 +1,50 @@
+"""
+WebSocket frame encoding for session sockets.
+
+Clients pick the encoding with the WebSocket subprotocol:
+
+* `linklearn.msgpack` - binary frames holding a MessagePack array
+  `[type, body]`, where body is the message without its `type` key;
+* `linklearn.json` (or no subprotocol, for older pages) - JSON text frames
+  holding the message dict.
+
+MessagePack needs the optional `msgpack` package; without it the server
+only ever agrees to JSON. See benchmark_framing.py for the size and speed
+comparison on whiteboard and IDE payloads.
+"""
+import json
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+MSGPACK = 'linklearn.msgpack'
+JSON = 'linklearn.json'
+
+
+def choose_subprotocol(offered):
+    """Pick the subprotocol to accept from the client's list (None if it offered none)."""
+    if msgpack is not None and MSGPACK in offered:
+        return MSGPACK
+    if JSON in offered:
+        return JSON
+    return None
+
+
+def encode(payload, subprotocol):
+    """Return the send() keyword arguments for a message dict."""
+    if subprotocol == MSGPACK:
+        body = {key: value for key, value in payload.items() if key != 'type'}
+        return {'bytes_data': msgpack.packb([payload['type'], body])}
+    return {'text_data': json.dumps(payload)}
+
+
+def decode(text_data=None, bytes_data=None):
+    """Turn an incoming frame back into a message dict."""
+    if bytes_data is not None:
+        if msgpack is None:
+            raise ValueError('Binary frame received but msgpack is not installed')
+        message_type, body = msgpack.unpackb(bytes_data)
+        return {**body, 'type': message_type}
+    return json.loads(text_data)
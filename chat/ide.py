@@ -0,0 +1,201 @@
+"""
+Versioned collaborative IDE documents.
+
+Each live session has one in-memory IdeDocument holding the authoritative
+text and a version counter. Clients send lists of replace ops
+({offset, length, text}) against the last version they have seen and keep
+at most one batch in flight. The document transforms a batch past any ops
+other clients committed since that version, applies it and bumps the
+version; batches that overlap a concurrent edit, or are too old to
+transform, are rejected and the client resyncs from the full text.
+
+Offsets are counted in Python code points. The editor counts UTF-16 units,
+so text outside the BMP can push a client out of step; the next rejected
+batch resyncs it.
+
+Documents live in the process that serves the room and are checkpointed
+to SessionState/Session every IDE_CHECKPOINT_EVERY versions and when the
+last client leaves. With several workers, session sockets must be routed to
+one worker per session: that worker holds a lease on the session in the
+shared cache, and any other worker refuses editor ops for it rather than
+editing a second copy of the document.
+"""
+import asyncio
+import time
+import uuid
+from collections import deque
+
+from django.conf import settings
+from django.core.cache import cache
+
+OWNER_KEY = 'ide:owner:{session_id}'
+
+# Identifies this process as a lease holder
+WORKER_ID = uuid.uuid4().hex
+
+
+class ConflictError(Exception):
+    """An op could not be transformed or applied; the client must resync."""
+
+
+def transform_op(op, against, op_is_later):
+    """
+    Rebase `op` so it applies after `against` (both made on the same text).
+    
+    Inserts at the same offset are ordered by `op_is_later`. Overlapping
+    edits raise ConflictError.
+    """
+    op_start, op_end = op['offset'], op['offset'] + op['length']
+    against_start = against['offset']
+    against_end = against_start + against['length']
+    shift = len(against['text']) - against['length']
+    
+    if op['length'] == 0 and against['length'] == 0 and op_start == against_start:
+        return dict(op, offset=op_start + shift) if op_is_later else op
+    if against_end <= op_start:
+        return dict(op, offset=op_start + shift)
+    if op_end <= against_start:
+        return op
+    raise ConflictError('Overlapping edits')
+
+
+def transform_sequences(ops, against, ops_are_later):
+    """
+    Transform two op sequences made on the same text past each other.
+    
+    Returns (ops rebased after `against`, `against` rebased after `ops`).
+    """
+    ops = list(ops)
+    rebased = []
+    for other in against:
+        for i, op in enumerate(ops):
+            ops[i], other = (
+                transform_op(op, other, ops_are_later),
+                transform_op(other, op, not ops_are_later),
+            )
+        rebased.append(other)
+    return ops, rebased
+
+
+def apply_ops(text, ops):
+    for op in ops:
+        start, end = op['offset'], op['offset'] + op['length']
+        if start < 0 or op['length'] < 0 or end > len(text):
+            raise ConflictError('Op out of range')
+        text = text[:start] + op['text'] + text[end:]
+    return text
+
+
+def clean_ops(raw_ops):
+    """Validate client ops, raising ConflictError on anything malformed."""
+    ops = []
+    for raw in raw_ops or []:
+        try:
+            ops.append({
+                'offset': int(raw['offset']),
+                'length': int(raw['length']),
+                'text': str(raw.get('text') or ''),
+            })
+        except (KeyError, TypeError, ValueError):
+            raise ConflictError('Malformed op')
+    return ops
+
+
+class IdeDocument:
+    """Authoritative text and recent op history for one session's editor."""
+    
+    history_size = 200
+    
+    def __init__(self, session_id, text, language, version=0):
+        self.session_id = session_id
+        self.text = text
+        self.language = language
+        self.version = version
+        self.checkpointed_version = version
+        self.history = deque(maxlen=self.history_size)
+        self.clients = set()
+        self.lock = asyncio.Lock()
+        self.leased_at = time.monotonic()
+    
+    def commit(self, ops, base_version, client):
+        """Rebase `ops` from base_version, apply them and return the applied ops."""
+        if base_version > self.version:
+            raise ConflictError('Unknown base version')
+        missed = [entry for entry in self.history if entry[0] > base_version]
+        if self.version - base_version != len(missed):
+            raise ConflictError('Base version too old')
+        for _, author, applied in missed:
+            if author == client:
+                raise ConflictError('Client sent a batch before its previous one was acknowledged')
+            ops, _ = transform_sequences(ops, applied, ops_are_later=True)
+        
+        self.text = apply_ops(self.text, ops)
+        self.version += 1
+        self.history.append((self.version, client, ops))
+        return ops
+    
+    def replace_all(self, text, client):
+        """Last-writer-wins replacement, for clients that send whole buffers."""
+        ops = [{'offset': 0, 'length': len(self.text), 'text': text}]
+        return self.commit(ops, self.version, client)
+    
+    def renew_lease(self):
+        self.leased_at = time.monotonic()
+    
+    @property
+    def lease_due(self):
+        """True once a third of the lease has passed without renewing it."""
+        return time.monotonic() - self.leased_at >= settings.IDE_OWNER_LEASE_SECONDS / 3
+    
+    @property
+    def needs_checkpoint(self):
+        return self.version - self.checkpointed_version >= settings.IDE_CHECKPOINT_EVERY
+    
+    def checkpoint(self):
+        """Persist the text and language. Runs in a sync (DB) context."""
+        from users.models import Session, SessionState
+        
+        # Edits may land while we write; record what was actually saved.
+        version, text, language = self.version, self.text, self.language
+        state = SessionState.objects.filter(session_id=self.session_id).first()
+        if state is None:
+            state = SessionState(session_id=self.session_id)
+        state.ide_code = text
+        state.save()
+        Session.objects.filter(pk=self.session_id).update(ide_language=language)
+        self.checkpointed_version = max(self.checkpointed_version, version)
+    
+    @classmethod
+    def load(cls, session_id):
+        """Build a document from the last checkpoint. Runs in a sync (DB) context."""
+        from users.models import Session, SessionState
+        
+        language = Session.objects.filter(pk=session_id).values_list('ide_language', flat=True).first()
+        state = SessionState.objects.filter(session_id=session_id).first()
+        text = state.ide_code if state else SessionState.DEFAULT_IDE_CODE
+        return cls(session_id, text, language or 'javascript')
+
+
+def claim(session_id):
+    """
+    Take or renew this process's lease on a session's document. Runs in a
+    sync (DB) context. Returns False if another worker holds the lease.
+    """
+    key = OWNER_KEY.format(session_id=session_id)
+    if cache.add(key, WORKER_ID, settings.IDE_OWNER_LEASE_SECONDS):
+        return True
+    if cache.get(key) != WORKER_ID:
+        return False
+    cache.touch(key, settings.IDE_OWNER_LEASE_SECONDS)
+    return True
+
+
+def release(session_id):
+    """Give up the lease once the last local client has left."""
+    key = OWNER_KEY.format(session_id=session_id)
+    if cache.get(key) == WORKER_ID:
+        cache.delete(key)
+
+
+# session_id -> IdeDocument for rooms served by this process
+documents = {}
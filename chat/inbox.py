@@ -0,0 +1,69 @@
+"""
+Push events for users' direct-message inboxes.
+
+Each open page can hold an InboxConsumer socket in its user's
+`inbox_<user id>` group. Views and the consumer publish new messages,
+read receipts and unread counts here once their writes have committed.
+"""
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+from .models import Conversation
+
+
+def group_name(user_id):
+    return f'inbox_{user_id}'
+
+
+def unread_count(user_id):
+    return Conversation.unread_total(user_id)
+
+
+def message_payload(msg):
+    return {
+        'id': msg.id,
+        'sender_id': msg.sender_id,
+        'sender': msg.sender.name,
+        'receiver_id': msg.receiver_id,
+        'content': msg.content,
+        'timestamp': msg.created_at.isoformat(),
+    }
+
+
+def publish(user_id, event):
+    """group_send `event` to a user's inbox after the current transaction commits."""
+    layer = get_channel_layer()
+    transaction.on_commit(
+        lambda: async_to_sync(layer.group_send)(group_name(user_id), event)
+    )
+
+
+def publish_message(msg):
+    """Deliver a new DirectMessage to both participants' open pages."""
+    payload = message_payload(msg)
+    publish(msg.receiver_id, {
+        'type': 'inbox_message',
+        'message': payload,
+        'unread_count': unread_count(msg.receiver_id),
+    })
+    # The sender's other tabs show it too; their unread count is unchanged.
+    publish(msg.sender_id, {'type': 'inbox_message', 'message': payload, 'unread_count': None})
+
+
+def mark_read(reader_id, other_user_id):
+    """
+    Mark the conversation with `other_user_id` read for `reader_id`, then
+    send a read receipt to the sender and the new unread count to the reader.
+    """
+    up_to_id = Conversation.mark_read(reader_id, other_user_id)
+    if up_to_id is None:
+        return None
+    
+    publish(other_user_id, {
+        'type': 'inbox_read',
+        'reader_id': reader_id,
+        'up_to_id': up_to_id,
+    })
+    publish(reader_id, {'type': 'inbox_unread', 'unread_count': unread_count(reader_id)})
+    return up_to_id
@@ -0,0 +1,35 @@
+"""
+Run the channel broker that BrokerChannelLayer workers connect to.
+
+Start it before the daphne workers. Layer options (expiry, group_expiry,
+capacity, channel_capacity) are taken from the default CHANNEL_LAYERS
+CONFIG so the broker and workers agree on them.
+"""
+import asyncio
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from link_and_learn.channel_layer import ChannelBroker
+
+
+class Command(BaseCommand):
+    help = 'Serve a channel layer to the worker processes on this host.'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--socket', help='Unix socket path (default: CHANNEL_BROKER_SOCKET).')
+    
+    def handle(self, *args, **options):
+        path = options['socket'] or settings.CHANNEL_BROKER_SOCKET
+        if not path:
+            raise CommandError('Set CHANNEL_BROKER_SOCKET or pass --socket.')
+        
+        config = dict(settings.CHANNEL_LAYERS['default'].get('CONFIG', {}))
+        config.pop('path', None)
+        broker = ChannelBroker(path, **config)
+        
+        self.stdout.write(self.style.SUCCESS(f'Channel broker listening on {path}'))
+        try:
+            asyncio.run(broker.serve())
+        except KeyboardInterrupt:
+            pass
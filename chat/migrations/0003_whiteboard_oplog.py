@@ -0,0 +1,49 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_session_teaching_totals'),
+        ('chat', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WhiteboardSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.PositiveIntegerField()),
+                ('state', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='whiteboard_snapshots', to='users.session')),
+            ],
+            options={
+                'ordering': ['session', '-seq'],
+            },
+        ),
+        migrations.CreateModel(
+            name='WhiteboardOp',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.PositiveIntegerField()),
+                ('data', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='whiteboard_ops', to='users.session')),
+            ],
+            options={
+                'ordering': ['session', 'seq'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='whiteboardsnapshot',
+            constraint=models.UniqueConstraint(fields=('session', 'seq'), name='whiteboard_snapshot_session_seq_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='whiteboardop',
+            constraint=models.UniqueConstraint(fields=('session', 'seq'), name='whiteboard_op_session_seq_uniq'),
+        ),
+    ]
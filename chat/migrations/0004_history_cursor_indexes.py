@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0003_whiteboard_oplog'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['session', 'id'], name='chatmsg_session_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='directmessage',
+            index=models.Index(fields=['sender', 'receiver', 'id'], name='dm_pair_id_idx'),
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:29
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Q
+import django.db.models.deletion
+
+
+def populate_conversations(apps, schema_editor):
+    DirectMessage = apps.get_model('chat', 'DirectMessage')
+    Conversation = apps.get_model('chat', 'Conversation')
+    
+    pairs = {}
+    for row in DirectMessage.objects.values('sender', 'receiver').annotate(
+        last=Max('id'),
+        unread=Count('id', filter=Q(is_read=False)),
+        last_read=Max('id', filter=Q(is_read=True)),
+    ):
+        low, high = sorted((row['sender'], row['receiver']))
+        side = 'user1' if row['receiver'] == low else 'user2'
+        pair = pairs.setdefault((low, high), {'last': 0})
+        pair['last'] = max(pair['last'], row['last'])
+        pair[f'{side}_unread'] = row['unread']
+        pair[f'{side}_last_read_id'] = row['last_read'] or 0
+    
+    last_messages = DirectMessage.objects.in_bulk([pair['last'] for pair in pairs.values()])
+    conversations = []
+    for (low, high), pair in pairs.items():
+        last_message = last_messages[pair.pop('last')]
+        conversations.append(Conversation(
+            user1_id=low, user2_id=high,
+            last_message=last_message,
+            last_activity=last_message.created_at,
+            **pair
+        ))
+    Conversation.objects.bulk_create(conversations, batch_size=500)
+
+
+def restore_read_flags(apps, schema_editor):
+    DirectMessage = apps.get_model('chat', 'DirectMessage')
+    Conversation = apps.get_model('chat', 'Conversation')
+    
+    for conversation in Conversation.objects.all():
+        for reader, other, last_read in (
+            (conversation.user1_id, conversation.user2_id, conversation.user1_last_read_id),
+            (conversation.user2_id, conversation.user1_id, conversation.user2_last_read_id),
+        ):
+            DirectMessage.objects.filter(
+                sender_id=other, receiver_id=reader, id__lte=last_read
+            ).update(is_read=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('chat', '0004_history_cursor_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_activity', models.DateTimeField()),
+                ('user1_unread', models.PositiveIntegerField(default=0)),
+                ('user2_unread', models.PositiveIntegerField(default=0)),
+                ('user1_last_read_id', models.BigIntegerField(default=0)),
+                ('user2_last_read_id', models.BigIntegerField(default=0)),
+                ('last_message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='chat.directmessage')),
+                ('user1', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversations_as_user1', to=settings.AUTH_USER_MODEL)),
+                ('user2', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversations_as_user2', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user1', '-last_activity'], name='conversation_user1_recent_idx'), models.Index(fields=['user2', '-last_activity'], name='conversation_user2_recent_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='conversation',
+            constraint=models.UniqueConstraint(fields=('user1', 'user2'), name='conversation_pair_unique'),
+        ),
+        migrations.RunPython(populate_conversations, restore_read_flags),
+        migrations.RemoveField(
+            model_name='directmessage',
+            name='is_read',
+        ),
+    ]
@@ -1,7 +1,10 @@
 """
 Chat app models.
 """
-from django.db import models
+import json
+
+from django.db import models, transaction
+from django.db.models import Case, F, Q, Sum, When
 from django.conf import settings
 
 
@@ -23,6 +26,10 @@ class ChatMessage(models.Model):
     
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # History pages: WHERE session_id = ? AND id > / < ?
+            models.Index(fields=['session', 'id'], name='chatmsg_session_id_idx'),
+        ]
     
     def __str__(self):
         return f"{self.sender.name}: {self.content[:50]}"
@@ -43,10 +50,274 @@ class DirectMessage(models.Model):
     )
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
-    is_read = models.BooleanField(default=False)
     
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # Each direction of a conversation is one range on this index
+            models.Index(fields=['sender', 'receiver', 'id'], name='dm_pair_id_idx'),
+        ]
     
     def __str__(self):
         return f"{self.sender.name} -> {self.receiver.name}: {self.content[:30]}"
+
+
+class Conversation(models.Model):
+    """
+    The direct-message thread between two users, one row per pair.
+    
+    user1 is always the lower user id. Each side keeps its unread count and
+    the id of the last message it has read, so read state is a single-row
+    update instead of a flag on every message.
+    """
+    
+    user1 = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='conversations_as_user1'
+    )
+    user2 = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='conversations_as_user2'
+    )
+    last_message = models.ForeignKey(
+        DirectMessage,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='+'
+    )
+    last_activity = models.DateTimeField()
+    user1_unread = models.PositiveIntegerField(default=0)
+    user2_unread = models.PositiveIntegerField(default=0)
+    user1_last_read_id = models.BigIntegerField(default=0)
+    user2_last_read_id = models.BigIntegerField(default=0)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user1', 'user2'], name='conversation_pair_unique'),
+        ]
+        indexes = [
+            # A user's threads by recency: one range per side of the pair
+            models.Index(fields=['user1', '-last_activity'], name='conversation_user1_recent_idx'),
+            models.Index(fields=['user2', '-last_activity'], name='conversation_user2_recent_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Conversation {self.user1_id} <-> {self.user2_id}"
+    
+    @staticmethod
+    def side(conversation_user1_id, user_id):
+        """Field prefix ('user1'/'user2') for `user_id` in a pair."""
+        return 'user1' if user_id == conversation_user1_id else 'user2'
+    
+    @classmethod
+    def for_user(cls, user):
+        """A user's conversations, most recent first."""
+        return cls.objects.filter(Q(user1=user) | Q(user2=user)).order_by('-last_activity')
+    
+    @classmethod
+    def get_for_pair(cls, a_id, b_id):
+        low, high = sorted((a_id, b_id))
+        return cls.objects.filter(user1_id=low, user2_id=high).first()
+    
+    @classmethod
+    def record_message(cls, msg):
+        """Point the pair's conversation at a new message; call inside its transaction."""
+        low, high = sorted((msg.sender_id, msg.receiver_id))
+        conversation, _ = cls.objects.get_or_create(
+            user1_id=low, user2_id=high,
+            defaults={'last_activity': msg.created_at}
+        )
+        unread = f'{cls.side(low, msg.receiver_id)}_unread'
+        cls.objects.filter(pk=conversation.pk).update(
+            last_message=msg,
+            last_activity=msg.created_at,
+            **{unread: F(unread) + 1}
+        )
+        return conversation
+    
+    @classmethod
+    def mark_read(cls, reader_id, other_user_id):
+        """
+        Clear the reader's unread count. Returns the id of the last message
+        now read, or None if nothing was unread.
+        """
+        low, high = sorted((reader_id, other_user_id))
+        side = cls.side(low, reader_id)
+        with transaction.atomic():
+            conversation = cls.objects.select_for_update().filter(
+                user1_id=low, user2_id=high
+            ).first()
+            if conversation is None or not getattr(conversation, f'{side}_unread'):
+                return None
+            cls.objects.filter(pk=conversation.pk).update(**{
+                f'{side}_unread': 0,
+                f'{side}_last_read_id': conversation.last_message_id,
+            })
+            return conversation.last_message_id
+    
+    @classmethod
+    def unread_total(cls, user_id):
+        """Unread direct messages across all of a user's conversations."""
+        total = cls.objects.filter(Q(user1_id=user_id) | Q(user2_id=user_id)).aggregate(
+            total=Sum(Case(
+                When(user1_id=user_id, then='user1_unread'),
+                default='user2_unread',
+            ))
+        )['total']
+        return total or 0
+    
+    def other_user(self, user):
+        return self.user2 if user.id == self.user1_id else self.user1
+    
+    def unread_for(self, user):
+        return getattr(self, f'{self.side(self.user1_id, user.id)}_unread')
+    
+    def last_read_by(self, user_id):
+        return getattr(self, f'{self.side(self.user1_id, user_id)}_last_read_id')
+
+
+def apply_whiteboard_op(state, op):
+    """
+    Apply one whiteboard operation to a Fabric canvas JSON dict in place.
+    
+    Ops mirror what session.js sends: add/modify carry an `object` with an
+    `id`, remove carries `ids`, clear empties the board.
+    """
+    objects = state.setdefault('objects', [])
+    kind = op.get('type')
+    if kind == 'clear':
+        objects.clear()
+    elif kind == 'add':
+        obj = op.get('object') or {}
+        if not any(existing.get('id') == obj.get('id') for existing in objects):
+            objects.append(obj)
+    elif kind == 'modify':
+        obj = op.get('object') or {}
+        for existing in objects:
+            if existing.get('id') == obj.get('id'):
+                existing.update(obj)
+                break
+    elif kind == 'remove':
+        ids = set(op.get('ids') or [])
+        objects[:] = [existing for existing in objects if existing.get('id') not in ids]
+    return state
+
+
+class WhiteboardOp(models.Model):
+    """One incremental whiteboard change, numbered per session."""
+    
+    OP_TYPES = ('add', 'modify', 'remove', 'clear')
+    
+    session = models.ForeignKey(
+        'users.Session',
+        on_delete=models.CASCADE,
+        related_name='whiteboard_ops'
+    )
+    seq = models.PositiveIntegerField()
+    data = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['session', 'seq']
+        constraints = [
+            models.UniqueConstraint(fields=['session', 'seq'], name='whiteboard_op_session_seq_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"Whiteboard op #{self.seq} in session {self.session_id}"
+    
+    @classmethod
+    def append(cls, session_id, op):
+        """Store an op with the next sequence number, compacting every N ops."""
+        from users.models import Session
+        
+        with transaction.atomic():
+            # Lock the session row so concurrent ops get distinct numbers.
+            Session.objects.select_for_update().filter(pk=session_id).values_list('pk', flat=True).get()
+            last = cls.objects.filter(session_id=session_id).aggregate(last=models.Max('seq'))['last']
+            if last is None:
+                last = WhiteboardSnapshot.objects.filter(session_id=session_id).aggregate(
+                    last=models.Max('seq')
+                )['last'] or 0
+            seq = last + 1
+            cls.objects.create(session_id=session_id, seq=seq, data=op)
+            if seq % settings.WHITEBOARD_SNAPSHOT_EVERY == 0:
+                WhiteboardSnapshot.compact(session_id)
+        return seq
+    
+    @classmethod
+    def since(cls, session_id, seq):
+        return [
+            {'seq': op_seq, 'data': data}
+            for op_seq, data in cls.objects.filter(session_id=session_id, seq__gt=seq)
+            .order_by('seq').values_list('seq', 'data')
+        ]
+
+
+class WhiteboardSnapshot(models.Model):
+    """Full whiteboard state after applying every op up to `seq`."""
+    
+    session = models.ForeignKey(
+        'users.Session',
+        on_delete=models.CASCADE,
+        related_name='whiteboard_snapshots'
+    )
+    seq = models.PositiveIntegerField()
+    state = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['session', '-seq']
+        constraints = [
+            models.UniqueConstraint(fields=['session', 'seq'], name='whiteboard_snapshot_session_seq_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"Whiteboard snapshot @{self.seq} for session {self.session_id}"
+    
+    @classmethod
+    def latest_for(cls, session_id):
+        return cls.objects.filter(session_id=session_id).order_by('-seq').first()
+    
+    @classmethod
+    def compact(cls, session_id):
+        """Fold the ops after the newest snapshot into a new one and prune the rest."""
+        base = cls.latest_for(session_id)
+        seq = base.seq if base else 0
+        state = base.state if base else legacy_whiteboard_state(session_id)
+        ops = WhiteboardOp.since(session_id, seq)
+        if not ops:
+            return base
+        for op in ops:
+            apply_whiteboard_op(state, op['data'])
+        snapshot = cls.objects.create(session_id=session_id, seq=ops[-1]['seq'], state=state)
+        WhiteboardOp.objects.filter(session_id=session_id, seq__lte=snapshot.seq).delete()
+        cls.objects.filter(session_id=session_id, seq__lt=snapshot.seq).delete()
+        return snapshot
+    
+    @classmethod
+    def load(cls, session_id):
+        """Newest snapshot plus the ops after it, for a client joining late."""
+        base = cls.latest_for(session_id)
+        seq = base.seq if base else 0
+        return {
+            'seq': seq,
+            'snapshot': base.state if base else legacy_whiteboard_state(session_id),
+            'ops': WhiteboardOp.since(session_id, seq),
+        }
+
+
+def legacy_whiteboard_state(session_id):
+    """Canvas JSON saved by the old full-board autosave, if any."""
+    from users.models import SessionState, decompress_text
+    
+    data = SessionState.objects.filter(session_id=session_id).values_list('whiteboard_data', flat=True).first()
+    raw = decompress_text(data)
+    if raw.lstrip().startswith('{'):
+        try:
+            return json.loads(raw)
+        except ValueError:
+            pass
+    return {'objects': []}
@@ -6,4 +6,5 @@ from . import consumers
 
 websocket_urlpatterns = [
     re_path(r'ws/session/(?P<session_id>\d+)/$', consumers.SessionChatConsumer.as_asgi()),
+    re_path(r'ws/inbox/$', consumers.InboxConsumer.as_asgi()),
 ]
@@ -3,37 +3,89 @@ Chat views.
 """
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.db.models import Max, Q
 from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.views.decorators.http import require_POST
 from django.contrib.auth import get_user_model
 
-from .models import ChatMessage, DirectMessage
+from .models import ChatMessage, Conversation, DirectMessage
+from . import inbox
+from link_and_learn.pagination import paginate
 from users.models import Session
 
 User = get_user_model()
 
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+
+
+def _int_param(request, name):
+    try:
+        return int(request.GET[name])
+    except (KeyError, ValueError):
+        return None
+
+
+def _history_response(request, messages, serialize):
+    """
+    One page of a message history as JSON, oldest first.
+    
+    `?since_id=` returns messages after that id (what a reconnecting client
+    missed), `?before_id=` the page before it, and neither the latest page;
+    `?limit=` sets the page size. The ETag is the newest message id, so an
+    unchanged history answers If-None-Match with a 304.
+    """
+    last_id = messages.aggregate(last=Max('id'))['last'] or 0
+    etag = f'"{last_id}"'
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+    
+    limit = _int_param(request, 'limit') or HISTORY_PAGE_SIZE
+    limit = max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+    since_id = _int_param(request, 'since_id')
+    before_id = _int_param(request, 'before_id')
+    
+    if since_id is not None:
+        page = list(messages.filter(id__gt=since_id).order_by('id')[:limit + 1])
+        has_more = len(page) > limit
+        page = page[:limit]
+    else:
+        newest_first = messages.order_by('-id')
+        if before_id is not None:
+            newest_first = newest_first.filter(id__lt=before_id)
+        page = list(newest_first[:limit + 1])
+        has_more = len(page) > limit
+        page = page[:limit][::-1]
+    
+    response = JsonResponse({
+        'messages': [serialize(msg) for msg in page],
+        'has_more': has_more,
+        'last_id': last_id,
+    })
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
 
 @login_required
 def session_chat(request, session_id):
     """Get chat messages for a session."""
-    session = get_object_or_404(Session, pk=session_id)
+    session = get_object_or_404(Session.objects.only('user1', 'user2'), pk=session_id)
     
-    if request.user not in [session.user1, session.user2]:
+    if request.user.id not in (session.user1_id, session.user2_id):
         return JsonResponse({'error': 'Unauthorized'}, status=403)
     
-    messages = ChatMessage.objects.filter(session=session).select_related('sender')
+    messages = ChatMessage.objects.filter(session_id=session.id).select_related('sender')
     
-    return JsonResponse({
-        'messages': [
-            {
-                'id': msg.id,
-                'sender': msg.sender.name,
-                'sender_id': msg.sender.id,
-                'content': msg.content,
-                'timestamp': msg.created_at.isoformat(),
-            }
-            for msg in messages
-        ]
+    return _history_response(request, messages, lambda msg: {
+        'id': msg.id,
+        'sender': msg.sender.name,
+        'sender_id': msg.sender_id,
+        'content': msg.content,
+        'timestamp': msg.created_at.isoformat(),
     })
 
 
@@ -43,7 +95,7 @@ def send_message(request, session_id):
     """Send a message in a session."""
     session = get_object_or_404(Session, pk=session_id)
     
-    if request.user not in [session.user1, session.user2]:
+    if request.user.id not in (session.user1_id, session.user2_id):
         return JsonResponse({'error': 'Unauthorized'}, status=403)
     
     content = request.POST.get('content', '').strip()
@@ -68,25 +120,41 @@ def send_message(request, session_id):
     })
 
 
+@login_required
+def inbox_view(request):
+    """The user's direct-message conversations, most recent first."""
+    conversations = Conversation.for_user(request.user).select_related(
+        'user1', 'user2', 'last_message'
+    )
+    page = paginate(request, conversations, ordering=('-last_activity', '-id'), per_page=20)
+    for conversation in page:
+        conversation.other = conversation.other_user(request.user)
+        conversation.unread = conversation.unread_for(request.user)
+    
+    return render(request, 'chat/inbox.html', {
+        'conversations': page,
+        'page': page,
+    })
+
+
 @login_required
 def direct_chat(request, user_id):
     """Direct chat page with another user."""
     other_user = get_object_or_404(User, pk=user_id)
     
-    from django.db.models import Q
     messages = DirectMessage.objects.filter(
         Q(sender=request.user, receiver=other_user) |
         Q(sender=other_user, receiver=request.user)
     ).select_related('sender', 'receiver')
     
-    # Mark messages as read
-    DirectMessage.objects.filter(
-        sender=other_user, receiver=request.user, is_read=False
-    ).update(is_read=True)
+    # Mark messages as read and let the sender's open pages know
+    inbox.mark_read(request.user.id, other_user.id)
+    conversation = Conversation.get_for_pair(request.user.id, other_user.id)
     
     return render(request, 'chat/direct.html', {
         'other_user': other_user,
         'messages': messages,
+        'partner_read_id': conversation.last_read_by(other_user.id) if conversation else 0,
     })
 
 
@@ -100,11 +168,14 @@ def send_direct_message(request, user_id):
     if not content:
         return JsonResponse({'error': 'Empty message'}, status=400)
     
-    msg = DirectMessage.objects.create(
-        sender=request.user,
-        receiver=other_user,
-        content=content
-    )
+    with transaction.atomic():
+        msg = DirectMessage.objects.create(
+            sender=request.user,
+            receiver=other_user,
+            content=content
+        )
+        Conversation.record_message(msg)
+        inbox.publish_message(msg)
     
     return JsonResponse({
         'success': True,
@@ -119,25 +190,19 @@ def send_direct_message(request, user_id):
 
 @login_required
 def get_direct_messages(request, user_id):
-    """Get direct messages with a user (AJAX polling)."""
-    other_user = get_object_or_404(User, pk=user_id)
+    """Get direct messages with a user, paged by message id."""
+    other_user = get_object_or_404(User.objects.only('id'), pk=user_id)
     
-    from django.db.models import Q
     messages = DirectMessage.objects.filter(
-        Q(sender=request.user, receiver=other_user) |
-        Q(sender=other_user, receiver=request.user)
+        Q(sender_id=request.user.id, receiver_id=other_user.id) |
+        Q(sender_id=other_user.id, receiver_id=request.user.id)
     ).select_related('sender')
     
-    return JsonResponse({
-        'messages': [
-            {
-                'id': msg.id,
-                'sender': msg.sender.name,
-                'sender_id': msg.sender.id,
-                'content': msg.content,
-                'timestamp': msg.created_at.isoformat(),
-                'is_mine': msg.sender == request.user,
-            }
-            for msg in messages
-        ]
+    return _history_response(request, messages, lambda msg: {
+        'id': msg.id,
+        'sender': msg.sender.name,
+        'sender_id': msg.sender_id,
+        'content': msg.content,
+        'timestamp': msg.created_at.isoformat(),
+        'is_mine': msg.sender_id == request.user.id,
     })
@@ -0,0 +1,298 @@
+"""
+Channel layer shared by several worker processes on one host, without Redis.
+
+A broker process (`python manage.py runchannelbroker`) owns a channels
+InMemoryChannelLayer and serves it over a Unix domain socket. Workers use
+BrokerChannelLayer, which forwards every layer call to the broker, so
+groups, message expiry, group expiry and per-channel capacity behave
+exactly as they do in the in-memory layer, only shared between processes.
+
+Wire format: each frame is a 4-byte big-endian length followed by a JSON
+object. Requests carry an `id`, an `op` and its arguments; the broker
+answers with the same `id` and either `result` or `error`. bytes values
+are sent as {"__bytes__": "<base64>"}.
+
+Receives are served concurrently; every other op from one connection is
+applied in the order it was sent, so per-process send ordering holds.
+"""
+import asyncio
+import base64
+import json
+import os
+import random
+import string
+import struct
+
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer, InMemoryChannelLayer
+
+HEADER = struct.Struct('>I')
+MAX_FRAME = 16 * 1024 * 1024
+
+
+def _encode_default(value):
+    if isinstance(value, (bytes, bytearray)):
+        return {'__bytes__': base64.b64encode(value).decode('ascii')}
+    raise TypeError(f'{type(value).__name__} is not serializable over the channel broker')
+
+
+def _decode_hook(obj):
+    if len(obj) == 1 and '__bytes__' in obj:
+        return base64.b64decode(obj['__bytes__'])
+    return obj
+
+
+async def write_frame(writer, payload):
+    body = json.dumps(payload, default=_encode_default, separators=(',', ':')).encode()
+    writer.write(HEADER.pack(len(body)) + body)
+    await writer.drain()
+
+
+async def read_frame(reader):
+    (size,) = HEADER.unpack(await reader.readexactly(HEADER.size))
+    if size > MAX_FRAME:
+        raise ConnectionError(f'Frame of {size} bytes exceeds the limit')
+    return json.loads(await reader.readexactly(size), object_hook=_decode_hook)
+
+
+class ChannelBroker:
+    """Serves one InMemoryChannelLayer to many processes over a Unix socket."""
+    
+    def __init__(self, path, **layer_config):
+        self.path = path
+        self.layer = InMemoryChannelLayer(**layer_config)
+        # InMemoryChannelLayer keeps the raw dict; get_capacity() wants (regex, value) pairs.
+        self.layer.channel_capacity = self.layer.compile_capacities(self.layer.channel_capacity)
+    
+    async def serve(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        server = await asyncio.start_unix_server(self.handle_connection, path=self.path)
+        # Only processes running as the same user may talk to the broker.
+        os.chmod(self.path, 0o600)
+        async with server:
+            await server.serve_forever()
+    
+    async def handle_connection(self, reader, writer):
+        receives = {}
+        received_on = set()
+        write_lock = asyncio.Lock()
+        
+        async def reply(request_id, result=None, error=None):
+            payload = {'id': request_id}
+            if error is None:
+                payload['result'] = result
+            else:
+                payload['error'] = error
+            async with write_lock:
+                await write_frame(writer, payload)
+        
+        async def run_receive(request_id, channel):
+            try:
+                message = await self.layer.receive(channel)
+            except asyncio.CancelledError:
+                return
+            finally:
+                receives.pop(request_id, None)
+            await reply(request_id, message)
+        
+        try:
+            while True:
+                request = await read_frame(reader)
+                request_id, op = request['id'], request['op']
+                
+                if op == 'receive':
+                    received_on.add(request['channel'])
+                    receives[request_id] = asyncio.create_task(
+                        run_receive(request_id, request['channel'])
+                    )
+                elif op == 'cancel':
+                    task = receives.pop(request['target'], None)
+                    if task:
+                        task.cancel()
+                else:
+                    try:
+                        await self.apply(request)
+                    except ChannelFull:
+                        await reply(request_id, error='full')
+                    except Exception as e:
+                        await reply(request_id, error=str(e))
+                    else:
+                        await reply(request_id)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for task in receives.values():
+                task.cancel()
+            # The worker is gone, and so are the consumers that read these channels.
+            for channel in received_on:
+                self.layer._remove_from_groups(channel)
+                self.layer.channels.pop(channel, None)
+            writer.close()
+    
+    async def apply(self, request):
+        op = request['op']
+        if op == 'send':
+            await self.layer.send(request['channel'], request['message'])
+        elif op == 'group_add':
+            await self.layer.group_add(request['group'], request['channel'])
+        elif op == 'group_discard':
+            await self.layer.group_discard(request['group'], request['channel'])
+        elif op == 'group_send':
+            await self.layer.group_send(request['group'], request['message'])
+        elif op == 'flush':
+            await self.layer.flush()
+        else:
+            raise ValueError(f'Unknown op: {op}')
+
+
+class BrokerConnection:
+    """One worker-side connection to the broker, bound to one event loop."""
+    
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.pending = {}
+        self.next_id = 0
+        self.write_lock = asyncio.Lock()
+        self.reader_task = asyncio.create_task(self.read_responses())
+    
+    @property
+    def closed(self):
+        return self.reader_task.done()
+    
+    async def read_responses(self):
+        error = ConnectionError('Channel broker connection closed')
+        try:
+            while True:
+                response = await read_frame(self.reader)
+                # A receive cancelled after the broker answered loses that
+                # message, as it would if the consumer had gone away.
+                future = self.pending.pop(response['id'], None)
+                if future is None or future.done():
+                    continue
+                if 'error' in response:
+                    future.set_exception(BrokerError(response['error']))
+                else:
+                    future.set_result(response.get('result'))
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            error = ConnectionError(f'Lost connection to the channel broker: {e}')
+        finally:
+            self.writer.close()
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            self.pending.clear()
+    
+    async def send_frame(self, payload):
+        async with self.write_lock:
+            await write_frame(self.writer, payload)
+    
+    async def call(self, op, **kwargs):
+        self.next_id += 1
+        request_id = self.next_id
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        await self.send_frame({'id': request_id, 'op': op, **kwargs})
+        try:
+            return await future
+        except asyncio.CancelledError:
+            self.pending.pop(request_id, None)
+            if op == 'receive' and not self.closed:
+                await self.send_frame({'id': 0, 'op': 'cancel', 'target': request_id})
+            raise
+    
+    async def close(self):
+        self.reader_task.cancel()
+        self.writer.close()
+
+
+class BrokerError(Exception):
+    """The broker rejected a request."""
+
+
+class BrokerChannelLayer(BaseChannelLayer):
+    """
+    Channel layer backed by a `runchannelbroker` process on this host.
+    
+    Expiry, group expiry and capacities are enforced by the broker, which
+    reads them from the same CHANNEL_LAYERS CONFIG block.
+    """
+    
+    extensions = ['groups', 'flush']
+    
+    def __init__(self, path, expiry=60, group_expiry=86400, capacity=100, channel_capacity=None, **kwargs):
+        super().__init__(expiry=expiry, capacity=capacity, channel_capacity=channel_capacity, **kwargs)
+        self.path = path
+        self.group_expiry = group_expiry
+        self.connections = {}
+        self.connect_locks = {}
+    
+    async def connection(self):
+        loop = asyncio.get_running_loop()
+        # async_to_sync callers may each bring a short-lived loop.
+        for stale in [l for l in self.connections if l.is_closed()]:
+            del self.connections[stale]
+            self.connect_locks.pop(stale, None)
+        
+        conn = self.connections.get(loop)
+        if conn is None or conn.closed:
+            lock = self.connect_locks.setdefault(loop, asyncio.Lock())
+            async with lock:
+                conn = self.connections.get(loop)
+                if conn is None or conn.closed:
+                    reader, writer = await asyncio.open_unix_connection(self.path)
+                    conn = self.connections[loop] = BrokerConnection(reader, writer)
+        return conn
+    
+    async def call(self, op, **kwargs):
+        conn = await self.connection()
+        return await conn.call(op, **kwargs)
+    
+    # Channel layer API
+    
+    async def send(self, channel, message):
+        assert isinstance(message, dict), 'message is not a dict'
+        self.require_valid_channel_name(channel)
+        assert '__asgi_channel__' not in message
+        try:
+            await self.call('send', channel=channel, message=message)
+        except BrokerError as e:
+            if str(e) == 'full':
+                raise ChannelFull(channel)
+            raise
+    
+    async def receive(self, channel):
+        self.require_valid_channel_name(channel)
+        return await self.call('receive', channel=channel)
+    
+    async def new_channel(self, prefix='specific.'):
+        return '%s.broker!%s' % (
+            prefix,
+            ''.join(random.choice(string.ascii_letters) for i in range(12)),
+        )
+    
+    async def flush(self):
+        await self.call('flush')
+    
+    async def close(self):
+        conn = self.connections.pop(asyncio.get_running_loop(), None)
+        if conn is not None:
+            await conn.close()
+    
+    # Groups extension
+    
+    async def group_add(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        await self.call('group_add', group=group, channel=channel)
+    
+    async def group_discard(self, group, channel):
+        self.require_valid_channel_name(channel)
+        self.require_valid_group_name(group)
+        await self.call('group_discard', group=group, channel=channel)
+    
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), 'Message is not a dict'
+        self.require_valid_group_name(group)
+        await self.call('group_send', group=group, message=message)
@@ -0,0 +1,177 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are selected with a WHERE on the ordering keys instead of OFFSET, so
+page 1000 costs the same as page 1 as long as an index covers the keys.
+Cursors are opaque URL-safe tokens; a bad or tampered cursor just yields the
+first page.
+"""
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.http import QueryDict
+
+
+def dump_cursor(direction, values):
+    """Opaque token for a position; `values` must be JSON-serializable."""
+    raw = json.dumps([direction, values], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def load_cursor(cursor, size):
+    """(direction, values) from dump_cursor, or None if `cursor` is not a valid token for `size` keys."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direction, values = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    if direction not in ('next', 'prev') or not isinstance(values, list) or len(values) != size:
+        return None
+    return direction, values
+
+
+class KeysetPage:
+    """One page of results plus the cursors to its neighbours."""
+    
+    def __init__(self, object_list, next_cursor=None, prev_cursor=None, query=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self._query = query
+    
+    def __iter__(self):
+        return iter(self.object_list)
+    
+    def __len__(self):
+        return len(self.object_list)
+    
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+    
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+    
+    def _querystring(self, cursor):
+        query = self._query.copy() if self._query is not None else QueryDict(mutable=True)
+        query['cursor'] = cursor
+        return query.urlencode()
+    
+    @property
+    def next_querystring(self):
+        return self._querystring(self.next_cursor) if self.has_next else ''
+    
+    @property
+    def previous_querystring(self):
+        return self._querystring(self.prev_cursor) if self.has_previous else ''
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset on a unique ordering, e.g. ('-created_at', '-id').
+    Keys may also name annotations on the queryset.
+    
+    The last key must be unique (normally the primary key) so every row has
+    a distinct position.
+    """
+    
+    def __init__(self, queryset, ordering, per_page=20):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.fields = [key.lstrip('-') for key in self.ordering]
+    
+    def model_field(self, name):
+        """The model field for an ordering key, or None for an annotation."""
+        try:
+            return self.queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+    
+    def key_field(self, name):
+        return self.model_field(name) or self.queryset.query.annotations[name].output_field
+    
+    def encode_cursor(self, obj, direction):
+        values = []
+        for name in self.fields:
+            field = self.model_field(name)
+            # Annotation values (e.g. a search rank) go in as plain JSON.
+            values.append(field.value_to_string(obj) if field else getattr(obj, name))
+        return dump_cursor(direction, values)
+    
+    def decode_cursor(self, cursor):
+        """Return (direction, values) or None if the cursor is invalid."""
+        decoded = load_cursor(cursor, len(self.fields))
+        if decoded is None:
+            return None
+        direction, values = decoded
+        try:
+            values = [
+                self.key_field(name).to_python(value)
+                for name, value in zip(self.fields, values)
+            ]
+        except (ValueError, TypeError, ValidationError):
+            return None
+        if any(value is None for value in values):
+            return None
+        return direction, values
+    
+    def _after(self, values, reverse=False):
+        """Q matching rows strictly after `values` in the paginator ordering."""
+        condition = Q()
+        for i, key in enumerate(self.ordering):
+            descending = key.startswith('-') != reverse
+            lookup = f'{self.fields[i]}__{"lt" if descending else "gt"}'
+            term = Q(**{lookup: values[i]})
+            for field, value in zip(self.fields[:i], values[:i]):
+                term &= Q(**{field: value})
+            condition |= term
+        return condition
+    
+    def page(self, cursor=None, query=None):
+        decoded = self.decode_cursor(cursor) if cursor else None
+        if decoded:
+            try:
+                return self._page(decoded, query)
+            except (ValueError, TypeError, ValidationError):
+                # Values the field accepted but the query cannot use; start over.
+                pass
+        return self._page(None, query)
+    
+    def _page(self, decoded, query):
+        size = self.per_page
+        
+        if decoded and decoded[0] == 'prev':
+            flipped = [key[1:] if key.startswith('-') else f'-{key}' for key in self.ordering]
+            rows = list(
+                self.queryset.filter(self._after(decoded[1], reverse=True)).order_by(*flipped)[:size + 1]
+            )
+            has_more_before = len(rows) > size
+            rows = rows[:size][::-1]
+            has_more_after = True
+        else:
+            qs = self.queryset.order_by(*self.ordering)
+            if decoded:
+                qs = qs.filter(self._after(decoded[1]))
+            rows = list(qs[:size + 1])
+            has_more_after = len(rows) > size
+            rows = rows[:size]
+            has_more_before = decoded is not None
+        
+        if not rows:
+            return KeysetPage([], query=query)
+        return KeysetPage(
+            rows,
+            next_cursor=self.encode_cursor(rows[-1], 'next') if has_more_after else None,
+            prev_cursor=self.encode_cursor(rows[0], 'prev') if has_more_before else None,
+            query=query,
+        )
+
+
+def paginate(request, queryset, ordering, per_page=20):
+    """Return the KeysetPage selected by the request's `cursor` parameter."""
+    paginator = KeysetPaginator(queryset, ordering, per_page=per_page)
+    return paginator.page(request.GET.get('cursor'), query=request.GET)
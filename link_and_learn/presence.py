@@ -0,0 +1,103 @@
+"""
+Write-coalescing presence tracking.
+
+Requests record a heartbeat in process memory instead of saving the user row.
+Once per flush window the pending heartbeats are written to User.last_seen /
+is_online with a single UPDATE, and users whose last heartbeat is older than
+the presence timeout are marked offline.
+
+The first heartbeat of a window schedules that flush on a timer thread, so
+an idle worker still writes what it has before `expire_presence` runs;
+anything left is flushed at interpreter exit.
+"""
+import atexit
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+
+
+class PresenceTracker:
+    """Per-process buffer of user heartbeats."""
+    
+    batch_size = 500
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._last_flush = time.monotonic()
+        self._timer = None
+    
+    def heartbeat(self, user_id, now=None):
+        with self._lock:
+            self._pending[user_id] = now or timezone.now()
+            if self._timer is None:
+                self._timer = threading.Timer(settings.PRESENCE_FLUSH_SECONDS, self._flush_on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+    
+    def forget(self, user_id):
+        """Drop a pending heartbeat, e.g. when the user logs out."""
+        with self._lock:
+            self._pending.pop(user_id, None)
+    
+    def maybe_flush(self):
+        if time.monotonic() - self._last_flush >= settings.PRESENCE_FLUSH_SECONDS:
+            self.flush()
+    
+    def _flush_on_timer(self):
+        try:
+            self.flush()
+        finally:
+            # The timer thread's connection is not closed by any request cycle
+            connection.close()
+    
+    def flush_pending(self):
+        """Flush only if heartbeats are waiting, e.g. at shutdown."""
+        if self._pending:
+            self.flush()
+    
+    def flush(self):
+        """Write pending heartbeats and expire stale users. Returns rows touched."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        
+        from django.contrib.auth import get_user_model
+        User = get_user_model()
+        
+        updated = 0
+        items = list(pending.items())
+        for start in range(0, len(items), self.batch_size):
+            batch = items[start:start + self.batch_size]
+            updated += User.objects.filter(pk__in=[user_id for user_id, _ in batch]).update(
+                is_online=True,
+                last_seen=Case(
+                    *[When(pk=user_id, then=Value(seen)) for user_id, seen in batch],
+                    output_field=DateTimeField(),
+                ),
+            )
+        return updated + expire_stale(exclude=pending.keys())
+
+
+def expire_stale(exclude=()):
+    """Mark users offline whose last heartbeat is older than the timeout."""
+    from django.contrib.auth import get_user_model
+    User = get_user_model()
+    
+    cutoff = timezone.now() - timedelta(seconds=settings.PRESENCE_TIMEOUT_SECONDS)
+    stale = User.objects.filter(is_online=True, last_seen__lt=cutoff)
+    if exclude:
+        stale = stale.exclude(pk__in=list(exclude))
+    return stale.update(is_online=False)
+
+
+tracker = PresenceTracker()
+atexit.register(tracker.flush_pending)
@@ -0,0 +1,56 @@
+"""
+Top-k selection shared by the precomputed recommenders (skill suggestions,
+partner recommendations).
+
+csr_top_k needs NumPy and SciPy matrices; top_k is its pure-Python
+counterpart for the fallback paths.
+"""
+from collections import defaultdict
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # pragma: no cover - optional dependency
+    np = sparse = None
+
+
+def top_k(pairs, k):
+    """The k (key, score) pairs with the highest scores, ties by key."""
+    return sorted(pairs, key=lambda pair: (-pair[1], pair[0]))[:k]
+
+
+def csr_top_k(matrix, k):
+    """(rows, cols, values) of each row's k largest entries, ordered by row then best first."""
+    matrix = matrix.tocsr()
+    indptr, indices, data = matrix.indptr.tolist(), matrix.indices, matrix.data
+    counts, cols, values = [], [], []
+    for row in range(matrix.shape[0]):
+        start, end = indptr[row], indptr[row + 1]
+        row_cols, row_values = indices[start:end], data[start:end]
+        if end - start > k:
+            # Everything tied with the k-th largest, so ties resolve by column as in top_k
+            threshold = np.partition(row_values, end - start - k)[end - start - k]
+            keep = row_values >= threshold
+            row_cols, row_values = row_cols[keep], row_values[keep]
+        order = np.lexsort((row_cols, -row_values))[:k]
+        counts.append(len(order))
+        cols.append(row_cols[order])
+        values.append(row_values[order])
+    if not counts:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64), np.array([])
+    rows = np.repeat(np.arange(len(counts)), counts)
+    return rows, np.concatenate(cols), np.concatenate(values)
+
+
+def csr_prune(matrix, k):
+    """Keep each row's k largest entries."""
+    rows, cols, values = csr_top_k(matrix, k)
+    return sparse.csr_matrix((values, (rows, cols)), shape=matrix.shape)
+
+
+def csr_grouped(rows, cols, values, row_keys, col_keys):
+    """{row key: [(col key, value)]} from csr_top_k output, mapping indices through the key arrays."""
+    grouped = defaultdict(list)
+    for row, col, value in zip(row_keys[rows].tolist(), col_keys[cols].tolist(), values.tolist()):
+        grouped[row].append((col, value))
+    return grouped
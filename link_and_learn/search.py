@@ -0,0 +1,114 @@
+"""
+Full-text search over users and their learning request topics.
+
+On SQLite, `requests_search_index` is an FTS5 table with one row per user
+(rowid = user id) holding their name and the topics of all their requests
+in the `name`, `learn` and `teach` columns. Triggers on the user and
+request tables keep it in sync on every insert, update and delete, so
+nothing in Django writes to it (see requests_app migration 0004).
+
+Queries match every word as a prefix ("pyth" finds "Python") and rank
+rows with bm25, name matches weighing most. Topic columns also hold the
+normalized topics (requests_app.topics), and topic queries match either
+form. On databases without the index
+the same calls fall back to icontains filters.
+"""
+import re
+
+from django.db import connection, models
+from django.db.models import F, Q
+
+TABLE = 'requests_search_index'
+COLUMNS = ('name', 'learn', 'teach')
+
+# Fallback lookups per index column, from the user model.
+FALLBACK_LOOKUPS = {
+    'name': 'name__icontains',
+    'learn': 'learning_requests__topic_to_learn__icontains',
+    'teach': 'learning_requests__topic_to_teach__icontains',
+}
+
+_available = None
+
+
+class FullTextField(models.TextField):
+    """The FTS5 hidden column named after its table; only supports `match`."""
+
+
+@FullTextField.register_lookup
+class Match(models.Lookup):
+    """`document__match=expr` -> `document MATCH expr` (FTS5 query syntax)."""
+    
+    lookup_name = 'match'
+    
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+def is_available():
+    """Whether the FTS5 index exists on the default database."""
+    global _available
+    if _available is None:
+        _available = connection.vendor == 'sqlite' and TABLE in connection.introspection.table_names()
+    return _available
+
+
+def words(text):
+    return re.findall(r'\w+', text or '')
+
+
+def match_expression(text, columns=None):
+    """
+    FTS5 query requiring every word of `text` as a prefix, optionally
+    limited to some columns. None if `text` has no words.
+    """
+    terms = ' '.join(f'"{word}"*' for word in words(text))
+    if not terms:
+        return None
+    if columns:
+        return f"{{{' '.join(columns)}}} : ({terms})"
+    return f'({terms})'
+
+
+def search_users(users, **fields):
+    """
+    Narrow a User queryset to matches and return (queryset, ordering) for
+    paginate(). Keyword arguments map a column ('name', 'learn', 'teach',
+    or 'any' for all three) to the text searched there; all must match.
+    
+    With the index, results are ranked best first; without it they keep
+    the newest-first order of the user lists.
+    """
+    fields = {column: text for column, text in fields.items() if words(text)}
+    if not fields:
+        return users, ('-date_joined', '-id')
+    
+    if not is_available():
+        for column, text in fields.items():
+            columns = COLUMNS if column == 'any' else (column,)
+            condition = Q()
+            for lookup in columns:
+                condition |= Q(**{FALLBACK_LOOKUPS[lookup]: text.strip()})
+            users = users.filter(condition)
+        return users.distinct(), ('-date_joined', '-id')
+    
+    from requests_app.topics import normalize
+    
+    terms = []
+    for column, text in fields.items():
+        columns = None if column == 'any' else (column,)
+        expression = match_expression(text, columns)
+        if column != 'name':
+            # Topics are indexed normalized too, so "JS" also finds "JavaScript".
+            normalized = match_expression(normalize(text), columns)
+            if normalized and normalized != expression:
+                expression = f'({expression} OR {normalized})'
+        terms.append(expression)
+    expression = ' AND '.join(terms)
+    users = users.filter(search_entry__document__match=expression).annotate(
+        search_rank=F('search_entry__rank')
+    )
+    # bm25 scores are negative; lower is a better match.
+    return users, ('search_rank', '-id')
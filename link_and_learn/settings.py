@@ -105,14 +105,97 @@ LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'home'
 
 # Django Channels
-CHANNEL_LAYERS = {
-    'default': {
-        'BACKEND': 'channels.layers.InMemoryChannelLayer',
-    },
-}
+# Set CHANNEL_BROKER_SOCKET to run several workers against `manage.py runchannelbroker`
+CHANNEL_BROKER_SOCKET = os.environ.get('CHANNEL_BROKER_SOCKET', '')
+
+if CHANNEL_BROKER_SOCKET:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'link_and_learn.channel_layer.BrokerChannelLayer',
+            'CONFIG': {
+                'path': CHANNEL_BROKER_SOCKET,
+            },
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        },
+    }
+
+# Cache
+# Shared by every worker, so cache invalidation (browse feed version, bank
+# total) is seen by all of them. Set CACHE_URL=redis://... to use Redis.
+CACHE_URL = os.environ.get('CACHE_URL', '')
+
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'link_and_learn_cache',
+        },
+    }
 
 # Bank Configuration
 SUPPORT_CREDIT_COOLDOWN_HOURS = 24
 CREDITS_PER_5_MINUTES = 1
 BANK_CUT_PERCENTAGE = 10
 INITIAL_USER_CREDITS = 15
+BANK_SHARD_COUNT = 8
+BANK_TOTAL_CACHE_SECONDS = 30
+
+# Presence Configuration
+PRESENCE_FLUSH_SECONDS = 60
+PRESENCE_TIMEOUT_SECONDS = 300
+
+# Whiteboard Configuration
+WHITEBOARD_SNAPSHOT_EVERY = 100
+
+# Collaborative IDE Configuration
+IDE_CHECKPOINT_EVERY = 50
+# How long a worker keeps a session's document without editor traffic
+IDE_OWNER_LEASE_SECONDS = 120
+
+# Room Event Batching
+# Whiteboard, IDE and video events are fanned out once per tick; 0 sends each immediately
+ROOM_BATCH_TICK_MS = 25
+
+# Chat Persistence
+# Session chat messages are written in batches of up to CHAT_BUFFER_SIZE,
+# at most CHAT_BUFFER_SECONDS after they are sent
+CHAT_BUFFER_SIZE = 50
+CHAT_BUFFER_SECONDS = 1.0
+
+# Request Matching
+# Each process's match index picks up other processes' writes this often
+MATCH_INDEX_SYNC_SECONDS = 30
+
+# Topic Similarity
+# Minimum trigram similarity (0-1) for fuzzy topic matches
+TOPIC_SIMILARITY_THRESHOLD = 0.4
+
+# Skill Suggestions
+# Top suggestions / related skills stored per user and per skill, and how many
+# co-occurring skills each skill contributes to a user's scores
+SKILL_SUGGESTIONS_TOP_K = 10
+SKILL_NEIGHBOURS = 50
+
+# Partner Recommendations
+# People stored per user by `recommend_partners`, hops walked over the session
+# graph, and how many people each walk keeps between hops
+PARTNER_RECOMMENDATIONS_TOP_N = 10
+PARTNER_WALK_STEPS = 3
+PARTNER_WALK_FRONTIER = 200
+
+# Browse Feed
+# How long the cached feed of open requests (and each process's copy) lives;
+# request writes invalidate it sooner, creator cards can lag this long
+BROWSE_FEED_CACHE_SECONDS = 60
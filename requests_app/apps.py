@@ -1,7 +1,34 @@
 from django.apps import AppConfig
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+
+def index_saved_request(sender, instance, **kwargs):
+    from .matching import index
+    transaction.on_commit(lambda: index.request_saved(instance))
+
+
+def unindex_deleted_request(sender, instance, **kwargs):
+    from .matching import index
+    request_id = instance.pk
+    transaction.on_commit(lambda: index.request_deleted(request_id))
+
+
+def invalidate_browse_feed(sender, instance, **kwargs):
+    from . import feed
+    transaction.on_commit(feed.invalidate)
 
 
 class RequestsAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'requests_app'
     verbose_name = 'Learning Requests'
+    
+    def ready(self):
+        # Keep this process's match index current as requests change.
+        LearningRequest = self.get_model('LearningRequest')
+        post_save.connect(index_saved_request, sender=LearningRequest)
+        post_delete.connect(unindex_deleted_request, sender=LearningRequest)
+        # Saves (including completion) and deletes change the browse feed.
+        post_save.connect(invalidate_browse_feed, sender=LearningRequest)
+        post_delete.connect(invalidate_browse_feed, sender=LearningRequest)
@@ -0,0 +1,169 @@
+"""
+Cached browse feed of open learning requests.
+
+Browse mode of all_requests shows every open request, newest first, with
+a card for its creator. Instead of querying per hit, the whole feed is
+built once as a list of small tuples with the creator card embedded and
+stored in the cache under the current feed version. Every LearningRequest
+save or delete replaces the version with a fresh random token when it
+commits (see RequestsAppConfig.ready), so the next hit rebuilds it. The
+version lives in the shared cache (CACHES), so a save in one worker reaches
+them all. It is overwritten rather than incremented because incr is a
+read-then-write on the database cache: two concurrent saves could both
+write the same next number, leaving a feed built between them current.
+
+Each process also keeps the last feed it loaded, so a hit on an unchanged
+feed costs one cache read of the version. Hiding the viewer's own requests
+and the bounty filter run over that list in memory, walking only as far
+as a page needs.
+
+Creator cards (name, rating, online status) can lag by up to
+BROWSE_FEED_CACHE_SECONDS, since edits to users do not change the version.
+"""
+import threading
+import time
+import uuid
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from link_and_learn.pagination import KeysetPage, dump_cursor, load_cursor
+
+VERSION_KEY = 'requests:browse_feed:version'
+FEED_KEY = 'requests:browse_feed:{version}'
+
+Creator = namedtuple('Creator', 'id name is_online average_rating total_reviews')
+FeedEntry = namedtuple('FeedEntry', 'id creator topic_to_learn topic_to_teach ok_with_just_learning created_at')
+
+
+def current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate():
+    """Make the next read rebuild the feed."""
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def build():
+    """Every open request as FeedEntry, oldest first."""
+    from .models import LearningRequest
+    
+    rows = LearningRequest.get_active_requests().order_by('created_at', 'id').values_list(
+        'id', 'topic_to_learn', 'topic_to_teach', 'ok_with_just_learning', 'created_at',
+        'creator_id', 'creator__name', 'creator__is_online', 'creator__rating_sum', 'creator__review_count',
+    )
+    entries = []
+    creators = {}
+    for (request_id, learn, teach, ok_with_just_learning, created_at,
+         creator_id, name, is_online, rating_sum, review_count) in rows.iterator(chunk_size=2000):
+        creator = creators.get(creator_id)
+        if creator is None:
+            creator = creators[creator_id] = Creator(
+                creator_id, name, is_online, rating_sum / review_count if review_count else None, review_count,
+            )
+        entries.append(FeedEntry(request_id, creator, learn, teach, ok_with_just_learning, created_at))
+    return entries
+
+
+def cursor_position(values):
+    """The (created_at, id) key of a cursor's values, or None if malformed."""
+    created_at, request_id = values
+    try:
+        created_at, request_id = parse_datetime(created_at), int(request_id)
+    except (ValueError, TypeError):
+        return None
+    if created_at is None or timezone.is_naive(created_at):
+        return None
+    return created_at, request_id
+
+
+class BrowseFeed:
+    """This process's copy of the cached feed."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key = None
+        self._expires = 0.0
+        self._entries = []
+        self._positions = []
+    
+    def entries(self):
+        """(entries oldest first, their (created_at, id) keys), rebuilding if stale."""
+        key = FEED_KEY.format(version=current_version())
+        now = time.monotonic()
+        with self._lock:
+            if key == self._key and now < self._expires:
+                return self._entries, self._positions
+        
+        entries = cache.get(key)
+        if entries is None:
+            entries = build()
+            cache.set(key, entries, settings.BROWSE_FEED_CACHE_SECONDS)
+        positions = [(entry.created_at, entry.id) for entry in entries]
+        with self._lock:
+            self._key, self._expires = key, now + settings.BROWSE_FEED_CACHE_SECONDS
+            self._entries, self._positions = entries, positions
+        return entries, positions
+    
+    def page(self, cursor=None, query=None, exclude_user_id=None, bounty_only=False, per_page=30):
+        """
+        A KeysetPage of the feed, newest first, with the same cursors as
+        paginate(..., ordering=('-created_at', '-id')).
+        """
+        entries, positions = self.entries()
+        
+        def wanted(entry):
+            return entry.creator.id != exclude_user_id and (entry.ok_with_just_learning or not bounty_only)
+        
+        def collect(indexes):
+            found = []
+            for i in indexes:
+                if wanted(entries[i]):
+                    found.append(entries[i])
+                    if len(found) > per_page:
+                        break
+            return found
+        
+        decoded = load_cursor(cursor, 2) if cursor else None
+        position = cursor_position(decoded[1]) if decoded else None
+        if position is None:
+            decoded = None
+        
+        if decoded and decoded[0] == 'prev':
+            # Newer than the cursor, nearest first
+            rows = collect(range(bisect_right(positions, position), len(entries)))
+            has_more_before = len(rows) > per_page
+            rows = rows[:per_page][::-1]
+            has_more_after = True
+        else:
+            end = bisect_left(positions, position) if decoded else len(entries)
+            rows = collect(range(end - 1, -1, -1))
+            has_more_after = len(rows) > per_page
+            rows = rows[:per_page]
+            has_more_before = decoded is not None
+        
+        if not rows:
+            return KeysetPage([], query=query)
+        
+        def cursor_for(entry, direction):
+            # Encoded like Field.value_to_string, so tokens match paginate()'s
+            return dump_cursor(direction, [entry.created_at.isoformat(), str(entry.id)])
+        
+        return KeysetPage(
+            rows,
+            next_cursor=cursor_for(rows[-1], 'next') if has_more_after else None,
+            prev_cursor=cursor_for(rows[0], 'prev') if has_more_before else None,
+            query=query,
+        )
+
+
+feed = BrowseFeed()
@@ -0,0 +1,14 @@
+"""
+Renormalize request topics and rebuild their trigram index.
+"""
+from django.core.management.base import BaseCommand
+
+from requests_app.models import LearningRequest
+
+
+class Command(BaseCommand):
+    help = 'Recompute normalized topics and topic trigrams for all learning requests.'
+    
+    def handle(self, *args, **options):
+        updated = LearningRequest.rebuild_topic_index()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt topic index for {updated} requests.'))
@@ -0,0 +1,211 @@
+"""
+Reciprocal teach/learn matching over open learning requests.
+
+Each process keeps an inverted index from normalized topic tokens (as
+LearningRequest stores them on save) to the open requests that want to
+learn them (`learners`) and that offer to teach them (`teachers`). Finding partners for a request is a few set lookups: people
+who teach what it wants to learn, and people who want what it can teach.
+
+Scores, best first:
+  - mutual exchanges (each side teaches the other) score 2-3,
+  - one-way matches score up to 1, halved when the learning side has not
+    said it is happy to just learn and pay credits (ok_with_just_learning),
+  - the partner's average rating nudges either by up to +/-10%.
+
+Saves and deletes in this process update the index when they commit
+(see RequestsAppConfig.ready). Writes made by other processes are picked up
+every MATCH_INDEX_SYNC_SECONDS by diffing the open request ids.
+"""
+import heapq
+import threading
+import time
+from collections import Counter, defaultdict, namedtuple
+
+from django.conf import settings
+
+from . import topics
+
+Entry = namedtuple('Entry', 'id creator_id learn teach ok_with_just_learning')
+Match = namedtuple('Match', 'request_id user_id score mutual teaches learns')
+
+FIELDS = ('id', 'creator_id', 'normalized_learn', 'normalized_teach', 'ok_with_just_learning')
+
+
+def topic_tokens(text):
+    """Normalized tokens of a free-text topic (see requests_app.topics)."""
+    return frozenset(topics.tokens(text))
+
+
+def rating_factor(rating):
+    """0.9-1.1 for an average rating of 0-5 stars; 1.0 when unrated."""
+    if rating is None:
+        return 1.0
+    return 0.9 + 0.2 * rating / 5
+
+
+class MatchIndex:
+    """Per-process inverted index of open requests by topic token."""
+    
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.entries = {}
+        self.learners = defaultdict(set)
+        self.teachers = defaultdict(set)
+        self.ratings = {}
+        self.built = False
+        self._last_sync = 0.0
+    
+    # Maintenance
+    
+    def _add(self, row):
+        entry = Entry(
+            row['id'], row['creator_id'],
+            # Stored already normalized; only queries are normalized here.
+            frozenset(row['normalized_learn'].split()), frozenset(row['normalized_teach'].split()),
+            row['ok_with_just_learning'],
+        )
+        self._remove(entry.id)
+        self.entries[entry.id] = entry
+        for token in entry.learn:
+            self.learners[token].add(entry.id)
+        for token in entry.teach:
+            self.teachers[token].add(entry.id)
+    
+    def _remove(self, request_id):
+        entry = self.entries.pop(request_id, None)
+        if entry is None:
+            return
+        for index, tokens in ((self.learners, entry.learn), (self.teachers, entry.teach)):
+            for token in tokens:
+                ids = index[token]
+                ids.discard(request_id)
+                if not ids:
+                    del index[token]
+    
+    def _set_rating(self, user_id, rating_sum, review_count):
+        self.ratings[user_id] = rating_sum / review_count if review_count else None
+    
+    def build(self):
+        """Load every open request."""
+        from .models import LearningRequest
+        
+        rows = list(LearningRequest.get_active_requests().values(
+            *FIELDS, 'creator__rating_sum', 'creator__review_count'
+        ))
+        with self._lock:
+            self.entries.clear()
+            self.learners.clear()
+            self.teachers.clear()
+            self.ratings.clear()
+            for row in rows:
+                self._add(row)
+                self._set_rating(row['creator_id'], row['creator__rating_sum'], row['creator__review_count'])
+            self.built = True
+            self._last_sync = time.monotonic()
+    
+    def sync(self):
+        """Catch up with other processes' writes and refresh ratings."""
+        from .models import LearningRequest
+        
+        # Only entries indexed before the query can be judged closed by it.
+        with self._lock:
+            known = set(self.entries)
+        open_rows = list(LearningRequest.get_active_requests().values_list(
+            'id', 'creator_id', 'creator__rating_sum', 'creator__review_count'
+        ))
+        open_ids = set()
+        with self._lock:
+            for request_id, creator_id, rating_sum, review_count in open_rows:
+                open_ids.add(request_id)
+                self._set_rating(creator_id, rating_sum, review_count)
+            for request_id in known - open_ids:
+                self._remove(request_id)
+            missing = list(open_ids - set(self.entries))
+        
+        for start in range(0, len(missing), 500):
+            rows = list(LearningRequest.get_active_requests().filter(pk__in=missing[start:start + 500]).values(*FIELDS))
+            with self._lock:
+                for row in rows:
+                    self._add(row)
+        self._last_sync = time.monotonic()
+    
+    def ensure_fresh(self):
+        if not self.built:
+            self.build()
+        elif time.monotonic() - self._last_sync >= settings.MATCH_INDEX_SYNC_SECONDS:
+            self.sync()
+    
+    def request_saved(self, learning_request):
+        if not self.built:
+            return
+        with self._lock:
+            if learning_request.is_completed:
+                self._remove(learning_request.pk)
+            else:
+                self._add({
+                    'id': learning_request.pk,
+                    'creator_id': learning_request.creator_id,
+                    'normalized_learn': learning_request.normalized_learn,
+                    'normalized_teach': learning_request.normalized_teach,
+                    'ok_with_just_learning': learning_request.ok_with_just_learning,
+                })
+    
+    def request_deleted(self, request_id):
+        with self._lock:
+            self._remove(request_id)
+    
+    # Queries
+    
+    def find(self, learn, teach='', ok_with_just_learning=False, exclude_user_id=None, limit=20):
+        """
+        Best partners for someone who wants to learn `learn` and can teach
+        `teach`, one Match (their best request) per user.
+        """
+        self.ensure_fresh()
+        want, offer = topic_tokens(learn), topic_tokens(teach)
+        
+        with self._lock:
+            teaches = Counter()
+            for token in want:
+                teaches.update(self.teachers.get(token, ()))
+            learns = Counter()
+            for token in offer:
+                learns.update(self.learners.get(token, ()))
+            
+            best = {}
+            for request_id in teaches.keys() | learns.keys():
+                entry = self.entries[request_id]
+                if entry.creator_id == exclude_user_id:
+                    continue
+                # Share of what I want that they teach, and of what they want that I teach
+                gives = teaches[request_id] / len(want) if want else 0
+                gets = learns[request_id] / len(entry.learn) if entry.learn else 0
+                if gives and gets:
+                    score = 2 + (gives + gets) / 2
+                elif gives:
+                    score = gives * (1.0 if ok_with_just_learning else 0.5)
+                else:
+                    score = gets * (1.0 if entry.ok_with_just_learning else 0.5)
+                score *= rating_factor(self.ratings.get(entry.creator_id))
+                
+                current = best.get(entry.creator_id)
+                if current is None or score > current.score:
+                    best[entry.creator_id] = Match(
+                        request_id, entry.creator_id, score,
+                        mutual=bool(gives and gets), teaches=bool(gives), learns=bool(gets),
+                    )
+        
+        return heapq.nlargest(limit, best.values(), key=lambda match: (match.score, match.request_id))
+    
+    def matches_for(self, learning_request, limit=20):
+        """Partners for one of a user's own requests."""
+        return self.find(
+            learning_request.topic_to_learn,
+            learning_request.topic_to_teach,
+            ok_with_just_learning=learning_request.ok_with_just_learning,
+            exclude_user_id=learning_request.creator_id,
+            limit=limit,
+        )
+
+
+index = MatchIndex()
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests_app', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='learningrequest',
+            index=models.Index(fields=['is_completed', '-created_at', '-id'], name='request_open_created_idx'),
+        ),
+    ]
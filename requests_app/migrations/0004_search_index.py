@@ -0,0 +1,88 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:33
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import link_and_learn.search
+
+INDEX = 'requests_search_index'
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    users = apps.get_model('users', 'User')._meta.db_table
+    requests = apps.get_model('requests_app', 'LearningRequest')._meta.db_table
+    
+    def topics(column, creator):
+        return (
+            f"coalesce((SELECT group_concat({column}, ' ') FROM {requests} "
+            f"WHERE creator_id = {creator}), '')"
+        )
+    
+    def refresh(creator):
+        return (
+            f"UPDATE {INDEX} SET learn = {topics('topic_to_learn', creator)}, "
+            f"teach = {topics('topic_to_teach', creator)} WHERE rowid = {creator};"
+        )
+    
+    statements = [
+        # Prefix indexes keep short "pyth"* style queries from scanning every term.
+        f"CREATE VIRTUAL TABLE {INDEX} USING fts5("
+        f"name, learn, teach, tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"INSERT INTO {INDEX}({INDEX}, rank) VALUES ('rank', 'bm25(10.0, 4.0, 4.0)')",
+        f"INSERT INTO {INDEX}(rowid, name, learn, teach) "
+        f"SELECT u.id, u.name, {topics('topic_to_learn', 'u.id')}, {topics('topic_to_teach', 'u.id')} "
+        f"FROM {users} u",
+        f"CREATE TRIGGER {INDEX}_user_insert AFTER INSERT ON {users} BEGIN "
+        f"INSERT INTO {INDEX}(rowid, name, learn, teach) VALUES (new.id, new.name, '', ''); END",
+        f"CREATE TRIGGER {INDEX}_user_update AFTER UPDATE OF name ON {users} BEGIN "
+        f"UPDATE {INDEX} SET name = new.name WHERE rowid = new.id; END",
+        f"CREATE TRIGGER {INDEX}_user_delete AFTER DELETE ON {users} BEGIN "
+        f"DELETE FROM {INDEX} WHERE rowid = old.id; END",
+        f"CREATE TRIGGER {INDEX}_request_insert AFTER INSERT ON {requests} BEGIN "
+        f"{refresh('new.creator_id')} END",
+        f"CREATE TRIGGER {INDEX}_request_update "
+        f"AFTER UPDATE OF topic_to_learn, topic_to_teach, creator_id ON {requests} BEGIN "
+        f"{refresh('old.creator_id')} {refresh('new.creator_id')} END",
+        f"CREATE TRIGGER {INDEX}_request_delete AFTER DELETE ON {requests} BEGIN "
+        f"{refresh('old.creator_id')} END",
+    ]
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for trigger in ('user_insert', 'user_update', 'user_delete',
+                    'request_insert', 'request_update', 'request_delete'):
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {INDEX}_{trigger}')
+    schema_editor.execute(f'DROP TABLE IF EXISTS {INDEX}')
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ('users', '0007_session_state'),
+        ('requests_app', '0003_keyset_pagination_indexes'),
+    ]
+    
+    operations = [
+        migrations.CreateModel(
+            name='UserSearchEntry',
+            fields=[
+                ('user', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('name', models.TextField()),
+                ('learn', models.TextField()),
+                ('teach', models.TextField()),
+                ('rank', models.FloatField()),
+                ('document', link_and_learn.search.FullTextField(db_column='requests_search_index')),
+            ],
+            options={
+                'db_table': 'requests_search_index',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
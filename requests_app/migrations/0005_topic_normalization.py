@@ -0,0 +1,231 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:39
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+INDEX = 'requests_search_index'
+
+
+# Frozen copy of requests_app.topics as of this migration, so later changes
+# to the synonym table or stemmer don't change what this migration writes.
+# `manage.py rebuild_topic_index` renormalizes with the current rules.
+
+STOP_WORDS = frozenset({
+    'a', 'an', 'and', 'basics', 'for', 'how', 'i', 'in', 'intro', 'introduction',
+    'learn', 'learning', 'of', 'on', 'or', 'teach', 'the', 'to', 'with',
+})
+
+# Words or phrases -> canonical token. Canonical tokens are never stemmed.
+SYNONYMS = {
+    'js': 'javascript',
+    'java script': 'javascript',
+    'ecmascript': 'javascript',
+    'es6': 'javascript',
+    'ts': 'typescript',
+    'type script': 'typescript',
+    'py': 'python',
+    'python3': 'python',
+    'node': 'nodejs',
+    'node js': 'nodejs',
+    'reactjs': 'react',
+    'react js': 'react',
+    'vuejs': 'vue',
+    'vue js': 'vue',
+    'golang': 'go',
+    'cpp': 'c++',
+    'c plus plus': 'c++',
+    'csharp': 'c#',
+    'c sharp': 'c#',
+    'postgres': 'postgresql',
+    'k8s': 'kubernetes',
+    'ml': 'machinelearning',
+    'machine learning': 'machinelearning',
+    'ai': 'artificialintelligence',
+    'artificial intelligence': 'artificialintelligence',
+    'db': 'database',
+    'dbs': 'database',
+    'math': 'mathematics',
+    'maths': 'mathematics',
+    'espanol': 'spanish',
+}
+CANONICAL = frozenset(SYNONYMS.values())
+MAX_PHRASE = max(len(phrase.split()) for phrase in SYNONYMS)
+
+# (suffix, replacement), first match wins; the stem must keep 3+ letters.
+SUFFIXES = (
+    ('ies', 'y'),
+    ('ing', ''),
+    ('ers', ''),
+    ('er', ''),
+    ('ed', ''),
+    ('es', ''),
+    ('s', ''),
+)
+
+
+def stem(word):
+    """Light suffix stripping; enough to fold plurals and -ing/-ed/-er forms."""
+    if len(word) <= 3 or not word.isalpha():
+        return word
+    for suffix, replacement in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3 and not word.endswith('ss'):
+            word = word[:-len(suffix)] + replacement
+            if suffix in ('ing', 'ed', 'er', 'ers') and word[-1] == word[-2] and word[-1] not in 'lsz':
+                word = word[:-1]  # running -> run
+            break
+    if word.endswith('e') and len(word) > 3:
+        word = word[:-1]  # code, coding -> cod
+    return word
+
+
+def words(text):
+    text = unicodedata.normalize('NFKD', (text or '').lower())
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return re.findall(r'[\w+#]+', text)
+
+
+def tokens(text):
+    """Normalized tokens of a topic, in order, without repeats."""
+    raw = words(text)
+    result = []
+    i = 0
+    while i < len(raw):
+        for size in range(min(MAX_PHRASE, len(raw) - i), 0, -1):
+            canonical = SYNONYMS.get(' '.join(raw[i:i + size]))
+            if canonical:
+                token = canonical
+                i += size
+                break
+        else:
+            word = raw[i]
+            i += 1
+            if word in STOP_WORDS:
+                continue
+            token = word if word in CANONICAL else stem(word)
+        if token not in result:
+            result.append(token)
+    return result
+
+
+def normalize(text):
+    return ' '.join(tokens(text))
+
+
+def word_trigrams(word):
+    """Trigrams of one word, padded like pg_trgm ('  py', ' py', ..., 'on ')."""
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def trigrams(normalized):
+    """All word trigrams of a normalized topic."""
+    grams = set()
+    for word in normalized.split():
+        grams |= word_trigrams(word)
+    return grams
+
+
+def populate_normalized_topics(apps, schema_editor):
+    LearningRequest = apps.get_model('requests_app', 'LearningRequest')
+    TopicTrigram = apps.get_model('requests_app', 'TopicTrigram')
+    
+    requests = list(LearningRequest.objects.only('id', 'topic_to_learn', 'topic_to_teach'))
+    grams = []
+    for req in requests:
+        req.normalized_learn = normalize(req.topic_to_learn)[:255]
+        req.normalized_teach = normalize(req.topic_to_teach)[:255]
+        for side, normalized in (('learn', req.normalized_learn), ('teach', req.normalized_teach)):
+            grams.extend(
+                TopicTrigram(request_id=req.id, side=side, trigram=gram)
+                for gram in sorted(trigrams(normalized))
+            )
+    LearningRequest.objects.bulk_update(requests, ['normalized_learn', 'normalized_teach'], batch_size=500)
+    TopicTrigram.objects.bulk_create(grams, batch_size=500)
+
+
+def search_index_triggers(apps, schema_editor, normalized):
+    """(Re)create the search index's request triggers, optionally indexing normalized topics too."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    requests = apps.get_model('requests_app', 'LearningRequest')._meta.db_table
+    
+    def topics_sql(side, creator):
+        column = f"topic_to_{side} || ' ' || normalized_{side}" if normalized else f'topic_to_{side}'
+        return (
+            f"coalesce((SELECT group_concat({column}, ' ') FROM {requests} "
+            f"WHERE creator_id = {creator}), '')"
+        )
+    
+    def refresh(creator):
+        return (
+            f"UPDATE {INDEX} SET learn = {topics_sql('learn', creator)}, "
+            f"teach = {topics_sql('teach', creator)} WHERE rowid = {creator};"
+        )
+    
+    watched = 'topic_to_learn, topic_to_teach, creator_id'
+    if normalized:
+        watched += ', normalized_learn, normalized_teach'
+    statements = [
+        f'DROP TRIGGER IF EXISTS {INDEX}_request_insert',
+        f'DROP TRIGGER IF EXISTS {INDEX}_request_update',
+        f'DROP TRIGGER IF EXISTS {INDEX}_request_delete',
+        f"CREATE TRIGGER {INDEX}_request_insert AFTER INSERT ON {requests} BEGIN "
+        f"{refresh('new.creator_id')} END",
+        f"CREATE TRIGGER {INDEX}_request_update AFTER UPDATE OF {watched} ON {requests} BEGIN "
+        f"{refresh('old.creator_id')} {refresh('new.creator_id')} END",
+        f"CREATE TRIGGER {INDEX}_request_delete AFTER DELETE ON {requests} BEGIN "
+        f"{refresh('old.creator_id')} END",
+        f"UPDATE {INDEX} SET learn = {topics_sql('learn', f'{INDEX}.rowid')}, "
+        f"teach = {topics_sql('teach', f'{INDEX}.rowid')}",
+    ]
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def index_normalized_topics(apps, schema_editor):
+    search_index_triggers(apps, schema_editor, normalized=True)
+
+
+def index_raw_topics(apps, schema_editor):
+    search_index_triggers(apps, schema_editor, normalized=False)
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ('requests_app', '0004_search_index'),
+    ]
+    
+    operations = [
+        migrations.AddField(
+            model_name='learningrequest',
+            name='normalized_learn',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='learningrequest',
+            name='normalized_teach',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.CreateModel(
+            name='TopicTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('side', models.CharField(choices=[('learn', 'Wants to learn'), ('teach', 'Can teach')], max_length=5)),
+                ('trigram', models.CharField(max_length=3)),
+                ('request', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='topic_trigrams', to='requests_app.learningrequest')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['trigram', 'side'], name='topic_trigram_lookup_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='topictrigram',
+            constraint=models.UniqueConstraint(fields=('request', 'side', 'trigram'), name='topic_trigram_unique'),
+        ),
+        migrations.RunPython(populate_normalized_topics, migrations.RunPython.noop),
+        migrations.RunPython(index_normalized_topics, index_raw_topics),
+    ]
@@ -1,9 +1,14 @@
 """
 Learning Request models.
 """
-from django.db import models
+import math
+
+from django.db import models, transaction
 from django.conf import settings
 
+from link_and_learn.search import FullTextField
+from . import topics
+
 
 class LearningRequest(models.Model):
     """
@@ -39,15 +44,35 @@ class LearningRequest(models.Model):
         default=False,
         help_text='Whether this request has been fulfilled'
     )
+    # Filled in on save by topics.normalize()
+    normalized_learn = models.CharField(max_length=255, blank=True, default='', editable=False)
+    normalized_teach = models.CharField(max_length=255, blank=True, default='', editable=False)
     
     class Meta:
         verbose_name = 'learning request'
         verbose_name_plural = 'learning requests'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['is_completed', '-created_at', '-id'], name='request_open_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.creator.name} wants to learn: {self.topic_to_learn}"
     
+    def save(self, *args, **kwargs):
+        """Store normalized topics and their trigrams alongside the raw text."""
+        update_fields = kwargs.get('update_fields')
+        topics_changed = update_fields is None or {'topic_to_learn', 'topic_to_teach'} & set(update_fields)
+        if topics_changed:
+            self.normalized_learn = topics.normalize(self.topic_to_learn)[:255]
+            self.normalized_teach = topics.normalize(self.topic_to_teach)[:255]
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'normalized_learn', 'normalized_teach'}
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if topics_changed:
+                TopicTrigram.index_request(self)
+    
     @classmethod
     def get_active_requests(cls):
         """Return all active (not completed) requests."""
@@ -57,3 +82,137 @@ class LearningRequest(models.Model):
         """Mark this request as completed."""
         self.is_completed = True
         self.save(update_fields=['is_completed'])
+    
+    @classmethod
+    def creators_with_similar_topics(cls, text, sides=('learn', 'teach'), limit=30):
+        """Ids of users with open requests on topics similar to `text`, best first."""
+        similar = TopicTrigram.similar(text, sides=sides, limit=limit)
+        creators = dict(cls.objects.filter(pk__in=[row[0] for row in similar]).values_list('id', 'creator_id'))
+        return list(dict.fromkeys(creators[row[0]] for row in similar if row[0] in creators))
+    
+    @classmethod
+    def rebuild_topic_index(cls, batch_size=500):
+        """Renormalize every request, e.g. after the synonym table changes."""
+        requests = list(cls.objects.only('id', 'topic_to_learn', 'topic_to_teach'))
+        for req in requests:
+            req.normalized_learn = topics.normalize(req.topic_to_learn)[:255]
+            req.normalized_teach = topics.normalize(req.topic_to_teach)[:255]
+        with transaction.atomic():
+            cls.objects.bulk_update(requests, ['normalized_learn', 'normalized_teach'], batch_size=batch_size)
+            TopicTrigram.objects.all().delete()
+            TopicTrigram.objects.bulk_create(
+                [gram for req in requests for gram in TopicTrigram.rows_for(req)],
+                batch_size=batch_size,
+            )
+        return len(requests)
+
+
+class TopicTrigram(models.Model):
+    """One trigram of a request's normalized learn or teach topic."""
+    
+    SIDE_CHOICES = [
+        ('learn', 'Wants to learn'),
+        ('teach', 'Can teach'),
+    ]
+    
+    request = models.ForeignKey(
+        LearningRequest,
+        on_delete=models.CASCADE,
+        related_name='topic_trigrams'
+    )
+    side = models.CharField(max_length=5, choices=SIDE_CHOICES)
+    trigram = models.CharField(max_length=3)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['request', 'side', 'trigram'], name='topic_trigram_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['trigram', 'side'], name='topic_trigram_lookup_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.trigram!r} ({self.side}) of request {self.request_id}"
+    
+    @classmethod
+    def rows_for(cls, learning_request):
+        return [
+            cls(request_id=learning_request.pk, side=side, trigram=gram)
+            for side, normalized in (
+                ('learn', learning_request.normalized_learn),
+                ('teach', learning_request.normalized_teach),
+            )
+            for gram in sorted(topics.trigrams(normalized))
+        ]
+    
+    @classmethod
+    def index_request(cls, learning_request):
+        cls.objects.filter(request_id=learning_request.pk).delete()
+        cls.objects.bulk_create(cls.rows_for(learning_request))
+    
+    @classmethod
+    def similar(cls, text, sides=('learn', 'teach'), threshold=None, limit=30):
+        """
+        Open requests whose normalized topic on one of `sides` is similar to
+        `text`, as [(request_id, side, similarity)] best first.
+        """
+        if threshold is None:
+            threshold = settings.TOPIC_SIMILARITY_THRESHOLD
+        query = topics.normalize(text)
+        grams = topics.trigrams(query)
+        if not grams:
+            return []
+        
+        # A match needs some query word q with Dice >= threshold against a
+        # topic word, i.e. at least threshold * len(q) / 2 shared trigrams.
+        shortest = min(len(topics.word_trigrams(word)) for word in query.split())
+        min_shared = max(1, math.ceil(threshold * shortest / 2))
+        candidates = list(
+            cls.objects.filter(trigram__in=grams, side__in=sides, request__is_completed=False)
+            .values('request_id', 'side')
+            .annotate(shared=models.Count('id'))
+            .filter(shared__gte=min_shared)
+            .order_by('-shared')[:limit * 5]
+        )
+        stored = {
+            row['id']: row for row in LearningRequest.objects.filter(
+                pk__in={row['request_id'] for row in candidates}
+            ).values('id', 'normalized_learn', 'normalized_teach')
+        }
+        
+        scored = []
+        for row in candidates:
+            if row['request_id'] not in stored:
+                continue
+            normalized = stored[row['request_id']][f"normalized_{row['side']}"]
+            score = topics.similarity(query, normalized)
+            if score >= threshold:
+                scored.append((row['request_id'], row['side'], score))
+        scored.sort(key=lambda item: (-item[2], -item[0]))
+        return scored[:limit]
+
+
+class UserSearchEntry(models.Model):
+    """
+    A user's row in the FTS5 search index (see link_and_learn.search).
+    
+    Maintained by database triggers; only used to join and rank searches.
+    """
+    
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        primary_key=True,
+        db_column='rowid',
+        db_constraint=False,
+        on_delete=models.DO_NOTHING,
+        related_name='search_entry'
+    )
+    name = models.TextField()
+    learn = models.TextField()
+    teach = models.TextField()
+    rank = models.FloatField()
+    document = FullTextField(db_column='requests_search_index')
+    
+    class Meta:
+        managed = False
+        db_table = 'requests_search_index'
@@ -0,0 +1,147 @@
+"""
+Topic normalization and trigrams for request topics.
+
+normalize() turns free-text topics into a canonical form so that "JS",
+"javascript" and "Java Script" compare equal:
+  1. lower-case and strip accents,
+  2. split on punctuation, keeping '+' and '#' inside words (c++, c#),
+  3. replace synonyms, longest phrase first ("java script" -> javascript),
+  4. drop stop words,
+  5. stem the remaining words (lessons -> lesson, coding -> cod).
+
+LearningRequest stores the normalized topics and their trigrams on save,
+so searches only ever normalize the query.
+"""
+import re
+import unicodedata
+
+STOP_WORDS = frozenset({
+    'a', 'an', 'and', 'basics', 'for', 'how', 'i', 'in', 'intro', 'introduction',
+    'learn', 'learning', 'of', 'on', 'or', 'teach', 'the', 'to', 'with',
+})
+
+# Words or phrases -> canonical token. Canonical tokens are never stemmed.
+SYNONYMS = {
+    'js': 'javascript',
+    'java script': 'javascript',
+    'ecmascript': 'javascript',
+    'es6': 'javascript',
+    'ts': 'typescript',
+    'type script': 'typescript',
+    'py': 'python',
+    'python3': 'python',
+    'node': 'nodejs',
+    'node js': 'nodejs',
+    'reactjs': 'react',
+    'react js': 'react',
+    'vuejs': 'vue',
+    'vue js': 'vue',
+    'golang': 'go',
+    'cpp': 'c++',
+    'c plus plus': 'c++',
+    'csharp': 'c#',
+    'c sharp': 'c#',
+    'postgres': 'postgresql',
+    'k8s': 'kubernetes',
+    'ml': 'machinelearning',
+    'machine learning': 'machinelearning',
+    'ai': 'artificialintelligence',
+    'artificial intelligence': 'artificialintelligence',
+    'db': 'database',
+    'dbs': 'database',
+    'math': 'mathematics',
+    'maths': 'mathematics',
+    'espanol': 'spanish',
+}
+CANONICAL = frozenset(SYNONYMS.values())
+MAX_PHRASE = max(len(phrase.split()) for phrase in SYNONYMS)
+
+# (suffix, replacement), first match wins; the stem must keep 3+ letters.
+SUFFIXES = (
+    ('ies', 'y'),
+    ('ing', ''),
+    ('ers', ''),
+    ('er', ''),
+    ('ed', ''),
+    ('es', ''),
+    ('s', ''),
+)
+
+
+def stem(word):
+    """Light suffix stripping; enough to fold plurals and -ing/-ed/-er forms."""
+    if len(word) <= 3 or not word.isalpha():
+        return word
+    for suffix, replacement in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3 and not word.endswith('ss'):
+            word = word[:-len(suffix)] + replacement
+            if suffix in ('ing', 'ed', 'er', 'ers') and word[-1] == word[-2] and word[-1] not in 'lsz':
+                word = word[:-1]  # running -> run
+            break
+    if word.endswith('e') and len(word) > 3:
+        word = word[:-1]  # code, coding -> cod
+    return word
+
+
+def words(text):
+    text = unicodedata.normalize('NFKD', (text or '').lower())
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return re.findall(r'[\w+#]+', text)
+
+
+def tokens(text):
+    """Normalized tokens of a topic, in order, without repeats."""
+    raw = words(text)
+    result = []
+    i = 0
+    while i < len(raw):
+        for size in range(min(MAX_PHRASE, len(raw) - i), 0, -1):
+            canonical = SYNONYMS.get(' '.join(raw[i:i + size]))
+            if canonical:
+                token = canonical
+                i += size
+                break
+        else:
+            word = raw[i]
+            i += 1
+            if word in STOP_WORDS:
+                continue
+            token = word if word in CANONICAL else stem(word)
+        if token not in result:
+            result.append(token)
+    return result
+
+
+def normalize(text):
+    return ' '.join(tokens(text))
+
+
+def word_trigrams(word):
+    """Trigrams of one word, padded like pg_trgm ('  py', ' py', ..., 'on ')."""
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def trigrams(normalized):
+    """All word trigrams of a normalized topic."""
+    grams = set()
+    for word in normalized.split():
+        grams |= word_trigrams(word)
+    return grams
+
+
+def similarity(query, topic):
+    """
+    How well a normalized topic covers a normalized query, 0-1: for each
+    query word, the Dice coefficient of its trigrams with the closest topic
+    word, averaged. "pyhton" vs "python program" scores 0.43.
+    """
+    topic_grams = [word_trigrams(word) for word in topic.split()]
+    query_words = query.split()
+    if not query_words or not topic_grams:
+        return 0.0
+    total = 0.0
+    for word in query_words:
+        grams = word_trigrams(word)
+        total += max(2 * len(grams & other) / (len(grams) + len(other)) for other in topic_grams)
+    return total / len(query_words)
@@ -4,11 +4,14 @@ Learning Request views.
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q
 from django.views.decorators.http import require_POST
 
 from .models import LearningRequest
 from .forms import LearningRequestForm
+from .feed import feed as browse_feed
+from .matching import index as match_index
+from link_and_learn import search as search_index
+from link_and_learn.pagination import paginate
 
 
 @login_required
@@ -31,8 +34,6 @@ def create_request(request):
 @login_required
 def all_requests(request):
     """List all learning requests with optional filtering."""
-    requests_qs = LearningRequest.get_active_requests().select_related('creator')
-    
     # Search filters
     search = request.GET.get('search', '').strip()
     teach_search = request.GET.get('teach', '').strip()
@@ -40,6 +41,7 @@ def all_requests(request):
     
     found_users = None
     is_search = False
+    fuzzy = False
     
     if search or teach_search:
         is_search = True
@@ -49,31 +51,41 @@ def all_requests(request):
         
         users_qs = User.objects.filter(is_active=True).exclude(pk=request.user.pk)
         
-        if search:
-            # Search by name or what they want to learn/teach
-            users_qs = users_qs.filter(
-                Q(name__icontains=search) |
-                Q(learning_requests__topic_to_learn__icontains=search) |
-                Q(learning_requests__topic_to_teach__icontains=search)
-            ).distinct()
-            
-        if teach_search:
-            # Filter by what they can teach
-            users_qs = users_qs.filter(
-                learning_requests__topic_to_teach__icontains=teach_search
-            ).distinct()
-            
-        found_users = users_qs
+        # Name or learn/teach topics match `search`; teach topics match `teach_search`
+        matched_qs, ordering = search_index.search_users(users_qs, any=search, teach=teach_search)
+        page = paginate(request, matched_qs, ordering=ordering, per_page=30)
+        found_users = page.object_list
+        
+        if not found_users and not request.GET.get('cursor'):
+            # Nothing matched word for word; try topics that are spelled close,
+            # still requiring both filters when both are given
+            creator_ids = LearningRequest.creators_with_similar_topics(search) if search else None
+            if teach_search:
+                teachers = LearningRequest.creators_with_similar_topics(teach_search, sides=('teach',))
+                if creator_ids is None:
+                    creator_ids = teachers
+                else:
+                    teachers = set(teachers)
+                    creator_ids = [pk for pk in creator_ids if pk in teachers]
+            users_by_id = users_qs.in_bulk(creator_ids)
+            found_users = [users_by_id[pk] for pk in creator_ids if pk in users_by_id]
+            fuzzy = bool(found_users)
     else:
-        # Browse mode: Show all others' posts
-        requests_qs = requests_qs.exclude(creator=request.user)
-        if bounty_only:
-             requests_qs = requests_qs.filter(ok_with_just_learning=True)
+        # Browse mode: Show all others' posts, from the cached feed
+        page = browse_feed.page(
+            request.GET.get('cursor'),
+            query=request.GET,
+            exclude_user_id=request.user.pk,
+            bounty_only=bounty_only,
+            per_page=30,
+        )
     
     return render(request, 'dashboard/all_requests.html', {
-        'requests': requests_qs if not is_search else None,
+        'requests': page.object_list if not is_search else None,
+        'page': page,
         'found_users': found_users,
         'is_search': is_search,
+        'fuzzy': fuzzy,
         'search': search,
         'teach_search': teach_search,
         'bounty_only': bounty_only,
@@ -91,9 +103,9 @@ def search_and_post(request):
     if not topic_to_learn:
         messages.error(request, 'Please specify what you want to learn.')
         return redirect('all_requests')
-        
+    
     # Create request
-    LearningRequest.objects.create(
+    learning_request = LearningRequest.objects.create(
         creator=request.user,
         topic_to_learn=topic_to_learn,
         topic_to_teach=topic_to_teach,
@@ -101,13 +113,31 @@ def search_and_post(request):
     )
     
     messages.success(request, f'Request posted! Showing matches for "{topic_to_learn}".')
+    return redirect('request_matches', request_id=learning_request.id)
+
+
+@login_required
+def request_matches(request, request_id):
+    """People to swap lessons with for one of the user's open requests."""
+    learning_request = get_object_or_404(LearningRequest, pk=request_id, creator=request.user)
     
-    # Redirect to search results
-    url = f"/requests/?search={topic_to_learn}"
-    if topic_to_teach:
-        url += f"&teach={topic_to_teach}"
-        
-    return redirect(url)
+    found = match_index.matches_for(learning_request) if not learning_request.is_completed else []
+    requests_by_id = LearningRequest.objects.filter(
+        pk__in=[match.request_id for match in found],
+        is_completed=False,
+        creator__is_active=True,
+    ).select_related('creator').in_bulk()
+    
+    matches = []
+    for match in found:
+        req = requests_by_id.get(match.request_id)
+        if req is not None:
+            matches.append({'request': req, 'mutual': match.mutual, 'teaches': match.teaches, 'learns': match.learns})
+    
+    return render(request, 'dashboard/request_matches.html', {
+        'learning_request': learning_request,
+        'matches': matches,
+    })
 
 
 @login_required
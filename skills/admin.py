@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Skill, UserSkill
+from .models import RelatedSkill, Skill, SkillSuggestion, UserSkill
 
 
 @admin.register(Skill)
@@ -12,3 +12,14 @@ class SkillAdmin(admin.ModelAdmin):
 class UserSkillAdmin(admin.ModelAdmin):
     list_display = ('user', 'skill', 'skill_type', 'created_at')
     list_filter = ('skill_type',)
+
+
+@admin.register(SkillSuggestion)
+class SkillSuggestionAdmin(admin.ModelAdmin):
+    list_display = ('user', 'skill', 'skill_type', 'score')
+    list_filter = ('skill_type',)
+
+
+@admin.register(RelatedSkill)
+class RelatedSkillAdmin(admin.ModelAdmin):
+    list_display = ('skill', 'related', 'score')
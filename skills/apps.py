@@ -1,6 +1,20 @@
 from django.apps import AppConfig
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+
+def mark_skills_changed(sender, instance, **kwargs):
+    from .models import StaleSkillProfile
+    user_id = instance.user_id
+    transaction.on_commit(lambda: StaleSkillProfile.mark(user_id))
 
 
 class SkillsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'skills'
+    
+    def ready(self):
+        # Queue users for `recommend_skills` when their skills change.
+        UserSkill = self.get_model('UserSkill')
+        post_save.connect(mark_skills_changed, sender=UserSkill)
+        post_delete.connect(mark_skills_changed, sender=UserSkill)
@@ -0,0 +1,21 @@
+"""
+Recompute skill co-occurrence and per-user skill suggestions.
+"""
+from django.core.management.base import BaseCommand
+
+from skills import recommendations
+
+
+class Command(BaseCommand):
+    help = 'Rebuild related skills and refresh suggestions for users whose skills changed.'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Recompute suggestions for every user, not just the ones whose skills changed.',
+        )
+    
+    def handle(self, *args, **options):
+        updated = recommendations.refresh(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f'Refreshed skill suggestions for {updated} users.'))
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:43
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_session_state'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('skills', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaleSkillProfile',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('marked_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RelatedSkill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='skills.skill')),
+                ('skill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_skills', to='skills.skill')),
+            ],
+            options={
+                'ordering': ['skill', '-score'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SkillSuggestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('skill_type', models.CharField(choices=[('teach', 'Can Teach'), ('learn', 'Want to Learn')], max_length=10)),
+                ('score', models.FloatField()),
+                ('skill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='skills.skill')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='skill_suggestions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['user', 'skill_type', '-score'],
+                'indexes': [models.Index(fields=['user', 'skill_type', '-score'], name='skill_suggestion_user_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='skillsuggestion',
+            constraint=models.UniqueConstraint(fields=('user', 'skill_type', 'skill'), name='skill_suggestion_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='relatedskill',
+            constraint=models.UniqueConstraint(fields=('skill', 'related'), name='related_skill_unique'),
+        ),
+    ]
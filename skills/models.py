@@ -3,6 +3,7 @@ Skills app models - simple skill tracking.
 """
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 
 class Skill(models.Model):
@@ -46,3 +47,79 @@ class UserSkill(models.Model):
     
     def __str__(self):
         return f"{self.user.name} - {self.skill.name} ({self.skill_type})"
+
+
+class StaleSkillProfile(models.Model):
+    """A user whose skills changed since their suggestions were computed."""
+    
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+'
+    )
+    marked_at = models.DateTimeField()
+    
+    def __str__(self):
+        return f"Skills changed for user {self.user_id}"
+    
+    @classmethod
+    def mark(cls, user_id):
+        # Skills also go when their user is deleted; nothing to queue then.
+        from django.contrib.auth import get_user_model
+        if get_user_model().objects.filter(pk=user_id).exists():
+            cls.objects.update_or_create(user_id=user_id, defaults={'marked_at': timezone.now()})
+
+
+class RelatedSkill(models.Model):
+    """Top-K skills most often held by the same users as `skill`."""
+    
+    skill = models.ForeignKey(
+        Skill,
+        on_delete=models.CASCADE,
+        related_name='related_skills'
+    )
+    related = models.ForeignKey(
+        Skill,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    score = models.FloatField()
+    
+    class Meta:
+        ordering = ['skill', '-score']
+        constraints = [
+            models.UniqueConstraint(fields=['skill', 'related'], name='related_skill_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.skill_id} -> {self.related_id} ({self.score:.3f})"
+
+
+class SkillSuggestion(models.Model):
+    """A precomputed "you may also want to learn/teach" skill for a user."""
+    
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='skill_suggestions'
+    )
+    skill = models.ForeignKey(
+        Skill,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    skill_type = models.CharField(max_length=10, choices=UserSkill.SKILL_TYPE_CHOICES)
+    score = models.FloatField()
+    
+    class Meta:
+        ordering = ['user', 'skill_type', '-score']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'skill_type', 'skill'], name='skill_suggestion_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'skill_type', '-score'], name='skill_suggestion_user_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} may {self.skill_type} {self.skill_id} ({self.score:.3f})"
@@ -0,0 +1,196 @@
+"""
+Skill co-occurrence recommendations.
+
+From the user x skill matrix X (1 where a user teaches or learns a skill):
+
+* related skills: cosine similarity of skill columns, X'X / sqrt(n_i n_j),
+  kept to the top SKILL_SUGGESTIONS_TOP_K per skill (RelatedSkill);
+* "you may also want to learn": how often holders of skill i *learn* j,
+  X' X_learn / sqrt(n_i m_j), pruned to each skill's SKILL_NEIGHBOURS
+  strongest neighbours; a user's score for j sums over the skills they
+  hold. Likewise for teaching. Skills the user already has are skipped and
+  the top K are stored per user (SkillSuggestion).
+
+Co-occurrence is rebuilt on every run; it is cheap as sparse products.
+Suggestions are recomputed only for users marked stale when their
+UserSkill rows changed, unless `full` is set.
+
+NumPy and SciPy are optional. Without them the same scores are computed
+with dicts, which is fine for small sites but much slower past ~100k rows.
+"""
+import math
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # pragma: no cover - optional dependency
+    np = sparse = None
+
+from link_and_learn.ranking import csr_grouped, csr_prune, csr_top_k, top_k
+
+from .models import RelatedSkill, SkillSuggestion, StaleSkillProfile, UserSkill
+
+SIDES = ('learn', 'teach')
+
+
+def load_rows():
+    """All UserSkill rows as (user_id, skill_id, skill_type)."""
+    return list(UserSkill.objects.values_list('user_id', 'skill_id', 'skill_type').iterator(chunk_size=10000))
+
+
+# SciPy implementation
+
+def _normalized(cooccurrence, row_counts, col_counts):
+    """Divide C[i, j] by sqrt(row_counts[i] * col_counts[j]) and clear the diagonal."""
+    cooccurrence = cooccurrence.tocsr().astype(np.float64)
+    cooccurrence = (cooccurrence - sparse.diags(cooccurrence.diagonal())).tocsr()
+    cooccurrence.eliminate_zeros()
+    with np.errstate(divide='ignore'):
+        row_scale = sparse.diags(np.where(row_counts > 0, 1 / np.sqrt(row_counts), 0))
+        col_scale = sparse.diags(np.where(col_counts > 0, 1 / np.sqrt(col_counts), 0))
+    return row_scale @ cooccurrence @ col_scale
+
+
+def _compute_sparse(rows, user_ids, k, neighbours):
+    users = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    skills = np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows))
+    learning = np.fromiter((row[2] == 'learn' for row in rows), dtype=bool, count=len(rows))
+    user_keys, user_index = np.unique(users, return_inverse=True)
+    skill_keys, skill_index = np.unique(skills, return_inverse=True)
+    shape = (len(user_keys), len(skill_keys))
+    
+    def matrix(mask):
+        ones = np.ones(int(mask.sum()), dtype=np.float64)
+        m = sparse.csr_matrix((ones, (user_index[mask], skill_index[mask])), shape=shape)
+        m.data[:] = 1  # a (user, skill) pair may appear once per side
+        return m
+    
+    held = matrix(np.ones(len(rows), dtype=bool))
+    by_side = {'learn': matrix(learning), 'teach': matrix(~learning)}
+    held_counts = np.asarray(held.sum(axis=0)).ravel()
+    
+    similarity = _normalized(held.T @ held, held_counts, held_counts)
+    related = csr_grouped(*csr_top_k(similarity, k), skill_keys, skill_keys)
+    
+    if user_ids is None:
+        targets = np.arange(len(user_keys))
+    else:
+        targets = np.flatnonzero(np.isin(user_keys, list(user_ids)))
+    target_held = held[targets]
+    
+    suggestions = defaultdict(dict)
+    for side, side_matrix in by_side.items():
+        side_counts = np.asarray(side_matrix.sum(axis=0)).ravel()
+        weights = csr_prune(_normalized(held.T @ side_matrix, held_counts, side_counts), neighbours)
+        scores = (target_held @ weights).tocsr()
+        # Drop skills the user already has
+        scores = scores - scores.multiply(target_held)
+        scores.eliminate_zeros()
+        for user_id, row in csr_grouped(*csr_top_k(scores, k), user_keys[targets], skill_keys).items():
+            suggestions[user_id][side] = row
+    return related, suggestions
+
+
+# Pure-Python implementation
+
+def _compute_python(rows, user_ids, k, neighbours):
+    held = defaultdict(set)
+    by_side = {side: defaultdict(set) for side in SIDES}
+    for user_id, skill_id, skill_type in rows:
+        held[user_id].add(skill_id)
+        by_side[skill_type][user_id].add(skill_id)
+    held_counts = Counter(skill for skills in held.values() for skill in skills)
+    
+    def weights(side_sets):
+        side_counts = Counter(skill for skills in side_sets.values() for skill in skills)
+        pairs = Counter()
+        for user_id, targets in side_sets.items():
+            for i in held[user_id]:
+                for j in targets:
+                    if i != j:
+                        pairs[i, j] += 1
+        table = defaultdict(list)
+        for (i, j), count in pairs.items():
+            table[i].append((j, count / math.sqrt(held_counts[i] * side_counts[j])))
+        return {i: top_k(row, neighbours) for i, row in table.items()}
+    
+    related = {
+        skill_id: top_k(row, k)
+        for skill_id, row in weights(held).items()
+    }
+    
+    targets = held.keys() if user_ids is None else [u for u in user_ids if u in held]
+    suggestions = defaultdict(dict)
+    for side, side_sets in by_side.items():
+        table = weights(side_sets)
+        for user_id in targets:
+            scores = Counter()
+            for i in held[user_id]:
+                for j, weight in table.get(i, ()):
+                    if j not in held[user_id]:
+                        scores[j] += weight
+            if scores:
+                suggestions[user_id][side] = top_k(scores.items(), k)
+    return related, suggestions
+
+
+def compute(rows, user_ids=None):
+    """
+    Return (related, suggestions): {skill_id: [(skill_id, score)]} and
+    {user_id: {'learn'|'teach': [(skill_id, score)]}} for `user_ids` (all
+    users with skills if None).
+    """
+    k = settings.SKILL_SUGGESTIONS_TOP_K
+    neighbours = settings.SKILL_NEIGHBOURS
+    if not rows:
+        return {}, {}
+    if sparse is not None:
+        return _compute_sparse(rows, user_ids, k, neighbours)
+    return _compute_python(rows, user_ids, k, neighbours)
+
+
+def refresh(full=False, batch_size=1000):
+    """
+    Recompute related skills, and suggestions for stale users (every user
+    if `full`). Returns the number of users given at least one suggestion.
+    """
+    started = timezone.now()
+    user_ids = None if full else set(StaleSkillProfile.objects.values_list('user_id', flat=True))
+    if user_ids is not None and not user_ids and RelatedSkill.objects.exists():
+        return 0
+    
+    related, suggestions = compute(load_rows(), user_ids)
+    
+    with transaction.atomic():
+        RelatedSkill.objects.all().delete()
+        RelatedSkill.objects.bulk_create(
+            [
+                RelatedSkill(skill_id=skill_id, related_id=other_id, score=score)
+                for skill_id, row in related.items()
+                for other_id, score in row
+            ],
+            batch_size=batch_size,
+        )
+        
+        stale = SkillSuggestion.objects.all()
+        if user_ids is not None:
+            stale = stale.filter(user_id__in=user_ids)
+        stale.delete()
+        SkillSuggestion.objects.bulk_create(
+            [
+                SkillSuggestion(user_id=user_id, skill_id=skill_id, skill_type=side, score=score)
+                for user_id, sides in suggestions.items()
+                for side, row in sides.items()
+                for skill_id, score in row
+            ],
+            batch_size=batch_size,
+        )
+        # Users whose skills changed again during the run stay queued
+        StaleSkillProfile.objects.filter(marked_at__lte=started).delete()
+    
+    return len(suggestions)
@@ -3,12 +3,23 @@ Skills views.
 """
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
+from django.db.models import Prefetch
 
-from .models import Skill
+from .models import RelatedSkill, Skill, SkillSuggestion
 
 
 @login_required
 def skills_list(request):
-    """List all available skills."""
-    skills = Skill.objects.all()
-    return render(request, 'skills/list.html', {'skills': skills})
+    """List all available skills, with the user's precomputed suggestions."""
+    related = RelatedSkill.objects.select_related('related').order_by('-score')
+    skills = Skill.objects.prefetch_related(Prefetch('related_skills', queryset=related))
+    
+    suggestions = {'learn': [], 'teach': []}
+    for suggestion in SkillSuggestion.objects.filter(user=request.user).select_related('skill'):
+        suggestions[suggestion.skill_type].append(suggestion.skill)
+    
+    return render(request, 'skills/list.html', {
+        'skills': skills,
+        'suggested_learn': suggestions['learn'],
+        'suggested_teach': suggestions['teach'],
+    })
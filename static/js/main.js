@@ -51,6 +51,48 @@ document.addEventListener('DOMContentLoaded', function () {
 
     window.csrfToken = getCookie('csrftoken');
 
+    // Direct-message inbox: one socket per page for signed-in users. It keeps
+    // the unread badge current; pages such as the DM view listen for
+    // 'inbox:open' (fired on every (re)connect) and 'inbox:event' on document.
+    const inboxLink = document.getElementById('inboxLink');
+    if (inboxLink) {
+        const inboxBadge = document.getElementById('inboxBadge');
+        const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+        let inboxSocket = null;
+        let reconnectDelay = 1000;
+
+        function setUnread(count) {
+            inboxBadge.textContent = count > 99 ? '99+' : String(count);
+            inboxBadge.hidden = !count;
+        }
+
+        function connectInbox() {
+            inboxSocket = new WebSocket(`${protocol}//${window.location.host}/ws/inbox/`);
+            inboxSocket.onopen = function () {
+                reconnectDelay = 1000;
+                document.dispatchEvent(new CustomEvent('inbox:open'));
+            };
+            inboxSocket.onmessage = function (e) {
+                const data = JSON.parse(e.data);
+                if (data.unread_count !== undefined) setUnread(data.unread_count);
+                document.dispatchEvent(new CustomEvent('inbox:event', { detail: data }));
+            };
+            inboxSocket.onclose = function () {
+                setTimeout(connectInbox, reconnectDelay);
+                reconnectDelay = Math.min(reconnectDelay * 2, 30000);
+            };
+        }
+
+        window.inbox = {
+            send: function (payload) {
+                if (inboxSocket && inboxSocket.readyState === WebSocket.OPEN) {
+                    inboxSocket.send(JSON.stringify(payload));
+                }
+            }
+        };
+        connectInbox();
+    }
+
     // Format time helper
     window.formatTime = function (seconds) {
         const hrs = Math.floor(seconds / 3600);
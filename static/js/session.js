@@ -14,30 +14,71 @@ document.addEventListener('DOMContentLoaded', function () {
     // WebSocket Setup
     const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
     const socketUrl = `${protocol}//${window.location.host}/ws/session/${sessionId}/`;
-    const chatSocket = new WebSocket(socketUrl);
-
-    chatSocket.onopen = function (e) { console.log('WebSocket connection established'); };
-    chatSocket.onclose = function (e) { console.error('WebSocket connection closed unexpectedly'); };
+    // Binary MessagePack frames when the library loaded, JSON text otherwise
+    const MSGPACK_PROTOCOL = 'linklearn.msgpack';
+    const protocols = typeof MessagePack !== 'undefined'
+        ? [MSGPACK_PROTOCOL, 'linklearn.json'] : ['linklearn.json'];
+    let chatSocket = null;
+    let reconnectDelay = 1000;
+    let sessionEnded = false;
+
+    function connectSocket() {
+        chatSocket = new WebSocket(socketUrl, protocols);
+        chatSocket.binaryType = 'arraybuffer';
+
+        chatSocket.onopen = function (e) {
+            console.log('WebSocket connection established');
+            reconnectDelay = 1000;
+            // Catch up on whiteboard ops made between page render (or the drop) and connect
+            sendSocketMessage('whiteboard_sync', { since: whiteboardSeq });
+            // Fetch the live IDE document (it may be ahead of the last checkpoint)
+            sendSocketMessage('code_sync', {});
+            // And on chat messages sent while we were not connected
+            historyLoaded.then(catchUp).then(() => {
+                chatMessages.scrollTop = chatMessages.scrollHeight;
+            }).catch(() => {});
+        };
+        chatSocket.onclose = function (e) {
+            if (sessionEnded) return;
+            console.error('WebSocket connection closed; reconnecting');
+            setTimeout(connectSocket, reconnectDelay);
+            reconnectDelay = Math.min(reconnectDelay * 2, 30000);
+        };
 
-    chatSocket.onmessage = function (e) {
-        const data = JSON.parse(e.data);
-        handleSocketMessage(data);
-    };
+        chatSocket.onmessage = function (e) {
+            if (e.data instanceof ArrayBuffer) {
+                const [type, body] = MessagePack.decode(new Uint8Array(e.data));
+                handleSocketMessage({ ...body, type: type });
+            } else {
+                handleSocketMessage(JSON.parse(e.data));
+            }
+        };
+    }
 
     function sendSocketMessage(type, payload) {
-        if (chatSocket.readyState === WebSocket.OPEN) {
+        if (chatSocket.readyState !== WebSocket.OPEN) return;
+        if (chatSocket.protocol === MSGPACK_PROTOCOL) {
+            chatSocket.send(MessagePack.encode([type, payload]));
+        } else {
             chatSocket.send(JSON.stringify({ type: type, ...payload }));
         }
     }
 
     function handleSocketMessage(data) {
         switch (data.type) {
-            case 'chat_message': appendMessage(data); break;
-            case 'whiteboard': handleWhiteboardUpdate(data.data); break;
-            case 'code_change': handleCodeUpdate(data); break;
+            case 'batch': data.events.forEach(handleSocketMessage); break;
+            case 'chat': case 'chat_message': appendMessage(data); break;
+            case 'whiteboard': handleWhiteboardOp(data); break;
+            case 'whiteboard_sync': handleWhiteboardSync(data); break;
+            case 'code_delta': handleCodeDelta(data); break;
+            case 'code_ack': handleCodeAck(data); break;
+            case 'code_resync': handleCodeResync(data); break;
+            case 'code_unavailable': handleCodeUnavailable(data); break;
             case 'video_signal_message': case 'video_signal': handleVideoSignal(data.data); break;
             case 'timer': handleTimerUpdate(data); break;
+            case 'timer_error': handleTimerError(data); break;
             case 'session_ended':
+                sessionEnded = true;
                 alert('Session has ended.');
                 window.location.href = data.redirect_url;
                 break;
@@ -47,23 +88,8 @@ document.addEventListener('DOMContentLoaded', function () {
     // ============================================
     // State Persistence
     // ============================================
-    let isDirty = false;
-    setInterval(() => { if (isDirty) saveState(); }, 10000);
-
-    function saveState() {
-        const payload = {
-            whiteboard: JSON.stringify(canvas.toJSON()),
-            ide_code: editorInstance ? editorInstance.getValue() : '',
-            ide_language: languageSelect.value
-        };
-
-        fetch(`/session/${sessionId}/save-state/`, {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json', 'X-CSRFToken': getCsrfToken() },
-            body: JSON.stringify(payload)
-        }).then(() => { isDirty = false; });
-    }
-
+    // The whiteboard and IDE are persisted server-side from the socket
+    // streams (op log and document checkpoints), so nothing is saved here.
     function getCsrfToken() {
         return document.cookie.split('; ').find(row => row.startsWith('csrftoken='))?.split('=')[1];
     }
@@ -92,14 +118,103 @@ document.addEventListener('DOMContentLoaded', function () {
     const chatInput = document.getElementById('chatInput');
     const sendMessageBtn = document.getElementById('sendMessageBtn');
 
-    function appendMessage(msg) {
+    // History is paged by message id: the latest page on load, older pages
+    // on demand (before_id), and anything missed while disconnected on
+    // reconnect (since_id). Messages pushed over the socket carry no id until
+    // a catch-up fetch matches them with the stored copy.
+    const historyUrl = `/chat/session/${sessionId}/`;
+    let oldestId = null;
+    let newestId = 0;
+    let loadOlderBtn = null;
+
+    function messageElement(msg) {
         const div = document.createElement('div');
         div.className = 'message ' + (msg.sender_id == userId ? 'sent' : 'received');
+        if (msg.id) div.dataset.id = msg.id;
         div.innerHTML = `<div class="message-content">${escapeHtml(msg.content)}</div><div class="message-time">${escapeHtml(msg.sender || 'Unknown')}</div>`;
-        chatMessages.appendChild(div);
+        return div;
+    }
+
+    function trackIds(messages) {
+        messages.forEach(m => {
+            if (oldestId === null || m.id < oldestId) oldestId = m.id;
+            if (m.id > newestId) newestId = m.id;
+        });
+    }
+
+    function appendMessage(msg) {
+        chatMessages.appendChild(messageElement(msg));
         chatMessages.scrollTop = chatMessages.scrollHeight;
     }
 
+    // Place a stored message before any live (id-less) ones, or give its
+    // live copy the id. Keeps history and socket messages in order and unique.
+    function insertStoredMessage(msg) {
+        if (chatMessages.querySelector(`.message[data-id="${msg.id}"]`)) return;
+        const side = msg.sender_id == userId ? 'sent' : 'received';
+        const live = [...chatMessages.querySelectorAll('.message:not([data-id])')].find(el =>
+            el.classList.contains(side) && el.querySelector('.message-content').textContent === msg.content);
+        if (live) {
+            live.dataset.id = msg.id;
+            return;
+        }
+        chatMessages.insertBefore(messageElement(msg), chatMessages.querySelector('.message:not([data-id])'));
+    }
+
+    function setHasOlder(hasMore) {
+        if (hasMore && !loadOlderBtn) {
+            loadOlderBtn = document.createElement('button');
+            loadOlderBtn.type = 'button';
+            loadOlderBtn.className = 'btn btn-sm btn-outline load-older';
+            loadOlderBtn.textContent = 'Load older messages';
+            loadOlderBtn.addEventListener('click', loadOlder);
+        }
+        if (!loadOlderBtn) return;
+        if (hasMore) chatMessages.prepend(loadOlderBtn);
+        else loadOlderBtn.remove();
+    }
+
+    async function loadOlder() {
+        if (oldestId === null) return;
+        loadOlderBtn.disabled = true;
+        try {
+            const response = await fetch(`${historyUrl}?before_id=${oldestId}`);
+            if (!response.ok) return;
+            const data = await response.json();
+            const previousHeight = chatMessages.scrollHeight;
+            const anchor = loadOlderBtn.nextSibling;
+            data.messages.forEach(m => chatMessages.insertBefore(messageElement(m), anchor));
+            trackIds(data.messages);
+            setHasOlder(data.has_more);
+            // Keep the messages the user was looking at in place
+            chatMessages.scrollTop += chatMessages.scrollHeight - previousHeight;
+        } catch (error) {
+        } finally {
+            loadOlderBtn.disabled = false;
+        }
+    }
+
+    async function catchUp() {
+        // Everything stored after the newest message we have, page by page
+        let hasMore = true;
+        while (hasMore) {
+            const response = await fetch(`${historyUrl}?since_id=${newestId}`);
+            if (!response.ok) return;
+            const data = await response.json();
+            data.messages.forEach(insertStoredMessage);
+            trackIds(data.messages);
+            hasMore = data.has_more && data.messages.length > 0;
+        }
+    }
+
+    const historyLoaded = fetch(historyUrl).then(res => res.json()).then(data => {
+        if (!data.messages) return;
+        data.messages.forEach(insertStoredMessage);
+        trackIds(data.messages);
+        setHasOlder(data.has_more);
+        chatMessages.scrollTop = chatMessages.scrollHeight;
+    }).catch(() => {});
+
     sendMessageBtn.addEventListener('click', () => {
         const content = chatInput.value.trim();
         if (content) {
@@ -111,15 +226,19 @@ document.addEventListener('DOMContentLoaded', function () {
     chatInput.addEventListener('keypress', (e) => { if (e.key === 'Enter') sendMessageBtn.click(); });
     function escapeHtml(text) { const div = document.createElement('div'); div.textContent = text; return div.innerHTML; }
 
-    fetch(`/chat/session/${sessionId}/`).then(res => res.json()).then(data => {
-        if (data.messages) { chatMessages.innerHTML = ''; data.messages.forEach(appendMessage); }
-    });
-
     // ============================================
     // IDE (Pyodide & Generic)
     // ============================================
     let editorInstance = null;
     let isRemoteUpdate = false;
+    // Versioned document sync: one batch of ops in flight, later edits
+    // buffered until it is acknowledged. Version is null until a resync arrives.
+    let codeVersion = null;
+    let needsResync = false;
+    let inflightOps = null;
+    let bufferedOps = [];
+    let languageChanged = false;
+    let pendingResync = null;
     const languageSelect = document.getElementById('languageSelect');
     let pyodide = null;
     const outputConsole = document.getElementById('outputConsole');
@@ -132,15 +251,15 @@ document.addEventListener('DOMContentLoaded', function () {
             theme: 'vs-light', automaticLayout: true
         });
         if (typeof initialIdeLanguage !== 'undefined') languageSelect.value = initialIdeLanguage;
-
-        editorInstance.onDidChangeModelContent(() => {
-            if (!isRemoteUpdate) {
-                isDirty = true;
-                sendSocketMessage('code_change', {
-                    code: editorInstance.getValue(),
-                    language: languageSelect.value
-                });
-            }
+        if (pendingResync) handleCodeResync(pendingResync);
+
+        editorInstance.onDidChangeModelContent((e) => {
+            if (isRemoteUpdate) return;
+            // Monaco orders changes so they can be applied one after another
+            e.changes.forEach(change => bufferedOps.push({
+                offset: change.rangeOffset, length: change.rangeLength, text: change.text
+            }));
+            flushCodeOps();
         });
     });
 
@@ -148,10 +267,127 @@ document.addEventListener('DOMContentLoaded', function () {
         const newLang = this.value;
         if (editorInstance) {
             monaco.editor.setModelLanguage(editorInstance.getModel(), newLang);
-            sendSocketMessage('code_change', { code: editorInstance.getValue(), language: newLang });
+            languageChanged = true;
+            flushCodeOps();
         }
     });
 
+    function flushCodeOps() {
+        if (codeVersion === null || inflightOps) return;
+        if (!bufferedOps.length && !languageChanged) return;
+        inflightOps = bufferedOps;
+        bufferedOps = [];
+        const payload = { base_version: codeVersion, ops: inflightOps };
+        if (languageChanged) payload.language = languageSelect.value;
+        languageChanged = false;
+        sendSocketMessage('code_delta', payload);
+    }
+
+    // Rebase `op` past `other` (both made on the same text); null on overlap.
+    // Mirrors chat/ide.py transform_op.
+    function transformOp(op, other, opIsLater) {
+        const opEnd = op.offset + op.length;
+        const otherEnd = other.offset + other.length;
+        const shift = other.text.length - other.length;
+        if (op.length === 0 && other.length === 0 && op.offset === other.offset) {
+            return opIsLater ? { ...op, offset: op.offset + shift } : op;
+        }
+        if (otherEnd <= op.offset) return { ...op, offset: op.offset + shift };
+        if (opEnd <= other.offset) return op;
+        return null;
+    }
+
+    function requestCodeResync() {
+        // Stop applying deltas; ask for the full text once our batch is settled
+        codeVersion = null;
+        needsResync = true;
+        if (!inflightOps) sendSocketMessage('code_sync', {});
+    }
+
+    function handleCodeAck(data) {
+        if (codeVersion === null) {
+            inflightOps = null;
+            if (needsResync) sendSocketMessage('code_sync', {});
+            return;
+        }
+        if (data.version <= codeVersion) return;
+        codeVersion = data.version;
+        inflightOps = null;
+        flushCodeOps();
+    }
+
+    function handleCodeDelta(data) {
+        if (!editorInstance || codeVersion === null || data.version <= codeVersion) return;
+
+        // Remote ops were ordered before our unacknowledged ones: rebase them
+        // past our local edits, and our local edits past them.
+        let remote = data.ops;
+        const local = (inflightOps || []).concat(bufferedOps);
+        for (let r = 0; r < remote.length; r++) {
+            let op = remote[r];
+            for (let i = 0; i < local.length; i++) {
+                const rebasedOp = transformOp(op, local[i], false);
+                const rebasedLocal = transformOp(local[i], op, true);
+                if (!rebasedOp || !rebasedLocal) {
+                    requestCodeResync();
+                    return;
+                }
+                local[i] = rebasedLocal;
+                op = rebasedOp;
+            }
+            remote[r] = op;
+        }
+        const inflightCount = inflightOps ? inflightOps.length : 0;
+        if (inflightOps) inflightOps = local.slice(0, inflightCount);
+        bufferedOps = local.slice(inflightCount);
+
+        const model = editorInstance.getModel();
+        isRemoteUpdate = true;
+        remote.forEach(op => {
+            const start = model.getPositionAt(op.offset);
+            const end = model.getPositionAt(op.offset + op.length);
+            model.applyEdits([{ range: monaco.Range.fromPositions(start, end), text: op.text }]);
+        });
+        setRemoteLanguage(data.language);
+        isRemoteUpdate = false;
+        codeVersion = data.version;
+    }
+
+    function handleCodeResync(data) {
+        if (!editorInstance) { pendingResync = data; return; }
+        pendingResync = null;
+        needsResync = false;
+        codeVersion = data.version;
+        inflightOps = null;
+        bufferedOps = [];
+        languageChanged = false;
+
+        isRemoteUpdate = true;
+        if (editorInstance.getValue() !== data.code) {
+            const currentPosition = editorInstance.getPosition();
+            editorInstance.setValue(data.code);
+            editorInstance.setPosition(currentPosition);
+        }
+        setRemoteLanguage(data.language);
+        isRemoteUpdate = false;
+    }
+
+    function handleCodeUnavailable(data) {
+        // Another worker owns this session's document; edits made here would fork it
+        codeVersion = null;
+        inflightOps = null;
+        bufferedOps = [];
+        ideStatus.textContent = data.error;
+        if (editorInstance) editorInstance.updateOptions({ readOnly: true });
+    }
+
+    function setRemoteLanguage(language) {
+        if (language && language !== languageSelect.value) {
+            languageSelect.value = language;
+            monaco.editor.setModelLanguage(editorInstance.getModel(), language);
+        }
+    }
+
     async function initPyodideLoad() {
         if (typeof loadPyodide === 'undefined') return;
         ideStatus.textContent = 'Loading Python...';
@@ -220,21 +456,6 @@ document.addEventListener('DOMContentLoaded', function () {
         });
     }
 
-    function handleCodeUpdate(data) {
-        if (!editorInstance) return;
-        isRemoteUpdate = true;
-        const currentPosition = editorInstance.getPosition();
-        if (editorInstance.getValue() !== data.code) {
-            editorInstance.setValue(data.code);
-            editorInstance.setPosition(currentPosition);
-        }
-        if (data.language && data.language !== languageSelect.value) {
-            languageSelect.value = data.language;
-            monaco.editor.setModelLanguage(editorInstance.getModel(), data.language);
-        }
-        isRemoteUpdate = false;
-    }
-
     // ============================================
     // Whiteboard (Fabric.js)
     // ============================================
@@ -244,15 +465,41 @@ document.addEventListener('DOMContentLoaded', function () {
         width: 3000, height: 2000
     });
 
-    // Initial State Load
-    if (typeof initialWhiteboard !== 'undefined' && initialWhiteboard && initialWhiteboard !== "{}") {
+    // Initial State Load: newest server snapshot plus the ops after it
+    let whiteboardSeq = 0;
+    let isRemoteWhiteboardUpdate = false;
+    if (typeof initialWhiteboard !== 'undefined' && initialWhiteboard) {
+        loadWhiteboard(initialWhiteboard);
+    }
+
+    function loadWhiteboard(board) {
+        const snapshot = Object.assign({ background: 'rgba(255, 255, 255, 1)' }, board.snapshot || {});
+        isRemoteWhiteboardUpdate = true;
         try {
-            if (initialWhiteboard.trim().startsWith('{')) {
-                canvas.loadFromJSON(initialWhiteboard, canvas.renderAll.bind(canvas));
-            } else {
-                fabric.Image.fromURL(initialWhiteboard, function (img) { canvas.add(img); });
-            }
-        } catch (e) { console.error("Error loading whiteboard state", e); }
+            canvas.loadFromJSON(snapshot, function () {
+                canvas.renderAll();
+                (board.ops || []).forEach(op => handleWhiteboardUpdate(op.data));
+                isRemoteWhiteboardUpdate = false;
+            });
+        } catch (e) {
+            isRemoteWhiteboardUpdate = false;
+            console.error("Error loading whiteboard state", e);
+        }
+        whiteboardSeq = board.ops && board.ops.length ? board.ops[board.ops.length - 1].seq : board.seq;
+    }
+
+    function handleWhiteboardOp(msg) {
+        if (msg.seq && msg.seq <= whiteboardSeq) return;
+        handleWhiteboardUpdate(msg.data);
+        if (msg.seq) whiteboardSeq = msg.seq;
+    }
+
+    function handleWhiteboardSync(board) {
+        if (board.snapshot) {
+            loadWhiteboard(board);
+            return;
+        }
+        board.ops.forEach(op => handleWhiteboardOp(op));
     }
 
     canvas.freeDrawingBrush = new fabric.PencilBrush(canvas);
@@ -324,6 +571,8 @@ document.addEventListener('DOMContentLoaded', function () {
         if (activeObjects.length) {
             canvas.discardActiveObject();
             activeObjects.forEach(obj => { canvas.remove(obj); });
+            const ids = activeObjects.map(obj => obj.id).filter(Boolean);
+            if (ids.length) sendSocketMessage('whiteboard', { data: { type: 'remove', ids: ids } });
         }
     });
 
@@ -363,13 +612,11 @@ document.addEventListener('DOMContentLoaded', function () {
     });
 
     // Remote Update Log
-    let isRemoteWhiteboardUpdate = false;
     canvas.on('object:added', (e) => {
         if (!isRemoteWhiteboardUpdate && e.target) {
             const json = e.target.toJSON();
             if (!e.target.id) e.target.id = Date.now() + '-' + Math.random();
             json.id = e.target.id;
-            isDirty = true;
             sendSocketMessage('whiteboard', { data: { type: 'add', object: json } });
         }
     });
@@ -377,7 +624,6 @@ document.addEventListener('DOMContentLoaded', function () {
         if (!isRemoteWhiteboardUpdate && e.target) {
             const json = e.target.toJSON();
             if (!json.id) json.id = e.target.id;
-            isDirty = true;
             sendSocketMessage('whiteboard', { data: { type: 'modify', object: json } });
         }
     });
@@ -402,6 +648,10 @@ document.addEventListener('DOMContentLoaded', function () {
                 existing.setCoords();
                 canvas.renderAll();
             }
+        } else if (data.type === 'remove') {
+            canvas.getObjects()
+                .filter(obj => data.ids.includes(obj.id))
+                .forEach(obj => canvas.remove(obj));
         }
         isRemoteWhiteboardUpdate = false;
     }
@@ -425,8 +675,11 @@ document.addEventListener('DOMContentLoaded', function () {
     }, 1000);
 
     // Initial Timer Setup from Server
+    // The server owns timer state; all timestamps are server clock, so keep
+    // the offset between it and ours to avoid peers drifting apart.
     let teachingSeconds = typeof initialTeachingSeconds !== 'undefined' ? initialTeachingSeconds : 0;
     let timerStartTimestamp = typeof initialTimerStart !== 'undefined' ? initialTimerStart : null;
+    let serverOffset = typeof initialServerTime !== 'undefined' && initialServerTime ? initialServerTime - Date.now() / 1000 : 0;
     let teachingInterval = null;
 
     // Display initial state
@@ -442,12 +695,15 @@ document.addEventListener('DOMContentLoaded', function () {
         }
     }
 
+    function serverNow() {
+        return Date.now() / 1000 + serverOffset;
+    }
+
     function updateTeachingTimerDisplay() {
         // Current total = persisted seconds + (now - start if running)
         let currentTotal = teachingSeconds;
         if (timerStartTimestamp) {
-            const now = Math.floor(Date.now() / 1000);
-            currentTotal += (now - timerStartTimestamp);
+            currentTotal += Math.floor(serverNow() - timerStartTimestamp);
         }
         teachingTimerEl.textContent = formatTime(currentTotal);
     }
@@ -463,78 +719,47 @@ document.addEventListener('DOMContentLoaded', function () {
             clearInterval(teachingInterval);
             teachingInterval = null;
         }
-        // When stopping, we should hypothetically update teachingSeconds 
-        // using the backend response to be exact, but the socket update handles that.
     }
 
     if (startTimerBtn) {
         startTimerBtn.addEventListener('click', () => {
-            fetch(`/session/${sessionId}/start-timer/`, { method: 'POST', headers: { 'X-CSRFToken': getCsrfToken() } })
-                .then(res => res.json())
-                .then(data => {
-                    if (data.success) {
-                        startTimerBtn.disabled = true;
-                        stopTimerBtn.disabled = false;
-                        // Optimistically set start time to now
-                        timerStartTimestamp = Math.floor(Date.now() / 1000);
-                        startClientTimer();
-                    }
-                });
+            startTimerBtn.disabled = true;
+            sendSocketMessage('timer', { action: 'start' });
         });
     }
 
     if (stopTimerBtn) {
         stopTimerBtn.addEventListener('click', () => {
-            fetch(`/session/${sessionId}/stop-timer/`, { method: 'POST', headers: { 'X-CSRFToken': getCsrfToken() } })
-                .then(res => res.json())
-                .then(data => {
-                    if (data.success) {
-                        startTimerBtn.disabled = false;
-                        stopTimerBtn.disabled = true;
-                        // Update our baseline teachingSeconds with the finalized duration
-                        if (typeof data.duration !== 'undefined') {
-                            // This 'duration' is the duration of the *segment* just stopped.
-                            // We should add it to our baseline if we tracked it separately,
-                            // or simpler: just nullify start time and add elapsed.
-                            // Better yet, in handleTimerUpdate or response, we sync.
-                            // Let's rely on handleTimerUpdate for sync, but optimistic update here:
-                        }
-                        // Reset active start
-                        const now = Math.floor(Date.now() / 1000);
-                        teachingSeconds += (now - timerStartTimestamp);
-                        timerStartTimestamp = null;
-
-                        stopClientTimer();
-                        updateTeachingTimerDisplay();
-                    }
-                });
+            stopTimerBtn.disabled = true;
+            sendSocketMessage('timer', { action: 'stop' });
         });
     }
 
     function handleTimerUpdate(data) {
-        const action = data.action;
-        if (action === 'start') {
-            if (startTimerBtn) {
-                startTimerBtn.disabled = true;
-                stopTimerBtn.disabled = false;
-            }
-            if (!timerStartTimestamp) {
-                timerStartTimestamp = Math.floor(Date.now() / 1000); // Approximate
-                startClientTimer();
-            }
-        } else if (action === 'stop') {
-            if (startTimerBtn) {
-                startTimerBtn.disabled = false;
-                stopTimerBtn.disabled = true;
-            }
-            if (timerStartTimestamp) {
-                const now = Math.floor(Date.now() / 1000);
-                teachingSeconds += (now - timerStartTimestamp);
-                timerStartTimestamp = null;
-            }
-            stopClientTimer();
-            updateTeachingTimerDisplay();
+        const state = data.state;
+        if (!state) return;
+
+        serverOffset = state.server_time - Date.now() / 1000;
+        teachingSeconds = state.teaching_seconds[userId] || 0;
+        const isMine = state.active_teacher_id != null && state.active_teacher_id == userId;
+        timerStartTimestamp = isMine ? state.active_started_at : null;
+
+        if (startTimerBtn) {
+            startTimerBtn.disabled = isMine;
+            stopTimerBtn.disabled = !isMine;
         }
+        if (isMine) startClientTimer();
+        else stopClientTimer();
+        updateTeachingTimerDisplay();
+    }
+
+    function handleTimerError(data) {
+        // Undo the optimistic button change; our timer state is unchanged.
+        if (startTimerBtn) {
+            startTimerBtn.disabled = !!timerStartTimestamp;
+            stopTimerBtn.disabled = !timerStartTimestamp;
+        }
+        alert(data.error || 'Timer error');
     }
 
     if (endSessionBtn) {
@@ -639,4 +864,6 @@ document.addEventListener('DOMContentLoaded', function () {
             this.textContent = localStream.getVideoTracks()[0].enabled ? 'Camera Off' : 'Camera On';
         }
     });
+
+    connectSocket();
 });
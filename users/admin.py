@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, Bank, CreditTransaction, Session, SessionTimer, Review
+from .models import User, Bank, BankShard, CreditTransaction, Session, SessionTimer, Review, PartnerRecommendation
 
 
 @admin.register(User)
@@ -25,7 +25,12 @@ class UserAdmin(BaseUserAdmin):
 
 @admin.register(Bank)
 class BankAdmin(admin.ModelAdmin):
-    list_display = ('total_credits', 'updated_at')
+    list_display = ('__str__', 'total_credits')
+
+
+@admin.register(BankShard)
+class BankShardAdmin(admin.ModelAdmin):
+    list_display = ('index', 'balance', 'updated_at')
 
 
 @admin.register(CreditTransaction)
@@ -50,3 +55,8 @@ class SessionTimerAdmin(admin.ModelAdmin):
 class ReviewAdmin(admin.ModelAdmin):
     list_display = ('reviewer', 'reviewee', 'rating', 'session', 'created_at')
     list_filter = ('rating', 'created_at')
+
+
+@admin.register(PartnerRecommendation)
+class PartnerRecommendationAdmin(admin.ModelAdmin):
+    list_display = ('user', 'partner', 'score')
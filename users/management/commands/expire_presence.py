@@ -0,0 +1,17 @@
+"""
+Mark users offline whose last heartbeat is older than PRESENCE_TIMEOUT_SECONDS.
+
+Web processes already do this on every presence flush; run this from cron so
+users still go offline when no requests are coming in.
+"""
+from django.core.management.base import BaseCommand
+
+from link_and_learn.presence import expire_stale
+
+
+class Command(BaseCommand):
+    help = 'Mark users with no recent heartbeat as offline.'
+    
+    def handle(self, *args, **options):
+        expired = expire_stale()
+        self.stdout.write(self.style.SUCCESS(f'Marked {expired} users offline.'))
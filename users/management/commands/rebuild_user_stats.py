@@ -0,0 +1,14 @@
+"""
+Rebuild the denormalized review and session counters on User.
+"""
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+
+
+class Command(BaseCommand):
+    help = 'Recompute review_count, rating_sum and session_count for all users.'
+    
+    def handle(self, *args, **options):
+        User = get_user_model()
+        updated = User.rebuild_stats()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {updated} users.'))
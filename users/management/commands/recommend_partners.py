@@ -0,0 +1,14 @@
+"""
+Recompute "people you may learn from" for every user. Meant to run nightly.
+"""
+from django.core.management.base import BaseCommand
+
+from users import partners
+
+
+class Command(BaseCommand):
+    help = 'Rebuild partner recommendations from the session and review graph.'
+    
+    def handle(self, *args, **options):
+        updated = partners.refresh()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt partner recommendations for {updated} users.'))
@@ -0,0 +1,165 @@
+"""
+Check that balances agree with the credit ledger.
+
+For every user, User.credits must equal the sum of their CreditTransaction
+amounts. Every non-signup transaction is a transfer to or from the bank, so
+the bank total must equal its opening balance minus the sum of those amounts.
+
+The user-id range is split into slices. Each slice streams users and
+per-user ledger sums (grouped in the database) in id order with .iterator()
+and merge-joins them, so memory stays flat regardless of ledger size. Slices
+can run in a process pool with --workers.
+
+Output is JSON lines: one object per drifted user, one for the bank and a
+final summary.
+"""
+import json
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Max, Min, Sum
+
+
+def reconcile_range(low, high, chunk_size):
+    """
+    Reconcile users with low <= id < high.
+    
+    Returns (drifted rows, users checked, {transaction_type: total}).
+    """
+    # Models are imported here, not at module level, so a worker started
+    # with spawn can unpickle this function before Django is set up.
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+    from users.models import CreditTransaction, User, to_credits
+    
+    users = (
+        User.objects.filter(pk__gte=low, pk__lt=high)
+        .order_by('pk')
+        .values_list('pk', 'credits')
+        .iterator(chunk_size=chunk_size)
+    )
+    ledger = (
+        CreditTransaction.objects.filter(user_id__gte=low, user_id__lt=high)
+        .order_by('user_id')
+        .values('user_id')
+        .annotate(total=Sum('amount'))
+        .values_list('user_id', 'total')
+        .iterator(chunk_size=chunk_size)
+    )
+    
+    drifted = []
+    checked = 0
+    pending = next(ledger, None)
+    for user_id, credits in users:
+        checked += 1
+        # Ledger rows for users that no longer exist are skipped.
+        while pending is not None and pending[0] < user_id:
+            pending = next(ledger, None)
+        total = Decimal('0.00')
+        if pending is not None and pending[0] == user_id:
+            total = pending[1] or Decimal('0.00')
+            pending = next(ledger, None)
+        drift = to_credits(credits - total)
+        if drift:
+            drifted.append({
+                'kind': 'user',
+                'user_id': user_id,
+                'credits': str(to_credits(credits)),
+                'ledger': str(to_credits(total)),
+                'drift': str(drift),
+            })
+    
+    by_type = {
+        row['transaction_type']: row['total']
+        for row in CreditTransaction.objects.filter(user_id__gte=low, user_id__lt=high)
+        .order_by()
+        .values('transaction_type')
+        .annotate(total=Sum('amount'))
+    }
+    return drifted, checked, by_type
+
+
+class Command(BaseCommand):
+    help = 'Compare user balances and the bank total against the credit ledger.'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Processes to spread the user-id range over.')
+        parser.add_argument('--slice-size', type=int, default=50000,
+                            help='User ids per unit of work.')
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Rows fetched per database round trip.')
+        parser.add_argument('--bank-opening', default='100.00',
+                            help='Bank balance before the first ledger entry.')
+        parser.add_argument('--output', help='Write the JSON-lines report here instead of stdout.')
+        parser.add_argument('--fail-on-drift', action='store_true',
+                            help='Exit with an error if any drift is found.')
+    
+    def handle(self, *args, **options):
+        from users.models import Bank, User, to_credits
+        
+        bounds = User.objects.aggregate(low=Min('pk'), high=Max('pk'))
+        slices = []
+        if bounds['low'] is not None:
+            step = max(options['slice_size'], 1)
+            slices = [
+                (low, min(low + step, bounds['high'] + 1))
+                for low in range(bounds['low'], bounds['high'] + 1, step)
+            ]
+        
+        if options['workers'] > 1 and len(slices) > 1:
+            # Forked workers must not share the parent's connections.
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+                results = list(pool.map(
+                    reconcile_range,
+                    [low for low, _ in slices],
+                    [high for _, high in slices],
+                    [options['chunk_size']] * len(slices),
+                ))
+        else:
+            results = [reconcile_range(low, high, options['chunk_size']) for low, high in slices]
+        
+        out = open(options['output'], 'w') if options['output'] else self.stdout
+        try:
+            drifted_users = 0
+            checked = 0
+            by_type = {}
+            for rows, count, totals in results:
+                checked += count
+                drifted_users += len(rows)
+                for row in rows:
+                    out.write(json.dumps(row) + '\n')
+                for transaction_type, total in totals.items():
+                    by_type[transaction_type] = by_type.get(transaction_type, Decimal('0.00')) + (total or 0)
+            
+            transfers = sum(
+                (total for transaction_type, total in by_type.items() if transaction_type != 'SIGNUP'),
+                Decimal('0.00'),
+            )
+            expected_bank = to_credits(Decimal(options['bank_opening']) - transfers)
+            actual_bank = Bank.get_instance().total_credits
+            bank_drift = to_credits(actual_bank - expected_bank)
+            out.write(json.dumps({
+                'kind': 'bank',
+                'total_credits': str(actual_bank),
+                'ledger': str(expected_bank),
+                'drift': str(bank_drift),
+                'by_type': {key: str(to_credits(value)) for key, value in sorted(by_type.items())},
+            }) + '\n')
+            out.write(json.dumps({
+                'kind': 'summary',
+                'users_checked': checked,
+                'users_drifted': drifted_users,
+                'bank_drifted': bool(bank_drift),
+            }) + '\n')
+        finally:
+            if out is not self.stdout:
+                out.close()
+        
+        if options['fail_on_drift'] and (drifted_users or bank_drift):
+            raise CommandError(f'Ledger drift found: {drifted_users} users, bank drift {bank_drift}.')
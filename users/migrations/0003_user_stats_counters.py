@@ -0,0 +1,49 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:03
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def populate_stats(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    Review = apps.get_model('users', 'Review')
+    Session = apps.get_model('users', 'Session')
+    
+    for row in Review.objects.values('reviewee').annotate(count=Count('id'), total=Sum('rating')):
+        User.objects.filter(pk=row['reviewee']).update(
+            review_count=row['count'], rating_sum=row['total'] or 0
+        )
+    
+    counts = {}
+    for field in ('user1', 'user2'):
+        finished = Session.objects.filter(end_time__isnull=False)
+        for row in finished.values(field).annotate(count=Count('id')):
+            counts[row[field]] = counts.get(row[field], 0) + row['count']
+    for user_id, count in counts.items():
+        User.objects.filter(pk=user_id).update(session_count=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_session_ide_code_session_ide_language_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='session_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
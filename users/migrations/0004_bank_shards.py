@@ -0,0 +1,59 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:05
+
+from decimal import Decimal
+from django.db import migrations, models
+
+# BANK_SHARD_COUNT when this migration was written; Bank.add_credits creates
+# any further shards on first use if the setting is raised later.
+SHARD_COUNT = 8
+
+
+def split_bank_balance(apps, schema_editor):
+    # Seed shard 0 with the existing balance (or the old get_or_create
+    # default) so the reported total is unchanged.
+    Bank = apps.get_model('users', 'Bank')
+    BankShard = apps.get_model('users', 'BankShard')
+    bank, _ = Bank.objects.get_or_create(pk=1)
+    for index in range(SHARD_COUNT):
+        BankShard.objects.create(
+            index=index,
+            balance=bank.total_credits if index == 0 else Decimal('0.00'),
+        )
+
+
+def merge_bank_balance(apps, schema_editor):
+    Bank = apps.get_model('users', 'Bank')
+    BankShard = apps.get_model('users', 'BankShard')
+    total = BankShard.objects.aggregate(total=models.Sum('balance'))['total'] or Decimal('0.00')
+    Bank.objects.update_or_create(pk=1, defaults={'total_credits': total})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_stats_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BankShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveSmallIntegerField(unique=True)),
+                ('balance', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['index'],
+            },
+        ),
+        migrations.RunPython(split_bank_balance, merge_bank_balance),
+        migrations.RemoveField(
+            model_name='bank',
+            name='total_credits',
+        ),
+        migrations.RemoveField(
+            model_name='bank',
+            name='updated_at',
+        ),
+    ]
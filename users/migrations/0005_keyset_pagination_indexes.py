@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_bank_shards'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='credittransaction',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='credittx_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['user1', '-start_time', '-id'], name='session_user1_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['user2', '-start_time', '-id'], name='session_user2_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['is_active', '-date_joined', '-id'], name='user_active_joined_idx'),
+        ),
+    ]
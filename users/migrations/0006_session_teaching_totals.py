@@ -0,0 +1,45 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:10
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def populate_teaching_totals(apps, schema_editor):
+    Session = apps.get_model('users', 'Session')
+    SessionTimer = apps.get_model('users', 'SessionTimer')
+    totals = SessionTimer.objects.filter(end_time__isnull=False).values('session', 'teacher').annotate(
+        total=Sum('duration_seconds')
+    )
+    sessions = Session.objects.in_bulk({row['session'] for row in totals})
+    for row in totals:
+        session = sessions[row['session']]
+        if row['teacher'] == session.user1_id:
+            session.user1_teaching_seconds = row['total'] or 0
+        elif row['teacher'] == session.user2_id:
+            session.user2_teaching_seconds = row['total'] or 0
+    Session.objects.bulk_update(sessions.values(), ['user1_teaching_seconds', 'user2_teaching_seconds'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='user1_teaching_seconds',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='session',
+            name='user2_teaching_seconds',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='sessiontimer',
+            index=models.Index(fields=['session', 'end_time'], name='timer_session_end_idx'),
+        ),
+        migrations.RunPython(populate_teaching_totals, migrations.RunPython.noop),
+    ]
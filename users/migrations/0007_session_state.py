@@ -0,0 +1,68 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:13
+
+import zlib
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+DEFAULT_IDE_CODE = '// Start coding...'
+
+
+def move_blobs_to_state(apps, schema_editor):
+    Session = apps.get_model('users', 'Session')
+    SessionState = apps.get_model('users', 'SessionState')
+    rows = (
+        Session.objects.exclude(whiteboard_state='', ide_code=DEFAULT_IDE_CODE)
+        .values_list('pk', 'whiteboard_state', 'ide_code')
+        .iterator(chunk_size=500)
+    )
+    batch = []
+    for pk, whiteboard, ide_code in rows:
+        batch.append(SessionState(
+            session_id=pk,
+            whiteboard_data=zlib.compress(whiteboard.encode('utf-8')) if whiteboard else b'',
+            ide_code_data=zlib.compress(ide_code.encode('utf-8')) if ide_code != DEFAULT_IDE_CODE else b'',
+        ))
+        if len(batch) >= 500:
+            SessionState.objects.bulk_create(batch)
+            batch = []
+    SessionState.objects.bulk_create(batch)
+
+
+def move_blobs_to_session(apps, schema_editor):
+    Session = apps.get_model('users', 'Session')
+    SessionState = apps.get_model('users', 'SessionState')
+    for state in SessionState.objects.iterator(chunk_size=500):
+        Session.objects.filter(pk=state.session_id).update(
+            whiteboard_state=zlib.decompress(bytes(state.whiteboard_data)).decode('utf-8') if state.whiteboard_data else '',
+            ide_code=zlib.decompress(bytes(state.ide_code_data)).decode('utf-8') if state.ide_code_data else DEFAULT_IDE_CODE,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_session_teaching_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessionState',
+            fields=[
+                ('session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='state', serialize=False, to='users.session')),
+                ('whiteboard_data', models.BinaryField(default=b'')),
+                ('ide_code_data', models.BinaryField(default=b'')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(move_blobs_to_state, move_blobs_to_session),
+        migrations.RemoveField(
+            model_name='session',
+            name='ide_code',
+        ),
+        migrations.RemoveField(
+            model_name='session',
+            name='whiteboard_state',
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:53
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ('users', '0007_session_state'),
+    ]
+    
+    operations = [
+        migrations.CreateModel(
+            name='PartnerRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('partner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='partner_recommendations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['user', '-score'],
+                'indexes': [models.Index(fields=['user', '-score'], name='partner_rec_user_score_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='partnerrecommendation',
+            constraint=models.UniqueConstraint(fields=('user', 'partner'), name='partner_recommendation_unique'),
+        ),
+    ]
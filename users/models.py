@@ -1,13 +1,17 @@
 """
 User models for Link & Learn.
-Includes custom User, Bank, CreditTransaction, Session, SessionTimer, and Review.
+Includes custom User, Bank, BankShard, CreditTransaction, Session, SessionState,
+SessionTimer, Review, and PartnerRecommendation.
 """
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
+from django.core.cache import cache
 from django.core.validators import MinValueValidator, MaxValueValidator
 from decimal import Decimal
+import random
+import zlib
 
 
 class UserManager(BaseUserManager):
@@ -49,6 +53,12 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_staff = models.BooleanField(default=False)
     date_joined = models.DateTimeField(auto_now_add=True)
     
+    # Denormalized profile stats, kept current by Review.save/delete and
+    # Session.end_session. Rebuild with `manage.py rebuild_user_stats`.
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    session_count = models.PositiveIntegerField(default=0)
+    
     objects = UserManager()
     
     USERNAME_FIELD = 'email'
@@ -58,6 +68,9 @@ class User(AbstractBaseUser, PermissionsMixin):
         verbose_name = 'user'
         verbose_name_plural = 'users'
         ordering = ['-date_joined']
+        indexes = [
+            models.Index(fields=['is_active', '-date_joined', '-id'], name='user_active_joined_idx'),
+        ]
     
     def __str__(self):
         return self.email
@@ -67,35 +80,69 @@ class User(AbstractBaseUser, PermissionsMixin):
     
     @property
     def average_rating(self):
-        reviews = self.reviews_received.all()
-        if not reviews.exists():
+        if not self.review_count:
             return None
-        return reviews.aggregate(models.Avg('rating'))['rating__avg']
+        return self.rating_sum / self.review_count
     
     @property
     def total_reviews(self):
-        return self.reviews_received.count()
+        return self.review_count
     
     @property
     def total_sessions(self):
-        return Session.objects.filter(
-            models.Q(user1=self) | models.Q(user2=self),
-            end_time__isnull=False
-        ).count()
+        return self.session_count
+    
+    def refresh_review_stats(self):
+        """Recompute review_count and rating_sum from this user's reviews."""
+        stats = Review.objects.filter(reviewee=self).aggregate(
+            count=models.Count('id'), total=models.Sum('rating')
+        )
+        self.review_count = stats['count']
+        self.rating_sum = stats['total'] or 0
+        User.objects.filter(pk=self.pk).update(
+            review_count=self.review_count, rating_sum=self.rating_sum
+        )
+    
+    @classmethod
+    def rebuild_stats(cls):
+        """Recompute the denormalized stats for every user from scratch."""
+        reviews = {
+            row['reviewee']: row
+            for row in Review.objects.values('reviewee').annotate(
+                count=models.Count('id'), total=models.Sum('rating')
+            )
+        }
+        sessions = {}
+        for field in ('user1', 'user2'):
+            finished = Session.objects.filter(end_time__isnull=False)
+            for row in finished.values(field).annotate(count=models.Count('id')):
+                sessions[row[field]] = sessions.get(row[field], 0) + row['count']
+        
+        users = list(cls.objects.only('id', 'review_count', 'rating_sum', 'session_count'))
+        for user in users:
+            row = reviews.get(user.id)
+            user.review_count = row['count'] if row else 0
+            user.rating_sum = row['total'] if row else 0
+            user.session_count = sessions.get(user.id, 0)
+        cls.objects.bulk_update(users, ['review_count', 'rating_sum', 'session_count'], batch_size=500)
+        return len(users)
+
+
+class _ShardChanged(Exception):
+    """A shard's balance moved during a multi-shard debit."""
 
 
 class Bank(models.Model):
     """
     Singleton Bank that accumulates 10% cut from teaching credits.
     Provides support to low-credit users.
+    
+    The balance is spread over BankShard rows so concurrent settlements
+    update different rows instead of all serializing on one.
     """
     
-    total_credits = models.DecimalField(
-        max_digits=15, decimal_places=2,
-        default=Decimal('100.00'),
-        help_text='Total credits in bank'
-    )
-    updated_at = models.DateTimeField(auto_now=True)
+    TOTAL_CACHE_KEY = 'bank:total_credits'
+    DRAIN_ATTEMPTS = 3
     
     class Meta:
         verbose_name = 'bank'
@@ -105,16 +152,82 @@ class Bank(models.Model):
     
     @classmethod
     def get_instance(cls):
-        bank, _ = cls.objects.get_or_create(pk=1)
+        # The row carries no state of its own, so skip the lookup.
+        bank = cls(pk=1)
+        bank._state.adding = False
         return bank
     
+    @property
+    def total_credits(self):
+        """Sum of all shard balances, cached until the next write."""
+        total = cache.get(self.TOTAL_CACHE_KEY)
+        if total is None:
+            total = to_credits(BankShard.objects.aggregate(total=models.Sum('balance'))['total'] or 0)
+            cache.set(self.TOTAL_CACHE_KEY, total, settings.BANK_TOTAL_CACHE_SECONDS)
+        return total
+    
+    def _invalidate_total(self):
+        from django.db import transaction as db_transaction
+        cache.delete(self.TOTAL_CACHE_KEY)
+        db_transaction.on_commit(lambda: cache.delete(self.TOTAL_CACHE_KEY))
+    
     def add_credits(self, amount):
-        self.total_credits += Decimal(str(amount))
-        self.save(update_fields=['total_credits', 'updated_at'])
+        """Credit a randomly chosen shard."""
+        amount = to_credits(amount)
+        index = random.randrange(settings.BANK_SHARD_COUNT)
+        shard = BankShard.objects.filter(index=index)
+        if not shard.update(balance=models.F('balance') + amount, updated_at=timezone.now()):
+            BankShard.objects.get_or_create(index=index)
+            shard.update(balance=models.F('balance') + amount, updated_at=timezone.now())
+        self._invalidate_total()
     
     def deduct_credits(self, amount):
-        self.total_credits -= Decimal(str(amount))
-        self.save(update_fields=['total_credits', 'updated_at'])
+        """
+        Debit the bank, preferring a single shard that covers the amount.
+        Returns False without changing anything if the bank is short.
+        """
+        from django.db import transaction as db_transaction
+        amount = to_credits(amount)
+        
+        candidates = list(
+            BankShard.objects.filter(balance__gte=amount).values_list('index', flat=True)
+        )
+        random.shuffle(candidates)
+        for index in candidates:
+            updated = BankShard.objects.filter(index=index, balance__gte=amount).update(
+                balance=models.F('balance') - amount, updated_at=timezone.now()
+            )
+            if updated:
+                self._invalidate_total()
+                return True
+        
+        # No single shard is big enough: drain several. Row locks are a no-op
+        # on SQLite, so each debit is also conditional on the balance it read;
+        # if a shard moved underneath us, undo the partial drain and try again.
+        for _ in range(self.DRAIN_ATTEMPTS):
+            try:
+                with db_transaction.atomic():
+                    shards = list(
+                        BankShard.objects.select_for_update().filter(balance__gt=0).order_by('-balance')
+                    )
+                    if sum(shard.balance for shard in shards) < amount:
+                        return False
+                    remaining = amount
+                    for shard in shards:
+                        take = min(shard.balance, remaining)
+                        updated = BankShard.objects.filter(pk=shard.pk, balance__gte=take).update(
+                            balance=models.F('balance') - take, updated_at=timezone.now()
+                        )
+                        if not updated:
+                            raise _ShardChanged
+                        remaining -= take
+                        if not remaining:
+                            break
+            except _ShardChanged:
+                continue
+            self._invalidate_total()
+            return True
+        return False
     
     def get_support_amount(self, user_credits):
         """Calculate support amount based on user's current credits."""
@@ -128,6 +241,20 @@ class Bank(models.Model):
         return 0
 
 
+class BankShard(models.Model):
+    """One slice of the bank balance. Bank.total_credits is the sum of all shards."""
+    
+    index = models.PositiveSmallIntegerField(unique=True)
+    balance = models.DecimalField(max_digits=15, decimal_places=2, default=Decimal('0.00'))
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['index']
+    
+    def __str__(self):
+        return f"Bank shard {self.index} ({self.balance} credits)"
+
+
 class CreditTransaction(models.Model):
     """Tracks all credit movements for audit trail."""
     
@@ -158,24 +285,73 @@ class CreditTransaction(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='credittx_user_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.name}: {self.amount:+.2f} ({self.transaction_type})"
     
     @classmethod
     def record_transaction(cls, user, amount, transaction_type, session=None, description=''):
+        return cls.post_entries([{
+            'user': user,
+            'amount': amount,
+            'transaction_type': transaction_type,
+            'session': session,
+            'description': description,
+        }])[0]
+    
+    @classmethod
+    def post_entries(cls, entries):
+        """
+        Post several ledger entries in one transaction.
+        
+        Each entry is a dict with user, amount, transaction_type and optional
+        session/description. Balances move with one F() UPDATE per user, the
+        resulting balances are read back in a single query, and the ledger
+        rows are written with one bulk_create. The passed-in user objects get
+        their credits refreshed to the database value.
+        """
         from django.db import transaction as db_transaction
+        
+        deltas = {}
+        for entry in entries:
+            entry['amount'] = to_credits(entry['amount'])
+            user_id = entry['user'].pk
+            deltas[user_id] = deltas.get(user_id, Decimal('0.00')) + entry['amount']
+        
         with db_transaction.atomic():
-            user.credits += Decimal(str(amount))
-            user.save(update_fields=['credits'])
-            return cls.objects.create(
-                user=user,
-                session=session,
-                amount=Decimal(str(amount)),
-                transaction_type=transaction_type,
-                balance_after=user.credits,
-                description=description
-            )
+            for user_id, delta in deltas.items():
+                User.objects.filter(pk=user_id).update(credits=models.F('credits') + delta)
+            balances = dict(User.objects.filter(pk__in=deltas).values_list('pk', 'credits'))
+            
+            # Replay the entries forward from the pre-posting balance so each
+            # row records the balance right after it was applied.
+            running = {user_id: balances[user_id] - delta for user_id, delta in deltas.items()}
+            rows = []
+            for entry in entries:
+                user = entry['user']
+                running[user.pk] += entry['amount']
+                user.credits = balances[user.pk]
+                rows.append(cls(
+                    user=user,
+                    session=entry.get('session'),
+                    amount=entry['amount'],
+                    transaction_type=entry['transaction_type'],
+                    balance_after=running[user.pk],
+                    description=entry.get('description', ''),
+                ))
+            return cls.objects.bulk_create(rows)
+
+
+def to_credits(amount):
+    """Coerce a float/int/Decimal amount to a 2-place credit Decimal."""
+    return Decimal(str(amount)).quantize(Decimal('0.01'))
+
+
+class TimerError(Exception):
+    """Raised when a teaching timer action is not allowed."""
 
 
 class Session(models.Model):
@@ -201,13 +377,20 @@ class Session(models.Model):
     end_time = models.DateTimeField(null=True, blank=True)
     is_active = models.BooleanField(default=True)
     
-    # State Persistence
-    whiteboard_state = models.TextField(blank=True, default='')
-    ide_code = models.TextField(blank=True, default='// Start coding...')
+    # State Persistence (the large blobs live in SessionState)
     ide_language = models.CharField(max_length=50, default='javascript')
     
+    # Seconds taught by each participant over stopped timers, kept current
+    # by SessionTimer.stop so the session page needs no timer aggregation.
+    user1_teaching_seconds = models.PositiveIntegerField(default=0)
+    user2_teaching_seconds = models.PositiveIntegerField(default=0)
+    
     class Meta:
         ordering = ['-start_time']
+        indexes = [
+            models.Index(fields=['user1', '-start_time', '-id'], name='session_user1_start_idx'),
+            models.Index(fields=['user2', '-start_time', '-id'], name='session_user2_start_idx'),
+        ]
     
     def __str__(self):
         return f"Session: {self.user1.name} <-> {self.user2.name}"
@@ -218,28 +401,109 @@ class Session(models.Model):
             return (self.end_time - self.start_time).total_seconds()
         return (timezone.now() - self.start_time).total_seconds()
     
+    def get_teaching_totals(self):
+        """Return {teacher_id: seconds} for this session in one grouped query."""
+        rows = self.timers.order_by().values('teacher').annotate(total=models.Sum('duration_seconds'))
+        return {row['teacher']: row['total'] or 0 for row in rows}
+    
     def get_teaching_time(self, user):
-        total_seconds = 0
-        for timer in self.timers.filter(teacher=user):
-            total_seconds += timer.duration_seconds
-        return total_seconds
+        return self.get_teaching_totals().get(user.pk, 0)
+    
+    def stored_teaching_time(self, user):
+        """Teaching seconds from the persisted per-participant totals (no query)."""
+        if user.pk == self.user1_id:
+            return self.user1_teaching_seconds
+        if user.pk == self.user2_id:
+            return self.user2_teaching_seconds
+        return 0
     
     def end_session(self):
-        self.is_active = False
-        self.end_time = timezone.now()
+        """End the session; returns False if it had already been ended."""
         for timer in self.timers.filter(end_time__isnull=True):
             timer.stop()
-        self.save(update_fields=['is_active', 'end_time'])
+        end_time = timezone.now()
+        # Conditional update so a session ended twice concurrently is only
+        # counted once in the participants' session counts.
+        ended = Session.objects.filter(pk=self.pk, end_time__isnull=True).update(
+            is_active=False, end_time=end_time
+        )
+        if not ended:
+            self.refresh_from_db(fields=['is_active', 'end_time'])
+            return False
+        self.is_active = False
+        self.end_time = end_time
+        User.objects.filter(pk__in=[self.user1_id, self.user2_id]).update(
+            session_count=models.F('session_count') + 1
+        )
+        return True
     
     def get_active_timer(self):
         return self.timers.filter(end_time__isnull=True).first()
     
+    def load_state(self):
+        """Return this session's SessionState, or an unsaved empty one."""
+        try:
+            return self.state
+        except SessionState.DoesNotExist:
+            return SessionState(session=self)
+    
+    def timer_state(self):
+        """Snapshot of the teaching timers, timestamped with the server clock."""
+        active = self.get_active_timer()
+        return {
+            'active_teacher_id': active.teacher_id if active else None,
+            'active_started_at': active.start_time.timestamp() if active else None,
+            'teaching_seconds': {
+                str(self.user1_id): self.user1_teaching_seconds,
+                str(self.user2_id): self.user2_teaching_seconds,
+            },
+            'server_time': timezone.now().timestamp(),
+        }
+    
+    @classmethod
+    def apply_timer_action(cls, session_id, user, action):
+        """
+        Start or stop a teaching timer with the session row locked.
+        
+        Returns the resulting timer_state(); raises TimerError if the action
+        is not allowed.
+        """
+        from django.db import transaction as db_transaction
+        
+        with db_transaction.atomic():
+            try:
+                session = cls.objects.select_for_update().get(pk=session_id)
+            except cls.DoesNotExist:
+                raise TimerError('Session not found')
+            if user.pk not in (session.user1_id, session.user2_id):
+                raise TimerError('Unauthorized')
+            if not session.is_active:
+                raise TimerError('Session ended')
+            
+            if action == 'start':
+                learner_id = session.user2_id if user.pk == session.user1_id else session.user1_id
+                learner_credits = User.objects.filter(pk=learner_id).values_list('credits', flat=True).get()
+                if learner_credits < Decimal('1.00'):
+                    raise TimerError('Learner has insufficient credits (min 1 required).')
+                SessionTimer.start_timer(session, user)
+            elif action == 'stop':
+                active = session.timers.select_for_update().filter(end_time__isnull=True).first()
+                if not active:
+                    raise TimerError('No active timer')
+                active.stop()
+            else:
+                raise TimerError(f'Unknown timer action: {action}')
+            
+            session.refresh_from_db(fields=['user1_teaching_seconds', 'user2_teaching_seconds'])
+            return session.timer_state()
+    
     def calculate_credits(self):
         """Calculate credits for both users based on teaching time."""
         from django.conf import settings as conf
         
-        user1_teaching_seconds = self.get_teaching_time(self.user1)
-        user2_teaching_seconds = self.get_teaching_time(self.user2)
+        totals = self.get_teaching_totals()
+        user1_teaching_seconds = totals.get(self.user1_id, 0)
+        user2_teaching_seconds = totals.get(self.user2_id, 0)
         
         # 5 minutes = 1 credit
         user1_earned = (user1_teaching_seconds // 300) * conf.CREDITS_PER_5_MINUTES
@@ -258,6 +522,89 @@ class Session(models.Model):
             'user2_spent': user1_earned,  # user2 pays for user1's teaching
             'bank_cut': bank_cut
         }
+    
+    def settle_credits(self):
+        """Post all credit movements for this session in one transaction."""
+        from django.db import transaction as db_transaction
+        
+        credits = self.calculate_credits()
+        teaching = f'Teaching in session #{self.id}'
+        learning = f'Learning in session #{self.id}'
+        candidates = [
+            (self.user1, credits['user1_earned'], 'TEACHING', teaching),
+            (self.user2, credits['user2_earned'], 'TEACHING', teaching),
+            (self.user1, -credits['user1_spent'], 'LEARNING', learning),
+            (self.user2, -credits['user2_spent'], 'LEARNING', learning),
+        ]
+        entries = [
+            {
+                'user': user,
+                'amount': amount,
+                'transaction_type': transaction_type,
+                'session': self,
+                'description': description,
+            }
+            for user, amount, transaction_type, description in candidates
+            if amount != 0
+        ]
+        
+        with db_transaction.atomic():
+            if entries:
+                CreditTransaction.post_entries(entries)
+            if credits['bank_cut'] > 0:
+                Bank.get_instance().add_credits(credits['bank_cut'])
+        return credits
+
+
+def compress_text(value):
+    return zlib.compress((value or '').encode('utf-8'))
+
+
+def decompress_text(data):
+    if not data:
+        return ''
+    return zlib.decompress(bytes(data)).decode('utf-8')
+
+
+class SessionState(models.Model):
+    """
+    Whiteboard and IDE contents for a session, stored zlib-compressed.
+    
+    Kept off the Session row so the many views that only need session
+    metadata don't load (or lock) the blobs.
+    """
+    
+    DEFAULT_IDE_CODE = '// Start coding...'
+    
+    session = models.OneToOneField(
+        Session, on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='state'
+    )
+    whiteboard_data = models.BinaryField(default=b'')
+    ide_code_data = models.BinaryField(default=b'')
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"State for session {self.session_id}"
+    
+    @property
+    def whiteboard(self):
+        return decompress_text(self.whiteboard_data)
+    
+    @whiteboard.setter
+    def whiteboard(self, value):
+        self.whiteboard_data = compress_text(value)
+    
+    @property
+    def ide_code(self):
+        if not self.ide_code_data:
+            return self.DEFAULT_IDE_CODE
+        return decompress_text(self.ide_code_data)
+    
+    @ide_code.setter
+    def ide_code(self, value):
+        self.ide_code_data = compress_text(value)
 
 
 class SessionTimer(models.Model):
@@ -275,6 +622,9 @@ class SessionTimer(models.Model):
     
     class Meta:
         ordering = ['-start_time']
+        indexes = [
+            models.Index(fields=['session', 'end_time'], name='timer_session_end_idx'),
+        ]
     
     def __str__(self):
         return f"Timer: {self.teacher.name} in session {self.session.id}"
@@ -284,10 +634,33 @@ class SessionTimer(models.Model):
         return self.end_time is None
     
     def stop(self):
-        if self.end_time is None:
-            self.end_time = timezone.now()
-            self.duration_seconds = int((self.end_time - self.start_time).total_seconds())
-            self.save(update_fields=['end_time', 'duration_seconds'])
+        if self.end_time is not None:
+            return
+        end_time = timezone.now()
+        duration = int((end_time - self.start_time).total_seconds())
+        # Conditional update so a timer stopped twice concurrently is only
+        # counted once in the session totals.
+        stopped = SessionTimer.objects.filter(pk=self.pk, end_time__isnull=True).update(
+            end_time=end_time, duration_seconds=duration
+        )
+        if not stopped:
+            self.refresh_from_db(fields=['end_time', 'duration_seconds'])
+            return
+        self.end_time = end_time
+        self.duration_seconds = duration
+        teacher = self.teacher_id
+        Session.objects.filter(pk=self.session_id).update(
+            user1_teaching_seconds=models.Case(
+                models.When(user1_id=teacher, then=models.F('user1_teaching_seconds') + duration),
+                default=models.F('user1_teaching_seconds'),
+                output_field=models.PositiveIntegerField(),
+            ),
+            user2_teaching_seconds=models.Case(
+                models.When(user2_id=teacher, then=models.F('user2_teaching_seconds') + duration),
+                default=models.F('user2_teaching_seconds'),
+                output_field=models.PositiveIntegerField(),
+            ),
+        )
     
     @classmethod
     def start_timer(cls, session, teacher):
@@ -321,3 +694,44 @@ class Review(models.Model):
     
     def __str__(self):
         return f"{self.reviewer.name} -> {self.reviewee.name} ({self.rating}/5)"
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.reviewee.refresh_review_stats()
+    
+    def delete(self, *args, **kwargs):
+        reviewee = self.reviewee
+        result = super().delete(*args, **kwargs)
+        reviewee.refresh_review_stats()
+        return result
+
+
+class PartnerRecommendation(models.Model):
+    """
+    Precomputed "people you may learn from", best first. Rebuilt by
+    `manage.py recommend_partners` (see users.partners).
+    """
+    
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='partner_recommendations'
+    )
+    partner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    score = models.FloatField()
+    
+    class Meta:
+        ordering = ['user', '-score']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'partner'], name='partner_recommendation_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-score'], name='partner_rec_user_score_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} -> {self.partner_id} ({self.score:.3f})"
@@ -0,0 +1,206 @@
+"""
+"People you may learn from": partner recommendations from the session graph.
+
+Every session adds learner -> teacher edges, one per participant who ran a
+teaching timer (or half an edge both ways when neither did). When the
+learner reviewed the teacher, the edge is scaled by mean rating / 3, so
+good sessions pull harder than poor ones.
+
+Recommendations are a truncated personalized PageRank from each user:
+walk PARTNER_WALK_STEPS hops over those edges (and their reverse at half
+weight, reaching fellow learners), stopping with probability 1 - DAMPING
+at each hop, and keep the PARTNER_WALK_FRONTIER most likely people between
+hops. The people who teach, are active, and are not already the user's
+partners are ranked by where the walks end up, and the top
+PARTNER_RECOMMENDATIONS_TOP_N are stored per user (PartnerRecommendation).
+
+Everything is recomputed on each run; schedule `recommend_partners`
+nightly. As with skill suggestions, NumPy and SciPy are optional: without
+them the same walk runs over dicts, one user at a time. The two agree up
+to floating-point ties: a value landing exactly on a rounding boundary
+(see SCALE) can still keep a different person at a cut.
+"""
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # pragma: no cover - optional dependency
+    np = sparse = None
+
+from link_and_learn.ranking import csr_grouped, csr_prune, csr_top_k, top_k
+
+from .models import PartnerRecommendation, Review, Session, User
+
+DAMPING = 0.85
+REVERSE_WEIGHT = 0.5
+BLOCK_SIZE = 2000
+# Walk mass and scores are rounded to 1 / SCALE before every cut, the same
+# way in both implementations (scale, round half to even, unscale), so values
+# that differ only by summation order tie exactly and break ties by user id.
+SCALE = 1e12
+
+
+def load_graph():
+    """Session rows, review rows and active user ids, as plain tuples."""
+    sessions = list(Session.objects.order_by().values_list(
+        'user1_id', 'user2_id', 'user1_teaching_seconds', 'user2_teaching_seconds'
+    ).iterator(chunk_size=10000))
+    reviews = list(Review.objects.order_by().values_list(
+        'reviewer_id', 'reviewee_id', 'rating'
+    ).iterator(chunk_size=10000))
+    active = set(User.objects.filter(is_active=True).values_list('id', flat=True))
+    return sessions, reviews, active
+
+
+# SciPy implementation
+
+def _edges_sparse(sessions, reviews):
+    """(user ids, learner x teacher weight matrix)."""
+    rows = np.array(sessions, dtype=np.int64).reshape(-1, 4)
+    user_keys = np.unique(rows[:, :2])
+    first = np.searchsorted(user_keys, rows[:, 0])
+    second = np.searchsorted(user_keys, rows[:, 1])
+    untimed = 0.5 * ((rows[:, 2] == 0) & (rows[:, 3] == 0))
+    shape = (len(user_keys), len(user_keys))
+    taught = sparse.csr_matrix(
+        (
+            np.concatenate([(rows[:, 2] > 0) + untimed, (rows[:, 3] > 0) + untimed]),
+            (np.concatenate([second, first]), np.concatenate([first, second])),
+        ),
+        shape=shape,
+    )
+    taught.eliminate_zeros()
+    
+    ratings = np.array(reviews, dtype=np.int64).reshape(-1, 3)
+    reviewer = np.searchsorted(user_keys, ratings[:, 0]).clip(max=len(user_keys) - 1)
+    reviewee = np.searchsorted(user_keys, ratings[:, 1]).clip(max=len(user_keys) - 1)
+    known = (user_keys[reviewer] == ratings[:, 0]) & (user_keys[reviewee] == ratings[:, 1])
+    coords = (reviewer[known], reviewee[known])
+    rating_sum = sparse.csr_matrix((ratings[known, 2].astype(np.float64), coords), shape=shape)
+    inverse_count = sparse.csr_matrix((np.ones(int(known.sum())), coords), shape=shape)
+    inverse_count.data = 1 / inverse_count.data
+    # Mean rating / 3 - 1 where reviewed, so edges scale by mean / 3
+    adjustment = rating_sum.multiply(inverse_count).tocsr() / 3
+    adjustment.data -= 1
+    return user_keys, (taught + taught.multiply(adjustment)).tocsr()
+
+
+def _compute_sparse(sessions, reviews, active, top_n, steps, frontier):
+    user_keys, edges = _edges_sparse(sessions, reviews)
+    size = len(user_keys)
+    walk = (edges + REVERSE_WEIGHT * edges.T).tocsr()
+    out_weight = np.asarray(walk.sum(axis=1)).ravel()
+    with np.errstate(divide='ignore'):
+        transition = (sparse.diags(np.where(out_weight > 0, 1 / out_weight, 0)) @ walk).tocsr()
+    
+    teaches = np.asarray(edges.sum(axis=0)).ravel() > 0
+    is_candidate = teaches & np.isin(user_keys, list(active))
+    identity = sparse.identity(size, format='csr')
+    seen = ((walk + identity) > 0).astype(np.float64).tocsr()
+    
+    recommendations = {}
+    for start in range(0, size, BLOCK_SIZE):
+        end = min(start + BLOCK_SIZE, size)
+        reach = identity[start:end]
+        scores = sparse.csr_matrix((end - start, size))
+        for step in range(1, steps + 1):
+            reach = reach @ transition
+            reach.data = np.rint(reach.data * SCALE) / SCALE
+            if step < steps:
+                reach = csr_prune(reach, frontier)
+            scores = scores + DAMPING ** step * reach
+        scores = scores.tocsr()
+        scores.data = np.rint(scores.data * SCALE) / SCALE
+        scores.data *= is_candidate[scores.indices]
+        # Drop the user themselves and people they already had sessions with
+        scores = (scores - scores.multiply(seen[start:end])).tocsr()
+        scores.eliminate_zeros()
+        recommendations.update(csr_grouped(*csr_top_k(scores, top_n), user_keys[start:end], user_keys))
+    return recommendations
+
+
+# Pure-Python implementation
+
+def _compute_python(sessions, reviews, active, top_n, steps, frontier):
+    taught = Counter()
+    for user1, user2, user1_seconds, user2_seconds in sessions:
+        untimed = 0.5 if not user1_seconds and not user2_seconds else 0
+        taught[user2, user1] += (user1_seconds > 0) + untimed
+        taught[user1, user2] += (user2_seconds > 0) + untimed
+    ratings = defaultdict(list)
+    for reviewer, reviewee, rating in reviews:
+        ratings[reviewer, reviewee].append(rating)
+    
+    walk = defaultdict(Counter)
+    teachers = set()
+    for (learner, teacher), weight in taught.items():
+        if not weight:
+            continue
+        if (learner, teacher) in ratings:
+            given = ratings[learner, teacher]
+            weight *= sum(given) / len(given) / 3
+        walk[learner][teacher] += weight
+        walk[teacher][learner] += REVERSE_WEIGHT * weight
+        teachers.add(teacher)
+    transition = {}
+    for user_id, neighbours in walk.items():
+        total = sum(neighbours.values())
+        transition[user_id] = [(other, weight / total) for other, weight in neighbours.items()]
+    candidates = teachers & active
+    
+    recommendations = {}
+    for user_id in walk:
+        reach = {user_id: 1.0}
+        scores = Counter()
+        for step in range(1, steps + 1):
+            following = defaultdict(float)
+            for node, mass in reach.items():
+                for other, probability in transition[node]:
+                    following[other] += mass * probability
+            following = {other: round(mass * SCALE) / SCALE for other, mass in following.items()}
+            reach = dict(top_k(following.items(), frontier)) if step < steps else following
+            for other, mass in reach.items():
+                scores[other] += DAMPING ** step * mass
+        scores = {other: round(score * SCALE) / SCALE for other, score in scores.items()}
+        ranked = top_k(
+            (
+                (other, score) for other, score in scores.items()
+                if score and other in candidates and other != user_id and other not in walk[user_id]
+            ),
+            top_n,
+        )
+        if ranked:
+            recommendations[user_id] = ranked
+    return recommendations
+
+
+def compute(sessions, reviews, active):
+    """{user_id: [(partner_id, score)]}, best first, for every user with sessions."""
+    top_n = settings.PARTNER_RECOMMENDATIONS_TOP_N
+    steps = settings.PARTNER_WALK_STEPS
+    frontier = settings.PARTNER_WALK_FRONTIER
+    if not sessions:
+        return {}
+    if sparse is not None:
+        return _compute_sparse(sessions, reviews, active, top_n, steps, frontier)
+    return _compute_python(sessions, reviews, active, top_n, steps, frontier)
+
+
+def refresh(batch_size=1000):
+    """Replace every PartnerRecommendation. Returns the number of users with recommendations."""
+    recommendations = compute(*load_graph())
+    with transaction.atomic():
+        PartnerRecommendation.objects.all().delete()
+        PartnerRecommendation.objects.bulk_create(
+            [
+                PartnerRecommendation(user_id=user_id, partner_id=partner_id, score=score)
+                for user_id, row in recommendations.items()
+                for partner_id, score in row
+            ],
+            batch_size=batch_size,
+        )
+    return len(recommendations)
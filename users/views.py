@@ -9,14 +9,18 @@ from django.utils import timezone
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 from django.conf import settings
+from django.db import transaction
 from datetime import timedelta
 from decimal import Decimal
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 
 from .forms import SignupForm, LoginForm, ProfileForm, AvailabilityForm, DonationForm, ReviewForm
-from .models import Bank, CreditTransaction, Session, SessionTimer, Review
+from .models import Bank, CreditTransaction, PartnerRecommendation, Session, Review, TimerError
 from requests_app.models import LearningRequest
+from chat.models import WhiteboardSnapshot
+from link_and_learn import presence, search as search_index
+from link_and_learn.pagination import paginate
 
 User = get_user_model()
 
@@ -64,7 +68,8 @@ def login_view(request):
         if form.is_valid():
             user = form.get_user()
             user.is_online = True
-            user.save(update_fields=['is_online'])
+            user.last_seen = timezone.now()
+            user.save(update_fields=['is_online', 'last_seen'])
             login(request, user)
             messages.success(request, f'Welcome back, {user.name}!')
             return redirect('dashboard')
@@ -87,6 +92,7 @@ def logout_view(request):
             user.is_online = False
             user.last_seen = timezone.now()
             user.save(update_fields=['availability', 'is_online', 'last_seen'])
+            presence.tracker.forget(user.pk)
             logout(request)
             messages.success(request, 'You have been logged out.')
             return redirect('home')
@@ -105,9 +111,14 @@ def dashboard(request):
     user = request.user
     # recent_requests removed as per user request
     my_requests = LearningRequest.objects.filter(creator=user, is_completed=False)
+    # Precomputed nightly by `recommend_partners`
+    recommended_partners = PartnerRecommendation.objects.filter(
+        user=user, partner__is_active=True
+    ).select_related('partner')[:settings.PARTNER_RECOMMENDATIONS_TOP_N]
     
     return render(request, 'dashboard/index.html', {
         'my_requests': my_requests,
+        'recommended_partners': recommended_partners,
     })
 
 
@@ -147,8 +158,16 @@ def edit_profile(request):
 @login_required
 def credit_history(request):
     """View credit transaction history."""
-    transactions = CreditTransaction.objects.filter(user=request.user)[:50]
-    return render(request, 'profile/credit_history.html', {'transactions': transactions})
+    page = paginate(
+        request,
+        CreditTransaction.objects.filter(user=request.user),
+        ordering=('-created_at', '-id'),
+        per_page=50,
+    )
+    return render(request, 'profile/credit_history.html', {
+        'transactions': page.object_list,
+        'page': page,
+    })
 
 
 @login_required
@@ -181,27 +200,30 @@ def bank_view(request):
                 if amount > user.credits:
                     messages.error(request, 'Insufficient credits.')
                 else:
-                    CreditTransaction.record_transaction(
-                        user=user,
-                        amount=-amount,
-                        transaction_type='DONATION',
-                        description='Donation to Bank'
-                    )
-                    bank.add_credits(amount)
+                    with transaction.atomic():
+                        CreditTransaction.record_transaction(
+                            user=user,
+                            amount=-amount,
+                            transaction_type='DONATION',
+                            description='Donation to Bank'
+                        )
+                        bank.add_credits(amount)
                     messages.success(request, f'Thank you for donating {amount} credits!')
                     return redirect('bank')
         
         elif action == 'support' and can_request_support and support_amount > 0:
-            if bank.total_credits >= support_amount:
-                bank.deduct_credits(support_amount)
-                CreditTransaction.record_transaction(
-                    user=user,
-                    amount=support_amount,
-                    transaction_type='SUPPORT',
-                    description=f'Bank support ({support_amount} credits)'
-                )
-                user.last_support_request = timezone.now()
-                user.save(update_fields=['last_support_request'])
+            with transaction.atomic():
+                paid = bank.deduct_credits(support_amount)
+                if paid:
+                    CreditTransaction.record_transaction(
+                        user=user,
+                        amount=support_amount,
+                        transaction_type='SUPPORT',
+                        description=f'Bank support ({support_amount} credits)'
+                    )
+                    user.last_support_request = timezone.now()
+                    user.save(update_fields=['last_support_request'])
+            if paid:
                 messages.success(request, f'You received {support_amount} support credits!')
             else:
                 messages.error(request, 'Bank has insufficient funds.')
@@ -221,129 +243,85 @@ def bank_view(request):
 @login_required
 def session_view(request, session_id):
     """Session page with tools."""
-    session = get_object_or_404(Session, pk=session_id)
+    session = get_object_or_404(Session.objects.select_related('user1', 'user2'), pk=session_id)
     
     # Verify user is part of session
-    if request.user not in [session.user1, session.user2]:
+    if request.user.id not in (session.user1_id, session.user2_id):
         messages.error(request, 'You are not part of this session.')
         return redirect('dashboard')
     
     partner = session.user2 if request.user == session.user1 else session.user1
     active_timer = session.get_active_timer()
     
-    # Calculate accumulated teaching time for the current user in this session
-    teaching_seconds = session.get_teaching_time(request.user)
+    # Accumulated teaching time for the current user, persisted on the session
+    teaching_seconds = session.stored_teaching_time(request.user)
     
     return render(request, 'dashboard/session.html', {
         'session': session,
         'partner': partner,
         'active_timer': active_timer,
-        'is_my_timer_running': active_timer and active_timer.teacher == request.user,
+        'is_my_timer_running': active_timer and active_timer.teacher_id == request.user.id,
         'teaching_seconds': teaching_seconds,
-        'active_timer_start': int(active_timer.start_time.timestamp()) if active_timer and active_timer.teacher == request.user else None,
+        'active_timer_start': int(active_timer.start_time.timestamp()) if active_timer and active_timer.teacher_id == request.user.id else None,
+        'server_time': int(timezone.now().timestamp()),
+        'whiteboard': WhiteboardSnapshot.load(session.id),
+        'ide_code': session.load_state().ide_code,
     })
 
 
+def _timer_action(request, session_id, action):
+    """Apply a timer action and push the new state to the session's sockets."""
+    try:
+        state = Session.apply_timer_action(session_id, request.user, action)
+    except TimerError as e:
+        status = 403 if str(e) == 'Unauthorized' else 400
+        return JsonResponse({'error': str(e)}, status=status)
+    
+    channel_layer = get_channel_layer()
+    async_to_sync(channel_layer.group_send)(
+        f'session_{session_id}',
+        {
+            'type': 'timer_update',
+            'action': action,
+            'user_id': request.user.id,
+            'user_name': request.user.name,
+            'state': state,
+        }
+    )
+    return JsonResponse({'success': True, 'state': state})
+
+
 @login_required
 @require_POST
 def start_timer(request, session_id):
-    """Start teaching timer."""
-    session = get_object_or_404(Session, pk=session_id)
-    
-    if request.user not in [session.user1, session.user2]:
-        return JsonResponse({'error': 'Unauthorized'}, status=403)
-    
-    if not session.is_active:
-        return JsonResponse({'error': 'Session ended'}, status=400)
-    
-    learner = session.user2 if request.user == session.user1 else session.user1
-    if learner.credits < Decimal('1.00'):
-        return JsonResponse({'error': 'Learner has insufficient credits (min 1 required).'}, status=400)
-        
-    timer = SessionTimer.start_timer(session, request.user)
-    return JsonResponse({
-        'success': True,
-        'timer_id': timer.id,
-        'teacher': request.user.name
-    })
+    """Start teaching timer (the session page does this over the WebSocket)."""
+    return _timer_action(request, session_id, 'start')
 
 
 @login_required
 @require_POST
 def stop_timer(request, session_id):
-    """Stop teaching timer."""
-    session = get_object_or_404(Session, pk=session_id)
-    
-    active_timer = session.get_active_timer()
-    if active_timer:
-        active_timer.stop()
-        return JsonResponse({
-            'success': True,
-            'duration': active_timer.duration_seconds
-        })
-    
-    return JsonResponse({'error': 'No active timer'}, status=400)
+    """Stop teaching timer (the session page does this over the WebSocket)."""
+    return _timer_action(request, session_id, 'stop')
 
 
 @login_required
 @require_POST
 def end_session(request, session_id):
     """End session and calculate credits."""
-    session = get_object_or_404(Session, pk=session_id)
+    session = get_object_or_404(Session.objects.select_related('user1', 'user2'), pk=session_id)
     
-    if request.user not in [session.user1, session.user2]:
+    if request.user.id not in (session.user1_id, session.user2_id):
         return JsonResponse({'error': 'Unauthorized'}, status=403)
     
     if not session.is_active:
         return JsonResponse({'error': 'Session already ended'}, status=400)
     
-    # End session and calculate credits
-    session.end_session()
-    credits = session.calculate_credits()
-    
-    bank = Bank.get_instance()
+    # End session and settle credits (only once if both end it at the same time)
+    if not session.end_session():
+        return JsonResponse({'error': 'Session already ended'}, status=400)
+    session.settle_credits()
     
-    # Apply credits
-    if credits['user1_earned'] > 0:
-        CreditTransaction.record_transaction(
-            user=session.user1,
-            amount=credits['user1_earned'],
-            transaction_type='TEACHING',
-            session=session,
-            description=f'Teaching in session #{session.id}'
-        )
-    
-    if credits['user2_earned'] > 0:
-        CreditTransaction.record_transaction(
-            user=session.user2,
-            amount=credits['user2_earned'],
-            transaction_type='TEACHING',
-            session=session,
-            description=f'Teaching in session #{session.id}'
-        )
-    
-    if credits['user1_spent'] > 0:
-        CreditTransaction.record_transaction(
-            user=session.user1,
-            amount=-credits['user1_spent'],
-            transaction_type='LEARNING',
-            session=session,
-            description=f'Learning in session #{session.id}'
-        )
-    
-    if credits['user2_spent'] > 0:
-        CreditTransaction.record_transaction(
-            user=session.user2,
-            amount=-credits['user2_spent'],
-            transaction_type='LEARNING',
-            session=session,
-            description=f'Learning in session #{session.id}'
-        )
-    
-    # Bank cut
-    if credits['bank_cut'] > 0:
-        bank.add_credits(credits['bank_cut'])
-        
     # Notify WebSocket
     channel_layer = get_channel_layer()
     async_to_sync(channel_layer.group_send)(
@@ -365,7 +343,7 @@ def session_review(request, session_id):
     """Submit review after session ends."""
     session = get_object_or_404(Session, pk=session_id)
     
-    if request.user not in [session.user1, session.user2]:
+    if request.user.id not in (session.user1_id, session.user2_id):
         messages.error(request, 'You are not part of this session.')
         return redirect('dashboard')
     
@@ -403,9 +381,13 @@ def my_sessions(request):
     from django.db.models import Q
     sessions = Session.objects.filter(
         Q(user1=request.user) | Q(user2=request.user)
-    ).select_related('user1', 'user2')[:20]
+    ).select_related('user1', 'user2')
+    page = paginate(request, sessions, ordering=('-start_time', '-id'), per_page=20)
     
-    return render(request, 'dashboard/sessions.html', {'sessions': sessions})
+    return render(request, 'dashboard/sessions.html', {
+        'sessions': page.object_list,
+        'page': page,
+    })
 
 
 @login_required
@@ -439,29 +421,25 @@ def save_session_state(request, session_id):
     """Save whiteboard and IDE state."""
     session = get_object_or_404(Session, pk=session_id)
     
-    if request.user not in [session.user1, session.user2]:
+    if request.user.id not in (session.user1_id, session.user2_id):
         return JsonResponse({'error': 'Unauthorized'}, status=403)
     
     import json
     try:
         data = json.loads(request.body)
-        fields_to_update = []
         
-        if 'whiteboard' in data:
-            session.whiteboard_state = data['whiteboard']
-            fields_to_update.append('whiteboard_state')
-            
-        if 'ide_code' in data:
-            session.ide_code = data['ide_code']
-            fields_to_update.append('ide_code')
-            
+        if 'whiteboard' in data or 'ide_code' in data:
+            state = session.load_state()
+            if 'whiteboard' in data:
+                state.whiteboard = data['whiteboard']
+            if 'ide_code' in data:
+                state.ide_code = data['ide_code']
+            state.save()
+        
         if 'ide_language' in data:
             session.ide_language = data['ide_language']
-            fields_to_update.append('ide_language')
-            
-        if fields_to_update:
-            session.save(update_fields=fields_to_update)
-            
+            session.save(update_fields=['ide_language'])
+        
         return JsonResponse({'success': True})
     except json.JSONDecodeError:
         return JsonResponse({'error': 'Invalid JSON'}, status=400)
@@ -472,7 +450,11 @@ def users_list(request):
     users = User.objects.filter(is_active=True).exclude(pk=request.user.pk if request.user.is_authenticated else None)
     
     search = request.GET.get('search', '').strip()
-    if search:
-        users = users.filter(name__icontains=search)
-        
-    return render(request, 'profile/users_list.html', {'users': users, 'search': search})
+    users, ordering = search_index.search_users(users, name=search)
+    page = paginate(request, users, ordering=ordering, per_page=30)
+    
+    return render(request, 'profile/users_list.html', {
+        'users': page.object_list,
+        'page': page,
+        'search': search,
+    })
@@ -0,0 +1,148 @@
+"""
+Regression checks for the cached browse feed (requests_app/feed.py).
+
+Runs against a throwaway test database, so it never touches db.sqlite3.
+
+    python verify_browse_feed.py
+"""
+import os
+import random
+import sys
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'link_and_learn.settings')
+django.setup()
+
+from django.core.cache import cache
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from link_and_learn.pagination import KeysetPaginator, dump_cursor
+from requests_app.feed import BrowseFeed
+from requests_app.models import LearningRequest
+from users.models import User
+from verify_helpers import run_checks
+
+ORDERING = ('-created_at', '-id')
+
+
+def make_requests(count=70):
+    rng = random.Random(25)
+    people = [
+        User.objects.create_user(email=f'person{i}@example.com', name=f'Person {i}', password='x')
+        for i in range(6)
+    ]
+    now = timezone.now()
+    for i in range(count):
+        request = LearningRequest.objects.create(
+            creator=rng.choice(people),
+            topic_to_learn=f'Topic {i}',
+            ok_with_just_learning=rng.random() < 0.4,
+        )
+        # Several requests per timestamp, so ties are broken by id
+        LearningRequest.objects.filter(pk=request.pk).update(created_at=now - timezone.timedelta(minutes=i // 3))
+    cache.clear()
+    return people
+
+
+def walk(page_at):
+    """Every page from the first one forward, then back again."""
+    pages = [page_at(None)]
+    while pages[-1].has_next:
+        pages.append(page_at(pages[-1].next_cursor))
+    back = [pages[-1]]
+    while back[-1].has_previous:
+        back.append(page_at(back[-1].prev_cursor))
+    return pages, back[::-1]
+
+
+def signature(pages):
+    return [([row.id for row in page], page.next_cursor, page.prev_cursor) for page in pages]
+
+
+def check_pages_match_database():
+    people = make_requests()
+    feed = BrowseFeed()
+    for viewer in (None, people[0].pk):
+        for bounty_only in (False, True):
+            requests = LearningRequest.get_active_requests().exclude(creator_id=viewer)
+            if bounty_only:
+                requests = requests.filter(ok_with_just_learning=True)
+            paginator = KeysetPaginator(requests, ORDERING, per_page=7)
+            expected = walk(paginator.page)
+            found = walk(lambda cursor: feed.page(cursor, exclude_user_id=viewer, bounty_only=bounty_only, per_page=7))
+            for direction, database_pages, feed_pages in zip(('forward', 'backward'), expected, found):
+                assert signature(feed_pages) == signature(database_pages), (
+                    f'{direction} pages differ (viewer {viewer}, bounty {bounty_only})'
+                )
+    print("✅ pages_match_database")
+
+
+def check_writes_invalidate():
+    people = make_requests(10)
+    feed = BrowseFeed()
+    assert len(feed.page(per_page=50)) == 10
+    added = LearningRequest.objects.create(creator=people[1], topic_to_learn='Fresh')
+    assert feed.page(per_page=50).object_list[0].id == added.pk, 'new request not shown'
+    added.mark_completed()
+    assert added.pk not in {row.id for row in feed.page(per_page=50)}, 'completed request still shown'
+    LearningRequest.objects.filter(is_completed=False).first().delete()
+    assert len(feed.page(per_page=50)) == 9, 'deleted request still shown'
+    print("✅ writes_invalidate")
+
+
+def check_invalidation_reaches_other_workers():
+    # Each worker has its own BrowseFeed; they only share the cache
+    assert not isinstance(cache, (LocMemCache, DummyCache)), 'CACHES must be shared between workers'
+    people = make_requests(5)
+    worker, other_worker = BrowseFeed(), BrowseFeed()
+    worker.page()
+    other_worker.page()
+    added = LearningRequest.objects.create(creator=people[0], topic_to_learn='Fresh')
+    assert other_worker.page().object_list[0].id == added.pk, 'other worker kept serving its stale copy'
+    print("✅ invalidation_reaches_other_workers")
+
+
+def check_warm_hit_reads_only_the_version():
+    make_requests(40)
+    feed = BrowseFeed()
+    first = feed.page(per_page=10)
+    with CaptureQueriesContext(connection) as queries:
+        feed.page(first.next_cursor, per_page=10)
+    assert len(queries) <= 1, f'{len(queries)} queries on a warm hit'
+    print("✅ warm_hit_reads_only_the_version")
+
+
+def check_bad_cursors_give_first_page():
+    make_requests(20)
+    feed = BrowseFeed()
+    first = [row.id for row in feed.page(per_page=5)]
+    for cursor in ('garbage', dump_cursor('next', [None, None]), dump_cursor('prev', ['yesterday', 'x'])):
+        assert [row.id for row in feed.page(cursor, per_page=5)] == first, f'{cursor!r} did not fall back'
+    print("✅ bad_cursors_give_first_page")
+
+
+CHECKS = [
+    check_pages_match_database,
+    check_writes_invalidate,
+    check_invalidation_reaches_other_workers,
+    check_warm_hit_reads_only_the_version,
+    check_bad_cursors_give_first_page,
+]
+
+
+def clear_tables():
+    LearningRequest.objects.all().delete()
+    User.objects.all().delete()
+
+
+def verify():
+    return run_checks("Browse Feed", CHECKS, before_each=clear_tables)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
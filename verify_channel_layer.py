@@ -0,0 +1,249 @@
+"""
+Channel layer conformance checks for BrokerChannelLayer.
+
+Adapted from the channels in-memory layer tests (send/receive, capacity,
+groups, group_send, expiry, flush, ...). Each check starts its own broker
+on a temporary Unix socket in this process and talks to it through
+BrokerChannelLayer, exactly as a worker would.
+
+    python verify_channel_layer.py
+"""
+import asyncio
+import contextlib
+import os
+import sys
+import tempfile
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'link_and_learn.settings')
+django.setup()
+
+from channels.exceptions import ChannelFull
+
+from link_and_learn.channel_layer import BrokerChannelLayer, ChannelBroker
+
+
+@contextlib.asynccontextmanager
+async def broker_layer(**config):
+    """A BrokerChannelLayer connected to a fresh broker with `config`."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'broker.sock')
+        server = asyncio.create_task(ChannelBroker(path, **config).serve())
+        for _ in range(100):
+            if os.path.exists(path):
+                break
+            await asyncio.sleep(0.01)
+        layer = BrokerChannelLayer(path, **config)
+        try:
+            yield layer
+        finally:
+            await layer.close()
+            server.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await server
+
+
+async def receive_nothing(layer, channel, timeout=0.2):
+    """True if nothing arrives on `channel` within `timeout` seconds."""
+    try:
+        await asyncio.wait_for(layer.receive(channel), timeout)
+    except asyncio.TimeoutError:
+        return True
+    return False
+
+
+async def check_send_receive():
+    async with broker_layer() as layer:
+        await layer.send('test-channel-1', {'type': 'test.message', 'text': 'Ahoy-hoy!'})
+        message = await layer.receive('test-channel-1')
+        assert message['type'] == 'test.message'
+        assert message['text'] == 'Ahoy-hoy!'
+
+
+async def check_bytes_roundtrip():
+    async with broker_layer() as layer:
+        await layer.send('test-channel-1', {'type': 'test.message', 'bytes': b'\x00\xffdata'})
+        message = await layer.receive('test-channel-1')
+        assert message['bytes'] == b'\x00\xffdata'
+
+
+async def check_send_capacity():
+    async with broker_layer(capacity=3) as layer:
+        await layer.send('test-channel-1', {'type': 'test.message'})
+        await layer.send('test-channel-1', {'type': 'test.message'})
+        await layer.send('test-channel-1', {'type': 'test.message'})
+        try:
+            await layer.send('test-channel-1', {'type': 'test.message'})
+        except ChannelFull:
+            pass
+        else:
+            raise AssertionError('fourth send should raise ChannelFull')
+
+
+async def check_per_channel_capacity():
+    async with broker_layer(capacity=3, channel_capacity={'special.*': 1}) as layer:
+        await layer.send('special.one', {'type': 'test.message'})
+        try:
+            await layer.send('special.one', {'type': 'test.message'})
+        except ChannelFull:
+            pass
+        else:
+            raise AssertionError('second send to special.one should raise ChannelFull')
+        # Other channels keep the default capacity
+        for _ in range(3):
+            await layer.send('regular.one', {'type': 'test.message'})
+
+
+async def check_process_local_send_receive():
+    async with broker_layer() as layer:
+        channel_name = await layer.new_channel()
+        await layer.send(channel_name, {'type': 'test.message', 'text': 'Local only please'})
+        message = await layer.receive(channel_name)
+        assert message['type'] == 'test.message'
+        assert message['text'] == 'Local only please'
+
+
+async def check_multi_send_receive():
+    async with broker_layer() as layer:
+        await layer.send('test-channel-3', {'type': 'message.1'})
+        await layer.send('test-channel-3', {'type': 'message.2'})
+        await layer.send('test-channel-3', {'type': 'message.3'})
+        assert (await layer.receive('test-channel-3'))['type'] == 'message.1'
+        assert (await layer.receive('test-channel-3'))['type'] == 'message.2'
+        assert (await layer.receive('test-channel-3'))['type'] == 'message.3'
+
+
+async def check_groups_basic():
+    async with broker_layer() as layer:
+        await layer.group_add('test-group', 'test-gr-chan-1')
+        await layer.group_add('test-group', 'test-gr-chan-2')
+        await layer.group_add('test-group', 'test-gr-chan-3')
+        await layer.group_discard('test-group', 'test-gr-chan-2')
+        await layer.group_send('test-group', {'type': 'message.1'})
+        assert (await layer.receive('test-gr-chan-1'))['type'] == 'message.1'
+        assert (await layer.receive('test-gr-chan-3'))['type'] == 'message.1'
+        assert await receive_nothing(layer, 'test-gr-chan-2')
+
+
+async def check_groups_channel_full():
+    async with broker_layer(capacity=3) as layer:
+        await layer.group_add('test-group', 'test-gr-chan-1')
+        # group_send drops messages for full channels instead of raising
+        for _ in range(5):
+            await layer.group_send('test-group', {'type': 'message.1'})
+        for _ in range(3):
+            assert (await layer.receive('test-gr-chan-1'))['type'] == 'message.1'
+        assert await receive_nothing(layer, 'test-gr-chan-1')
+
+
+async def check_expiry_single():
+    async with broker_layer(expiry=0.1) as layer:
+        await layer.send('test-channel-1', {'type': 'message.1'})
+        await asyncio.sleep(0.2)
+        assert await receive_nothing(layer, 'test-channel-1')
+
+
+async def check_expiry_unread():
+    async with broker_layer(expiry=0.1) as layer:
+        await layer.send('test-channel-1', {'type': 'message.1'})
+        await asyncio.sleep(0.2)
+        await layer.send('test-channel-2', {'type': 'message.2'})
+        assert (await layer.receive('test-channel-2'))['type'] == 'message.2'
+        assert await receive_nothing(layer, 'test-channel-1')
+
+
+async def check_expiry_multi():
+    async with broker_layer(expiry=0.1) as layer:
+        await layer.send('test-channel-1', {'type': 'message.1'})
+        await layer.send('test-channel-1', {'type': 'message.2'})
+        await layer.send('test-channel-1', {'type': 'message.3'})
+        assert (await layer.receive('test-channel-1'))['type'] == 'message.1'
+        await asyncio.sleep(0.2)
+        await layer.send('test-channel-1', {'type': 'message.4'})
+        assert (await layer.receive('test-channel-1'))['type'] == 'message.4'
+        assert await receive_nothing(layer, 'test-channel-1')
+
+
+async def check_group_expiry():
+    async with broker_layer(group_expiry=1) as layer:
+        await layer.group_add('test-group', 'test-gr-chan-1')
+        # The in-memory layer compares whole seconds, so wait out two
+        await asyncio.sleep(2.1)
+        await layer.group_send('test-group', {'type': 'message.1'})
+        assert await receive_nothing(layer, 'test-gr-chan-1')
+
+
+async def check_receive_cancel():
+    async with broker_layer() as layer:
+        pending = asyncio.create_task(layer.receive('test-channel-1'))
+        await asyncio.sleep(0.05)
+        pending.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await pending
+        await layer.send('test-channel-1', {'type': 'message.1'})
+        assert (await asyncio.wait_for(layer.receive('test-channel-1'), 1))['type'] == 'message.1'
+
+
+async def check_flush():
+    async with broker_layer() as layer:
+        await layer.send('test-channel-1', {'type': 'message.1'})
+        await layer.group_add('test-group', 'test-gr-chan-1')
+        await layer.flush()
+        assert await receive_nothing(layer, 'test-channel-1')
+        await layer.group_send('test-group', {'type': 'message.2'})
+        assert await receive_nothing(layer, 'test-gr-chan-1')
+
+
+async def check_shared_between_layers():
+    # Two layer instances stand in for two worker processes
+    async with broker_layer() as layer:
+        other = BrokerChannelLayer(layer.path)
+        try:
+            await layer.group_add('test-group', 'test-gr-chan-1')
+            await other.group_send('test-group', {'type': 'message.1'})
+            assert (await layer.receive('test-gr-chan-1'))['type'] == 'message.1'
+        finally:
+            await other.close()
+
+
+CHECKS = [
+    check_send_receive,
+    check_bytes_roundtrip,
+    check_send_capacity,
+    check_per_channel_capacity,
+    check_process_local_send_receive,
+    check_multi_send_receive,
+    check_groups_basic,
+    check_groups_channel_full,
+    check_expiry_single,
+    check_expiry_unread,
+    check_expiry_multi,
+    check_group_expiry,
+    check_receive_cancel,
+    check_flush,
+    check_shared_between_layers,
+]
+
+
+def verify():
+    print("--- Verifying BrokerChannelLayer ---")
+    failed = 0
+    for check in CHECKS:
+        name = check.__name__[len('check_'):]
+        try:
+            asyncio.run(asyncio.wait_for(check(), 10))
+        except Exception as e:
+            failed += 1
+            print(f"❌ {name}: {type(e).__name__}: {e}")
+        else:
+            print(f"✅ {name}")
+    if failed:
+        print(f"\n--- {failed} check(s) failed ---")
+        return False
+    print("\n--- Verification Successful ---")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
@@ -0,0 +1,192 @@
+"""
+Regression checks for session chat: the write-behind message buffer
+(chat/buffer.py) and the membership check made once per socket.
+
+Runs against a throwaway test database, so it never touches db.sqlite3.
+
+    python verify_chat.py
+"""
+import asyncio
+import os
+import sys
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'link_and_learn.settings')
+django.setup()
+
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import AnonymousUser
+from django.test import override_settings
+
+from chat.buffer import ChatMessageBuffer
+from chat.consumers import SessionChatConsumer
+from chat.models import ChatMessage
+from users.models import Session, User
+from verify_helpers import run_checks
+
+
+def make_session():
+    alice = User.objects.create_user(email='alice@example.com', name='Alice', password='x')
+    bob = User.objects.create_user(email='bob@example.com', name='Bob', password='x')
+    return Session.objects.create(user1=alice, user2=bob), alice, bob
+
+
+def session_socket(session, user):
+    communicator = WebsocketCommunicator(SessionChatConsumer.as_asgi(), f'/ws/session/{session.pk}/')
+    communicator.scope['url_route'] = {'kwargs': {'session_id': str(session.pk)}}
+    communicator.scope['user'] = user
+    return communicator
+
+
+def stored(session):
+    return list(ChatMessage.objects.filter(session=session).order_by('id').values_list('content', flat=True))
+
+
+def check_buffer_writes_when_full():
+    session, alice, _ = make_session()
+    buffer = ChatMessageBuffer()
+    
+    async def send(count, start=0):
+        for i in range(start, start + count):
+            await buffer.add(session.pk, alice.pk, f'message {i}')
+    
+    with override_settings(CHAT_BUFFER_SIZE=5, CHAT_BUFFER_SECONDS=60):
+        asyncio.run(send(5))
+        assert stored(session) == [f'message {i}' for i in range(5)], 'full buffer not written'
+        asyncio.run(send(2, start=5))
+        assert len(stored(session)) == 5, 'buffer written before it filled up'
+        buffer.flush_sync()
+    assert len(stored(session)) == 7, 'exit flush lost messages'
+    print("✅ buffer_writes_when_full")
+
+
+def check_buffer_writes_after_delay():
+    session, alice, _ = make_session()
+    buffer = ChatMessageBuffer()
+    
+    async def send_and_wait():
+        await buffer.add(session.pk, alice.pk, 'hello')
+        assert len(buffer.pending) == 1, 'message written before the delay'
+        await asyncio.sleep(0.4)
+    
+    with override_settings(CHAT_BUFFER_SIZE=50, CHAT_BUFFER_SECONDS=0.1):
+        asyncio.run(send_and_wait())
+    assert stored(session) == ['hello'], 'age limit did not flush the buffer'
+    print("✅ buffer_writes_after_delay")
+
+
+def check_deleted_session_drops_only_its_messages():
+    kept, alice, bob = make_session()
+    doomed = Session.objects.create(user1=alice, user2=bob)
+    buffer = ChatMessageBuffer()
+    
+    async def queue():
+        for session in (kept, doomed, kept):
+            await buffer.add(session.pk, alice.pk, f'for {session.pk}')
+    
+    with override_settings(CHAT_BUFFER_SIZE=50, CHAT_BUFFER_SECONDS=60):
+        asyncio.run(queue())
+    doomed.delete()
+    buffer.flush_sync()
+    assert stored(kept) == [f'for {kept.pk}'] * 2, 'messages for a live session were dropped'
+    assert not ChatMessage.objects.filter(session_id=doomed.pk).exists()
+    print("✅ deleted_session_drops_only_its_messages")
+
+
+def check_chat_broadcast_then_written_on_disconnect():
+    session, alice, bob = make_session()
+    
+    async def exchange():
+        alice_socket, bob_socket = session_socket(session, alice), session_socket(session, bob)
+        await alice_socket.connect()
+        await bob_socket.connect()
+        try:
+            await alice_socket.send_json_to({'type': 'chat', 'content': 'hi Bob'})
+            received = await bob_socket.receive_json_from(timeout=5)
+            assert (received['type'], received['content'], received['sender_id']) == ('chat', 'hi Bob', alice.pk)
+        finally:
+            await alice_socket.disconnect()
+            await bob_socket.disconnect()
+    
+    with override_settings(CHAT_BUFFER_SIZE=50, CHAT_BUFFER_SECONDS=60):
+        asyncio.run(exchange())
+    assert stored(session) == ['hi Bob'], 'disconnect did not flush the buffer'
+    print("✅ chat_broadcast_then_written_on_disconnect")
+
+
+def check_only_members_connect():
+    session, alice, _ = make_session()
+    outsider = User.objects.create_user(email='eve@example.com', name='Eve', password='x')
+    
+    async def connects(user):
+        socket = session_socket(session, user)
+        connected, _ = await socket.connect()
+        await socket.disconnect()
+        return connected
+    
+    assert asyncio.run(connects(alice))
+    assert not asyncio.run(connects(outsider)), 'non-member connected'
+    assert not asyncio.run(connects(AnonymousUser())), 'anonymous user connected'
+    print("✅ only_members_connect")
+
+
+def check_membership_loaded_once():
+    session, alice, bob = make_session()
+    loads = []
+    load_session_context = SessionChatConsumer.__dict__['load_session_context']
+    
+    async def counting_load(consumer, user_id):
+        loads.append(user_id)
+        return await load_session_context.__get__(consumer, SessionChatConsumer)(user_id)
+    
+    async def exchange():
+        alice_socket, bob_socket = session_socket(session, alice), session_socket(session, bob)
+        await alice_socket.connect()
+        await bob_socket.connect()
+        try:
+            for i in range(3):
+                await alice_socket.send_json_to({'type': 'chat', 'content': f'message {i}'})
+                await bob_socket.receive_json_from(timeout=5)
+            # Ending the session reaches open sockets without reloading membership
+            await get_channel_layer().group_send(
+                f'session_{session.pk}', {'type': 'session_ended_message', 'redirect_url': '/'}
+            )
+            assert (await bob_socket.receive_json_from(timeout=5))['type'] == 'session_ended'
+            await bob_socket.send_json_to({'type': 'timer', 'action': 'start'})
+            refused = await bob_socket.receive_json_from(timeout=5)
+            assert (refused['type'], refused['error']) == ('timer_error', 'Session ended'), refused
+        finally:
+            await alice_socket.disconnect()
+            await bob_socket.disconnect()
+    
+    SessionChatConsumer.load_session_context = counting_load
+    try:
+        asyncio.run(exchange())
+    finally:
+        SessionChatConsumer.load_session_context = load_session_context
+    assert sorted(loads) == sorted([alice.pk, bob.pk]), f'membership loaded {len(loads)} times for two sockets'
+    print("✅ membership_loaded_once")
+
+
+CHECKS = [
+    check_buffer_writes_when_full,
+    check_buffer_writes_after_delay,
+    check_deleted_session_drops_only_its_messages,
+    check_chat_broadcast_then_written_on_disconnect,
+    check_only_members_connect,
+    check_membership_loaded_once,
+]
+
+
+def clear_users():
+    User.objects.all().delete()
+
+
+def verify():
+    return run_checks("Session Chat", CHECKS, before_each=clear_users)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
@@ -0,0 +1,275 @@
+"""
+Regression checks for direct messages: the per-user inbox socket
+(chat/inbox.py, InboxConsumer), the cursor-paged history endpoints and the
+per-pair Conversation rows holding last message and unread counts.
+
+Runs against a throwaway test database, so it never touches db.sqlite3.
+
+    python verify_direct_messages.py
+"""
+import asyncio
+import os
+import sys
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'link_and_learn.settings')
+django.setup()
+
+from asgiref.sync import sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+
+from chat.consumers import InboxConsumer
+from chat.models import ChatMessage, Conversation, DirectMessage
+from users.models import Session, User
+from verify_helpers import run_checks
+
+
+def make_users():
+    alice = User.objects.create_user(email='alice@example.com', name='Alice', password='x')
+    bob = User.objects.create_user(email='bob@example.com', name='Bob', password='x')
+    return alice, bob
+
+
+def inbox_socket(user):
+    communicator = WebsocketCommunicator(InboxConsumer.as_asgi(), '/ws/inbox/')
+    communicator.scope['user'] = user
+    return communicator
+
+
+def client_for(user):
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+def check_anonymous_inbox_refused():
+    async def connects():
+        socket = inbox_socket(AnonymousUser())
+        connected, _ = await socket.connect()
+        await socket.disconnect()
+        return connected
+    
+    assert not asyncio.run(connects()), 'anonymous user connected'
+    print("✅ anonymous_inbox_refused")
+
+
+def check_inbox_pushes_messages_and_receipts():
+    alice, bob = make_users()
+    alice_client = client_for(alice)
+    send = sync_to_async(alice_client.post)
+    
+    async def exchange():
+        alice_socket, bob_socket = inbox_socket(alice), inbox_socket(bob)
+        await alice_socket.connect()
+        await bob_socket.connect()
+        try:
+            for socket in (alice_socket, bob_socket):
+                assert await socket.receive_json_from(timeout=5) == {'type': 'unread', 'unread_count': 0}
+            
+            for text in ('hi Bob', 'are you there?'):
+                response = await send(f'/chat/direct/{bob.pk}/send/', {'content': text})
+                assert response.status_code == 200, response.status_code
+            pushed = [await bob_socket.receive_json_from(timeout=5) for _ in range(2)]
+            assert [(event['type'], event['message']['content'], event['unread_count']) for event in pushed] == [
+                ('dm', 'hi Bob', 1), ('dm', 'are you there?', 2),
+            ], pushed
+            # The sender's own tabs get the message but no unread count
+            echoed = await alice_socket.receive_json_from(timeout=5)
+            assert echoed['type'] == 'dm' and 'unread_count' not in echoed, echoed
+            await alice_socket.receive_json_from(timeout=5)
+            
+            await bob_socket.send_json_to({'type': 'mark_read', 'user_id': alice.pk})
+            receipt = await alice_socket.receive_json_from(timeout=5)
+            assert receipt == {'type': 'dm_read', 'reader_id': bob.pk, 'up_to_id': pushed[-1]['message']['id']}
+            assert await bob_socket.receive_json_from(timeout=5) == {'type': 'unread', 'unread_count': 0}
+            # Nothing left unread, so a second mark_read sends nothing
+            await bob_socket.send_json_to({'type': 'mark_read', 'user_id': alice.pk})
+            assert await alice_socket.receive_nothing(timeout=0.3)
+        finally:
+            await alice_socket.disconnect()
+            await bob_socket.disconnect()
+    
+    asyncio.run(exchange())
+    assert DirectMessage.objects.filter(sender=alice, receiver=bob).count() == 2
+    print("✅ inbox_pushes_messages_and_receipts")
+
+
+def check_unread_count_sent_on_connect():
+    alice, bob = make_users()
+    alice_client = client_for(alice)
+    for text in ('one', 'two', 'three'):
+        alice_client.post(f'/chat/direct/{bob.pk}/send/', {'content': text})
+    assert alice_client.post(f'/chat/direct/{bob.pk}/send/', {'content': '  '}).status_code == 400
+    
+    async def first_frame(user):
+        socket = inbox_socket(user)
+        await socket.connect()
+        try:
+            return await socket.receive_json_from(timeout=5)
+        finally:
+            await socket.disconnect()
+    
+    assert asyncio.run(first_frame(bob)) == {'type': 'unread', 'unread_count': 3}
+    assert asyncio.run(first_frame(alice)) == {'type': 'unread', 'unread_count': 0}
+    print("✅ unread_count_sent_on_connect")
+
+
+def history(client, url, **params):
+    response = client.get(url, params)
+    assert response.status_code == 200, response.status_code
+    data = response.json()
+    return [msg['content'] for msg in data['messages']], data['has_more'], response
+
+
+def check_history_pages_by_cursor():
+    alice, bob = make_users()
+    for i in range(7):
+        sender, receiver = (alice, bob) if i % 2 else (bob, alice)
+        DirectMessage.objects.create(sender=sender, receiver=receiver, content=f'm{i}')
+    ids = list(DirectMessage.objects.order_by('id').values_list('id', flat=True))
+    client = client_for(alice)
+    url = f'/chat/direct/{bob.pk}/messages/'
+    
+    # No cursor: the latest page, oldest first
+    assert history(client, url, limit=3)[:2] == (['m4', 'm5', 'm6'], True)
+    assert history(client, url, limit=3, before_id=ids[4])[:2] == (['m1', 'm2', 'm3'], True)
+    assert history(client, url, limit=3, before_id=ids[1])[:2] == (['m0'], False)
+    assert history(client, url, limit=3, since_id=ids[1])[:2] == (['m2', 'm3', 'm4'], True)
+    assert history(client, url, since_id=ids[-1])[:2] == ([], False)
+    
+    # A reconnecting client walks since_id until has_more is false
+    seen, since, has_more = [], 0, True
+    while has_more:
+        page, has_more, response = history(client, url, limit=2, since_id=since)
+        seen += page
+        since = ids[len(seen) - 1]
+    assert seen == [f'm{i}' for i in range(7)], seen
+    assert response.json()['last_id'] == ids[-1]
+    
+    # Another pair's messages stay out of the history
+    eve = User.objects.create_user(email='eve@example.com', name='Eve', password='x')
+    DirectMessage.objects.create(sender=eve, receiver=alice, content='from eve')
+    assert 'from eve' not in history(client, url, limit=50)[0]
+    print("✅ history_pages_by_cursor")
+
+
+def check_unchanged_history_not_modified():
+    alice, bob = make_users()
+    session = Session.objects.create(user1=alice, user2=bob)
+    ChatMessage.objects.create(session=session, sender=alice, content='hello')
+    client = client_for(bob)
+    url = f'/chat/session/{session.pk}/'
+    
+    _, _, response = history(client, url)
+    etag = response['ETag']
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304, 'unchanged history resent'
+    ChatMessage.objects.create(session=session, sender=bob, content='hi')
+    changed = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert changed.status_code == 200 and changed['ETag'] != etag
+    assert [msg['content'] for msg in changed.json()['messages']] == ['hello', 'hi']
+    
+    outsider = User.objects.create_user(email='eve@example.com', name='Eve', password='x')
+    assert client_for(outsider).get(url).status_code == 403
+    print("✅ unchanged_history_not_modified")
+
+
+def check_conversation_tracks_pair():
+    alice, bob = make_users()
+    alice_client, bob_client = client_for(alice), client_for(bob)
+    for text in ('one', 'two'):
+        alice_client.post(f'/chat/direct/{bob.pk}/send/', {'content': text})
+    bob_client.post(f'/chat/direct/{alice.pk}/send/', {'content': 'three'})
+    
+    # One row for the pair, whichever side sends
+    assert Conversation.objects.count() == 1
+    conversation = Conversation.get_for_pair(bob.pk, alice.pk)
+    assert conversation == Conversation.get_for_pair(alice.pk, bob.pk)
+    assert conversation.last_message.content == 'three'
+    assert (conversation.unread_for(bob), conversation.unread_for(alice)) == (2, 1)
+    assert (Conversation.unread_total(bob.pk), Conversation.unread_total(alice.pk)) == (2, 1)
+    
+    # Opening the chat page clears the reader's side only
+    assert bob_client.get(f'/chat/direct/{alice.pk}/').status_code == 200
+    conversation.refresh_from_db()
+    assert (conversation.unread_for(bob), conversation.unread_for(alice)) == (0, 1)
+    assert conversation.last_read_by(bob.pk) == conversation.last_message_id
+    assert Conversation.mark_read(bob.pk, alice.pk) is None, 'nothing left to mark read'
+    print("✅ conversation_tracks_pair")
+
+
+def check_inbox_lists_recent_first():
+    alice, bob = make_users()
+    eve = User.objects.create_user(email='eve@example.com', name='Eve', password='x')
+    client_for(bob).post(f'/chat/direct/{alice.pk}/send/', {'content': 'from bob'})
+    client_for(eve).post(f'/chat/direct/{alice.pk}/send/', {'content': 'from eve'})
+    assert [c.other_user(alice) for c in Conversation.for_user(alice)] == [eve, bob]
+    
+    client = client_for(alice)
+    client.get('/chat/inbox/')
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get('/chat/inbox/')
+    assert response.status_code == 200
+    listed = [(c.other, c.unread) for c in response.context['conversations']]
+    assert listed == [(eve, 1), (bob, 1)], listed
+    assert b'from eve' in response.content
+    assert not any('FROM "chat_directmessage"' in query['sql'] for query in queries), (
+        'inbox scanned direct messages'
+    )
+    print("✅ inbox_lists_recent_first")
+
+
+def check_conversation_migration_reverses():
+    alice, bob = make_users()
+    alice_client, bob_client = client_for(alice), client_for(bob)
+    for text in ('one', 'two', 'three'):
+        alice_client.post(f'/chat/direct/{bob.pk}/send/', {'content': text})
+    bob_client.get(f'/chat/direct/{alice.pk}/')
+    alice_client.post(f'/chat/direct/{bob.pk}/send/', {'content': 'four'})
+    bob_client.post(f'/chat/direct/{alice.pk}/send/', {'content': 'reply'})
+    
+    executor = MigrationExecutor(connection)
+    executor.migrate([('chat', '0004_history_cursor_indexes')])
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT content, is_read FROM chat_directmessage ORDER BY id')
+            flags = cursor.fetchall()
+        assert flags == [('one', 1), ('two', 1), ('three', 1), ('four', 0), ('reply', 0)], flags
+    finally:
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+    conversation = Conversation.get_for_pair(alice.pk, bob.pk)
+    assert conversation.last_message.content == 'reply'
+    assert (conversation.unread_for(bob), conversation.unread_for(alice)) == (1, 1), 'unread counts lost'
+    assert conversation.last_read_by(bob.pk) == DirectMessage.objects.get(content='three').pk
+    print("✅ conversation_migration_reverses")
+
+
+CHECKS = [
+    check_anonymous_inbox_refused,
+    check_inbox_pushes_messages_and_receipts,
+    check_unread_count_sent_on_connect,
+    check_history_pages_by_cursor,
+    check_unchanged_history_not_modified,
+    check_conversation_tracks_pair,
+    check_inbox_lists_recent_first,
+    check_conversation_migration_reverses,
+]
+
+
+def clear_users():
+    User.objects.all().delete()
+
+
+def verify():
+    setup_test_environment()
+    return run_checks("Direct Messages", CHECKS, before_each=clear_users)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
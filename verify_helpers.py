@@ -0,0 +1,41 @@
+"""
+Shared runner for the database-backed verify_*.py regression scripts.
+
+Each script defines `check_*` functions that print their own ✅ (or ⏭️ when
+they skip) and raise on failure, lists them in CHECKS and hands them to
+run_checks(). Django must already be set up.
+"""
+from django.db import connection
+
+
+def run_checks(title, checks, before_each=None, unavailable=None):
+    """
+    Run `checks` against a throwaway test database and print a summary.
+    
+    `before_each` runs before every check. `unavailable`, if given, is called
+    once the test database exists and returns a reason to skip every check,
+    or None. Returns True if no check failed.
+    """
+    print(f"--- Verifying {title} ---")
+    old_name = connection.creation.create_test_db(verbosity=0)
+    failed = 0
+    try:
+        reason = unavailable() if unavailable else None
+        if reason:
+            print(f"⏭️  {reason}")
+        else:
+            for check in checks:
+                if before_each:
+                    before_each()
+                try:
+                    check()
+                except Exception as e:
+                    failed += 1
+                    print(f"❌ {check.__name__[len('check_'):]}: {type(e).__name__}: {e}")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+    if failed:
+        print(f"\n--- {failed} check(s) failed ---")
+        return False
+    print("\n--- Verification Successful ---")
+    return True
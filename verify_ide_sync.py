@@ -0,0 +1,120 @@
+"""
+Regression checks for the versioned IDE documents (chat/ide.py).
+
+The transform checks are pure Python; the checkpoint check runs against a
+throwaway test database, so it never touches db.sqlite3.
+
+    python verify_ide_sync.py
+"""
+import os
+import random
+import sys
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'link_and_learn.settings')
+django.setup()
+
+from chat.ide import ConflictError, IdeDocument, apply_ops, clean_ops, transform_sequences
+from users.models import Session, User
+from verify_helpers import run_checks
+
+
+def random_batch(rng, text, size):
+    """`size` sequential replace ops on `text`, as an editor would send them."""
+    ops = []
+    for _ in range(size):
+        offset = rng.randint(0, len(text))
+        length = rng.randint(0, min(3, len(text) - offset))
+        op = {'offset': offset, 'length': length, 'text': rng.choice(['', 'x', 'yz', '\n'])}
+        ops.append(op)
+        text = apply_ops(text, [op])
+    return ops
+
+
+def raises_conflict(call, *args, **kwargs):
+    try:
+        call(*args, **kwargs)
+    except ConflictError:
+        return True
+    return False
+
+
+def check_transforms_converge():
+    # Both sides applying the other's rebased batch after their own end on the same text
+    rng = random.Random(11)
+    converged = 0
+    for _ in range(2000):
+        text = ''.join(rng.choice('abc \n') for _ in range(rng.randint(0, 20)))
+        first, second = random_batch(rng, text, rng.randint(1, 3)), random_batch(rng, text, rng.randint(1, 3))
+        try:
+            second_after, first_after = transform_sequences(second, first, ops_are_later=True)
+        except ConflictError:
+            continue
+        assert apply_ops(apply_ops(text, first), second_after) == apply_ops(apply_ops(text, second), first_after), (
+            f'diverged on {text!r}: {first} vs {second}'
+        )
+        converged += 1
+    assert converged > 500, 'too few non-conflicting batches to mean anything'
+    print("✅ transforms_converge")
+
+
+def check_concurrent_commits():
+    document = IdeDocument(1, 'hello world', 'python')
+    # Both clients edit version 0; the second batch is rebased past the first
+    document.commit([{'offset': 0, 'length': 5, 'text': 'goodbye'}], 0, 'alice')
+    applied = document.commit([{'offset': 11, 'length': 0, 'text': '!'}], 0, 'bob')
+    assert document.text == 'goodbye world!'
+    assert applied == [{'offset': 13, 'length': 0, 'text': '!'}], 'ops are broadcast rebased'
+    assert document.version == 2
+    # Inserts at the same offset: the later batch goes after
+    document.commit([{'offset': 0, 'length': 0, 'text': 'A'}], 2, 'alice')
+    document.commit([{'offset': 0, 'length': 0, 'text': 'B'}], 2, 'bob')
+    assert document.text.startswith('AB')
+    print("✅ concurrent_commits")
+
+
+def check_rejected_batches():
+    document = IdeDocument(1, 'abcdef', 'python')
+    document.commit([{'offset': 0, 'length': 1, 'text': 'A'}], 0, 'alice')
+    assert raises_conflict(document.commit, [], 5, 'bob'), 'unknown base version'
+    assert raises_conflict(document.commit, [{'offset': 0, 'length': 2, 'text': 'z'}], 0, 'bob'), 'overlapping edit'
+    assert raises_conflict(document.commit, [{'offset': 3, 'length': 0, 'text': 'z'}], 0, 'alice'), 'unacknowledged batch'
+    assert raises_conflict(document.commit, [{'offset': 9, 'length': 0, 'text': 'z'}], 1, 'bob'), 'out of range'
+    assert raises_conflict(clean_ops, [{'offset': 'x', 'length': 0}]), 'malformed op'
+    assert document.text == 'Abcdef' and document.version == 1, 'rejected batches changed the document'
+    
+    for _ in range(IdeDocument.history_size + 1):
+        document.commit([{'offset': 0, 'length': 0, 'text': 'x'}], document.version, 'alice')
+    assert raises_conflict(document.commit, [], 1, 'bob'), 'base version older than the history'
+    print("✅ rejected_batches")
+
+
+def check_checkpoint_roundtrip():
+    alice = User.objects.create_user(email='alice@example.com', name='Alice', password='x')
+    bob = User.objects.create_user(email='bob@example.com', name='Bob', password='x')
+    session = Session.objects.create(user1=alice, user2=bob)
+    document = IdeDocument.load(session.pk)
+    document.replace_all('print("hi")\n', 'alice')
+    document.language = 'python'
+    document.checkpoint()
+    assert document.checkpointed_version == document.version
+    loaded = IdeDocument.load(session.pk)
+    assert (loaded.text, loaded.language) == ('print("hi")\n', 'python')
+    print("✅ checkpoint_roundtrip")
+
+
+CHECKS = [
+    check_transforms_converge,
+    check_concurrent_commits,
+    check_rejected_batches,
+    check_checkpoint_roundtrip,
+]
+
+
+def verify():
+    return run_checks("IDE Sync", CHECKS)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
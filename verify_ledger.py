@@ -0,0 +1,239 @@
+"""
+Regression checks for ledger posting (CreditTransaction.post_entries and
+Session.settle_credits), the sharded bank balance and reconcile_ledger.
+
+Runs against a throwaway test database, so it never touches db.sqlite3.
+
+    python verify_ledger.py
+"""
+import io
+import json
+import os
+import sys
+from decimal import Decimal
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'link_and_learn.settings')
+django.setup()
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import transaction as db_transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from users.models import Bank, BankShard, CreditTransaction, Session, SessionTimer, User
+from verify_helpers import run_checks
+
+
+def make_user(email, credits='20.00'):
+    return User.objects.create_user(email=email, name=email.split('@')[0], password='x', credits=Decimal(credits))
+
+
+def ledger_total(user):
+    return CreditTransaction.objects.filter(user=user).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+
+
+def check_balance_after_replays_entries():
+    alice = make_user('alice@example.com')
+    rows = CreditTransaction.post_entries([
+        {'user': alice, 'amount': 3, 'transaction_type': 'TEACHING'},
+        {'user': alice, 'amount': -1.5, 'transaction_type': 'LEARNING'},
+        {'user': alice, 'amount': '0.25', 'transaction_type': 'DONATION'},
+    ])
+    assert [row.balance_after for row in rows] == [Decimal('23.00'), Decimal('21.50'), Decimal('21.75')]
+    assert alice.credits == Decimal('21.75'), 'caller object refreshed to the database value'
+    assert User.objects.get(pk=alice.pk).credits == Decimal('21.75')
+    print("✅ balance_after_replays_entries")
+
+
+def check_stale_user_loses_no_update():
+    bob = make_user('bob@example.com')
+    # Another request moves Bob's balance after this object was loaded
+    User.objects.filter(pk=bob.pk).update(credits=Decimal('30.00'))
+    row = CreditTransaction.record_transaction(bob, -2, 'LEARNING')
+    assert row.balance_after == Decimal('28.00'), 'posting applies a delta, not the stale balance'
+    assert User.objects.get(pk=bob.pk).credits == Decimal('28.00')
+    print("✅ stale_user_loses_no_update")
+
+
+def check_settlement_balances_with_ledger():
+    learner, teacher = make_user('learner@example.com'), make_user('teacher@example.com')
+    bank = Bank.get_instance()
+    bank_before = bank.total_credits
+    session = Session.objects.create(user1=learner, user2=teacher)
+    # Ten minutes of teaching: 2 credits, 10% to the bank
+    SessionTimer.objects.create(session=session, teacher=teacher, duration_seconds=600, end_time=timezone.now())
+    assert session.end_session()
+    session.settle_credits()
+    
+    learner.refresh_from_db()
+    teacher.refresh_from_db()
+    assert learner.credits == Decimal('18.00')
+    assert teacher.credits == Decimal('21.80')
+    assert Bank.get_instance().total_credits == bank_before + Decimal('0.20')
+    for user in (learner, teacher):
+        # make_user starts from 20 credits without a SIGNUP row
+        assert user.credits - Decimal('20.00') == ledger_total(user), f'{user.email} drifted from the ledger'
+    print("✅ settlement_balances_with_ledger")
+
+
+def check_failed_posting_rolls_back():
+    carol, dave = make_user('carol@example.com'), make_user('dave@example.com')
+    bulk_create = CreditTransaction.objects.bulk_create
+    
+    def failing_bulk_create(*args, **kwargs):
+        raise RuntimeError('ledger write failed')
+    
+    CreditTransaction.objects.bulk_create = failing_bulk_create
+    try:
+        CreditTransaction.post_entries([
+            {'user': carol, 'amount': 5, 'transaction_type': 'TEACHING'},
+            {'user': dave, 'amount': -5, 'transaction_type': 'LEARNING'},
+        ])
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError('posting should fail')
+    finally:
+        CreditTransaction.objects.bulk_create = bulk_create
+    assert User.objects.get(pk=carol.pk).credits == Decimal('20.00'), 'balance moved without a ledger row'
+    assert User.objects.get(pk=dave.pk).credits == Decimal('20.00'), 'balance moved without a ledger row'
+    print("✅ failed_posting_rolls_back")
+
+
+def check_bank_refuses_overdraft():
+    bank = Bank.get_instance()
+    total = bank.total_credits
+    assert not bank.deduct_credits(total + 1), 'deducting more than the bank holds should fail'
+    assert Bank.get_instance().total_credits == total
+    assert bank.deduct_credits(total), 'the whole balance can be drained across shards'
+    assert Bank.get_instance().total_credits == Decimal('0.00')
+    print("✅ bank_refuses_overdraft")
+
+
+def fill_shards(*balances):
+    BankShard.objects.all().delete()
+    for index, balance in enumerate(balances):
+        BankShard.objects.create(index=index, balance=Decimal(balance))
+    Bank.get_instance()._invalidate_total()
+
+
+def shard_balances():
+    return list(BankShard.objects.order_by('index').values_list('balance', flat=True))
+
+
+def check_bank_total_spans_shards():
+    fill_shards('1.00', '2.00', '3.00')
+    bank = Bank.get_instance()
+    assert bank.total_credits == Decimal('6.00')
+    bank.add_credits('0.50')
+    assert bank.total_credits == Decimal('6.50'), 'cached total not invalidated by a credit'
+    assert bank.deduct_credits(2)
+    assert bank.total_credits == Decimal('4.50'), 'cached total not invalidated by a debit'
+    assert sum(shard_balances()) == Decimal('4.50')
+    print("✅ bank_total_spans_shards")
+
+
+class StaleShards:
+    """Stands in for select_for_update(): returns the shards as read before another worker's debit."""
+    
+    def __init__(self, queryset, stale_reads):
+        self.queryset = queryset
+        self.stale_reads = stale_reads
+    
+    def filter(self, **kwargs):
+        return StaleShards(self.queryset.filter(**kwargs), self.stale_reads)
+    
+    def order_by(self, *fields):
+        return StaleShards(self.queryset.order_by(*fields), self.stale_reads)
+    
+    def __iter__(self):
+        shards = list(self.queryset)
+        if self.stale_reads:
+            self.stale_reads.pop()
+            shards[0].balance += 4
+        return iter(shards)
+
+
+def deduct_with_stale_reads(amount, stale_reads):
+    bank = Bank.get_instance()
+    reads = [None] * stale_reads
+    BankShard.objects.select_for_update = lambda: StaleShards(BankShard.objects.all(), reads)
+    try:
+        with db_transaction.atomic():
+            return bank.deduct_credits(amount)
+    finally:
+        del BankShard.objects.select_for_update
+
+
+def check_multi_shard_debit_rechecks_balances():
+    # No single shard covers 12, so the debit drains several
+    fill_shards('5.00', '5.00', '5.00', '5.00')
+    assert deduct_with_stale_reads(12, stale_reads=1), 'one stale read should be retried'
+    assert sum(shard_balances()) == Decimal('8.00')
+    assert min(shard_balances()) >= 0, 'a shard was overdrawn'
+    
+    before = shard_balances()
+    assert not deduct_with_stale_reads(7, stale_reads=Bank.DRAIN_ATTEMPTS), 'gives up after DRAIN_ATTEMPTS'
+    assert shard_balances() == before, 'a failed drain left a partial debit'
+    print("✅ multi_shard_debit_rechecks_balances")
+
+
+def reconcile(*args):
+    """Run reconcile_ledger over small slices and return its report rows."""
+    out = io.StringIO()
+    call_command('reconcile_ledger', '--slice-size', '2', '--chunk-size', '1', *args, stdout=out)
+    return [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def check_reconcile_reports_drift():
+    User.objects.all().delete()
+    people = []
+    for i in range(5):
+        person = make_user(f'person{i}@example.com', credits='0.00')
+        CreditTransaction.record_transaction(person, 15, 'SIGNUP')
+        people.append(person)
+    opening = str(Bank.get_instance().total_credits)
+    session = Session.objects.create(user1=people[0], user2=people[1])
+    SessionTimer.objects.create(session=session, teacher=people[1], duration_seconds=600, end_time=timezone.now())
+    session.end_session()
+    session.settle_credits()
+    
+    report = reconcile('--bank-opening', opening)
+    assert report[-1] == {'kind': 'summary', 'users_checked': 5, 'users_drifted': 0, 'bank_drifted': False}, report[-1]
+    
+    # Balances changed without a ledger row
+    User.objects.filter(pk=people[3].pk).update(credits=F('credits') + 1)
+    Bank.get_instance().add_credits(2)
+    report = reconcile('--bank-opening', opening)
+    assert [(row['user_id'], row['drift']) for row in report if row['kind'] == 'user'] == [(people[3].pk, '1.00')]
+    assert [row['drift'] for row in report if row['kind'] == 'bank'] == ['2.00']
+    try:
+        reconcile('--bank-opening', opening, '--fail-on-drift')
+    except CommandError:
+        pass
+    else:
+        raise AssertionError('--fail-on-drift should fail')
+    print("✅ reconcile_reports_drift")
+
+
+CHECKS = [
+    check_balance_after_replays_entries,
+    check_stale_user_loses_no_update,
+    check_settlement_balances_with_ledger,
+    check_failed_posting_rolls_back,
+    check_bank_refuses_overdraft,
+    check_bank_total_spans_shards,
+    check_multi_shard_debit_rechecks_balances,
+    check_reconcile_reports_drift,
+]
+
+
+def verify():
+    return run_checks("Ledger Posting", CHECKS)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
@@ -0,0 +1,104 @@
+"""
+Regression checks for the teach/learn match index (requests_app/matching.py).
+
+Runs against a throwaway test database, so it never touches db.sqlite3.
+
+    python verify_matching.py
+"""
+import os
+import random
+import sys
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'link_and_learn.settings')
+django.setup()
+
+from requests_app.matching import MatchIndex, index
+from requests_app.models import LearningRequest
+from users.models import User
+from verify_helpers import run_checks
+
+
+def make_user(name):
+    return User.objects.create_user(email=f'{name.lower()}@example.com', name=name, password='x')
+
+
+def fresh_entries():
+    built = MatchIndex()
+    built.build()
+    return built.entries
+
+
+def check_ranking():
+    index.build()
+    me, ann, ben, cat = make_user('Me'), make_user('Ann'), make_user('Ben'), make_user('Cat')
+    mine = LearningRequest.objects.create(creator=me, topic_to_learn='JS', topic_to_teach='Guitar')
+    # Ann and I teach each other; Ben only teaches, Cat only wants to learn
+    LearningRequest.objects.create(creator=ann, topic_to_learn='guitars', topic_to_teach='JavaScript')
+    LearningRequest.objects.create(creator=ben, topic_to_learn='Chess', topic_to_teach='java script')
+    LearningRequest.objects.create(creator=cat, topic_to_learn='Guitar', topic_to_teach='Chess', ok_with_just_learning=True)
+    LearningRequest.objects.create(creator=me, topic_to_learn='Chess', topic_to_teach='JS')
+    
+    found = index.matches_for(mine)
+    assert [match.user_id for match in found] == [ann.pk, cat.pk, ben.pk], 'mutual, then one-way by score'
+    assert found[0].mutual and found[0].score >= 2
+    assert not found[2].mutual and found[2].score == 0.5, 'halved: I did not say I am happy to just learn'
+    assert me.pk not in {match.user_id for match in found}, 'own requests are excluded'
+    print("✅ ranking")
+
+
+def check_incremental_updates_match_rebuild():
+    index.build()
+    rng = random.Random(21)
+    people = [make_user(f'Person{i}') for i in range(8)]
+    words = ['python', 'js', 'guitar', 'chess', 'spanish', 'cooking']
+    requests = []
+    for _ in range(60):
+        action = rng.random()
+        if action < 0.6 or not requests:
+            requests.append(LearningRequest.objects.create(
+                creator=rng.choice(people),
+                topic_to_learn=' '.join(rng.sample(words, 2)),
+                topic_to_teach=rng.choice(words),
+            ))
+        elif action < 0.75:
+            request = rng.choice(requests)
+            request.topic_to_teach = rng.choice(words)
+            request.save()
+        elif action < 0.9:
+            rng.choice(requests).mark_completed()
+        else:
+            requests.pop(rng.randrange(len(requests))).delete()
+    assert index.entries == fresh_entries(), 'incremental index drifted from a rebuild'
+    print("✅ incremental_updates_match_rebuild")
+
+
+def check_sync_picks_up_other_processes():
+    # `other` stands in for a worker that did not see these saves
+    other = MatchIndex()
+    other.build()
+    dana = make_user('Dana')
+    added = LearningRequest.objects.create(creator=dana, topic_to_learn='Welsh', topic_to_teach='Piano')
+    open_requests = LearningRequest.objects.filter(is_completed=False).exclude(pk=added.pk).order_by('pk')
+    open_requests.first().mark_completed()
+    open_requests.last().delete()
+    assert other.entries != fresh_entries()
+    other.sync()
+    assert other.entries == fresh_entries(), 'sync did not catch up with other writes'
+    print("✅ sync_picks_up_other_processes")
+
+
+CHECKS = [
+    check_ranking,
+    check_incremental_updates_match_rebuild,
+    check_sync_picks_up_other_processes,
+]
+
+
+def verify():
+    return run_checks("Match Index", CHECKS)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
@@ -0,0 +1,122 @@
+"""
+Regression checks for keyset pagination (link_and_learn/pagination.py).
+
+Runs against a throwaway test database, so it never touches db.sqlite3.
+
+    python verify_pagination.py
+"""
+import os
+import sys
+from decimal import Decimal
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'link_and_learn.settings')
+django.setup()
+
+from django.db.models import ExpressionWrapper, F, FloatField
+from django.test import Client
+from django.test.utils import setup_test_environment
+from django.utils import timezone
+
+from link_and_learn.pagination import KeysetPaginator, dump_cursor
+from users.models import CreditTransaction, User
+from verify_helpers import run_checks
+
+ORDERING = ('-created_at', '-id')
+
+
+def make_ledger(rows=23):
+    """A user with `rows` transactions, several sharing a timestamp."""
+    user = User.objects.create_user(email=f'ledger{User.objects.count()}@example.com', name='Ledger', password='x')
+    for i in range(rows):
+        CreditTransaction.record_transaction(user, 1, 'DONATION', description=str(i))
+    now = timezone.now()
+    # Ties on created_at are broken by id
+    for i, pk in enumerate(CreditTransaction.objects.filter(user=user).order_by('id').values_list('pk', flat=True)):
+        CreditTransaction.objects.filter(pk=pk).update(created_at=now - timezone.timedelta(seconds=i // 4))
+    return user, CreditTransaction.objects.filter(user=user)
+
+
+def ids(page):
+    return [row.pk for row in page]
+
+
+def check_walk_forward_and_back():
+    _, transactions = make_ledger()
+    expected = list(transactions.order_by(*ORDERING).values_list('pk', flat=True))
+    paginator = KeysetPaginator(transactions, ORDERING, per_page=5)
+    
+    pages = [paginator.page()]
+    while pages[-1].has_next:
+        pages.append(paginator.page(pages[-1].next_cursor))
+    assert [pk for page in pages for pk in ids(page)] == expected, 'forward walk skipped or repeated rows'
+    assert not pages[0].has_previous
+    
+    back = [pages[-1]]
+    while back[-1].has_previous:
+        back.append(paginator.page(back[-1].prev_cursor))
+    assert [ids(page) for page in back[::-1]] == [ids(page) for page in pages], 'backward walk differs'
+    print("✅ walk_forward_and_back")
+
+
+def check_bad_cursors_give_first_page():
+    _, transactions = make_ledger()
+    paginator = KeysetPaginator(transactions, ORDERING, per_page=5)
+    first = ids(paginator.page())
+    for cursor in (
+        'not-a-cursor',
+        dump_cursor('next', [None, None]),
+        dump_cursor('prev', ['2026-01-01T00:00:00+00:00', None]),
+        dump_cursor('next', ['yesterday', 3]),
+        dump_cursor('next', [1]),
+        dump_cursor('sideways', ['2026-01-01T00:00:00+00:00', 3]),
+    ):
+        page = paginator.page(cursor)
+        assert ids(page) == first, f'{cursor!r} did not fall back to the first page'
+        assert not page.has_previous
+    print("✅ bad_cursors_give_first_page")
+
+
+def check_views_accept_null_cursor():
+    user, _ = make_ledger()
+    client = Client()
+    client.force_login(user)
+    cursor = dump_cursor('next', [None, None])
+    for url in ('/profile/credits/', '/sessions/', '/users/', '/requests/'):
+        response = client.get(url, {'cursor': cursor})
+        assert response.status_code == 200, f'{url} returned {response.status_code}'
+    print("✅ views_accept_null_cursor")
+
+
+def check_annotation_keys():
+    for i in range(7):
+        User.objects.create_user(email=f'rank{i}@example.com', name='Rank', password='x', credits=Decimal(i % 3))
+    # Float annotations (like a search rank) go into the cursor as plain JSON
+    users = User.objects.filter(name='Rank').annotate(
+        rank=ExpressionWrapper(F('credits') * 0.1, output_field=FloatField())
+    )
+    expected = list(users.order_by('-rank', '-id').values_list('pk', flat=True))
+    paginator = KeysetPaginator(users, ('-rank', '-id'), per_page=3)
+    pages = [paginator.page()]
+    while pages[-1].has_next:
+        pages.append(paginator.page(pages[-1].next_cursor))
+    assert [pk for page in pages for pk in ids(page)] == expected, 'annotated keys paged out of order'
+    print("✅ annotation_keys")
+
+
+CHECKS = [
+    check_walk_forward_and_back,
+    check_bad_cursors_give_first_page,
+    check_views_accept_null_cursor,
+    check_annotation_keys,
+]
+
+
+def verify():
+    setup_test_environment()
+    return run_checks("Keyset Pagination", CHECKS)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
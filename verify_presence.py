@@ -0,0 +1,125 @@
+"""
+Regression checks for buffered presence heartbeats (link_and_learn/presence.py).
+
+Runs against a throwaway test database, so it never touches db.sqlite3.
+
+    python verify_presence.py
+"""
+import os
+import sys
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'link_and_learn.settings')
+django.setup()
+
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+from django.utils import timezone
+
+from link_and_learn import presence
+from link_and_learn.presence import PresenceTracker
+from users.models import User
+from verify_helpers import run_checks
+
+
+def make_user(name, **fields):
+    user = User.objects.create_user(email=f'{name.lower()}@example.com', name=name, password='x')
+    User.objects.filter(pk=user.pk).update(**{'is_online': False, 'last_seen': None, **fields})
+    return user
+
+
+def online(user):
+    return User.objects.values_list('is_online', flat=True).get(pk=user.pk)
+
+
+def check_heartbeats_wait_for_flush():
+    alice, bob = make_user('Alice'), make_user('Bob')
+    tracker = PresenceTracker()
+    with CaptureQueriesContext(connection) as queries:
+        for _ in range(3):
+            tracker.heartbeat(alice.pk)
+            tracker.heartbeat(bob.pk)
+    assert not queries, 'heartbeats should not write'
+    assert not online(alice)
+    
+    assert tracker.flush() == 2
+    assert online(alice) and online(bob)
+    assert User.objects.get(pk=alice.pk).last_seen is not None
+    print("✅ heartbeats_wait_for_flush")
+
+
+def check_flush_expires_stale_users():
+    long_ago = timezone.now() - timezone.timedelta(hours=1)
+    stale = make_user('Stale', is_online=True, last_seen=long_ago)
+    returning = make_user('Returning', is_online=True, last_seen=long_ago)
+    tracker = PresenceTracker()
+    tracker.heartbeat(returning.pk)
+    tracker.flush()
+    assert not online(stale), 'stale user left online'
+    assert online(returning), 'user with a pending heartbeat was expired'
+    print("✅ flush_expires_stale_users")
+
+
+def check_timer_flushes_idle_worker():
+    alice = make_user('Alice')
+    tracker = PresenceTracker()
+    with override_settings(PRESENCE_FLUSH_SECONDS=0.2):
+        tracker.heartbeat(alice.pk)
+        # No further requests arrive to call maybe_flush()
+        for _ in range(50):
+            if online(alice):
+                break
+            time.sleep(0.05)
+    assert online(alice), 'timer did not flush the pending heartbeat'
+    assert tracker._timer is None and not tracker._pending
+    print("✅ timer_flushes_idle_worker")
+
+
+def check_exit_flush_writes_only_pending():
+    alice = make_user('Alice')
+    tracker = PresenceTracker()
+    with CaptureQueriesContext(connection) as queries:
+        tracker.flush_pending()
+    assert not queries, 'exit flush touched the database with nothing pending'
+    tracker.heartbeat(alice.pk)
+    tracker.flush_pending()
+    assert online(alice), 'pending heartbeat lost at exit'
+    print("✅ exit_flush_writes_only_pending")
+
+
+def check_requests_record_heartbeats():
+    alice = make_user('Alice')
+    client = Client()
+    client.force_login(alice)
+    presence.tracker.flush()
+    with override_settings(PRESENCE_FLUSH_SECONDS=3600):
+        client.get('/')
+    assert alice.pk in presence.tracker._pending, 'request did not record a heartbeat'
+    presence.tracker.flush()
+    assert online(alice)
+    print("✅ requests_record_heartbeats")
+
+
+CHECKS = [
+    check_heartbeats_wait_for_flush,
+    check_flush_expires_stale_users,
+    check_timer_flushes_idle_worker,
+    check_exit_flush_writes_only_pending,
+    check_requests_record_heartbeats,
+]
+
+
+def clear_users():
+    User.objects.all().delete()
+
+
+def verify():
+    setup_test_environment()
+    return run_checks("Presence", CHECKS, before_each=clear_users)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
@@ -0,0 +1,108 @@
+"""
+Regression checks for the precomputed recommenders.
+
+Runs against a throwaway test database, so it never touches db.sqlite3.
+The SciPy/pure-Python agreement checks are skipped when NumPy or SciPy
+is not installed.
+
+    python verify_recommendations.py
+"""
+import os
+import random
+import sys
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'link_and_learn.settings')
+django.setup()
+
+from skills import recommendations
+from skills.models import Skill, SkillSuggestion, StaleSkillProfile, UserSkill
+from users import partners
+from users.models import User
+from verify_helpers import run_checks
+
+
+def same_ranking(left, right):
+    """Same ids in the same order, scores equal up to float noise."""
+    return len(left) == len(right) and all(
+        a[0] == b[0] and abs(a[1] - b[1]) < 1e-9 for a, b in zip(left, right)
+    )
+
+
+def check_skill_paths_agree():
+    if recommendations.sparse is None:
+        print("⏭️  skill_paths_agree: NumPy/SciPy not installed")
+        return
+    # Few skills and many identical profiles: lots of exactly tied scores at the cut-off
+    rng = random.Random(7)
+    rows = []
+    for user_id in range(1, 400):
+        for skill_id in rng.sample(range(1, 30), rng.randint(1, 5)):
+            rows.append((user_id, skill_id, rng.choice(('learn', 'teach'))))
+    for k, neighbours in ((3, 4), (10, 50)):
+        sparse_related, sparse_suggestions = recommendations._compute_sparse(rows, None, k, neighbours)
+        python_related, python_suggestions = recommendations._compute_python(rows, None, k, neighbours)
+        for skill_id, row in python_related.items():
+            assert same_ranking(sparse_related.get(skill_id, []), row), f'related skills differ for {skill_id}'
+        for user_id, sides in python_suggestions.items():
+            for side, row in sides.items():
+                assert same_ranking(sparse_suggestions[user_id][side], row), f'{side} suggestions differ for {user_id}'
+    print("✅ skill_paths_agree")
+
+
+def check_skill_refresh_counts_written_users():
+    python, django_skill = Skill.objects.create(name='Python'), Skill.objects.create(name='Django')
+    alice = User.objects.create_user(email='alice@example.com', name='Alice', password='x')
+    bob = User.objects.create_user(email='bob@example.com', name='Bob', password='x')
+    carol = User.objects.create_user(email='carol@example.com', name='Carol', password='x')
+    UserSkill.objects.create(user=alice, skill=python, skill_type='teach')
+    UserSkill.objects.create(user=alice, skill=django_skill, skill_type='learn')
+    UserSkill.objects.create(user=bob, skill=python, skill_type='teach')
+    # Carol has no skills, so nothing can be suggested to her
+    StaleSkillProfile.mark(carol.pk)
+    
+    assert recommendations.refresh(full=True) == 1, 'only Bob gets a suggestion'
+    assert SkillSuggestion.objects.filter(user=bob, skill=django_skill, skill_type='learn').exists()
+    StaleSkillProfile.mark(carol.pk)
+    assert recommendations.refresh() == 0, 'Carol was refreshed but got no suggestions'
+    assert not StaleSkillProfile.objects.exists()
+    print("✅ skill_refresh_counts_written_users")
+
+
+def check_partner_paths_agree():
+    if partners.sparse is None:
+        print("⏭️  partner_paths_agree: NumPy/SciPy not installed")
+        return
+    # Dense random graphs: many walk masses equal up to summation order at the frontier cut
+    for seed in range(8):
+        rng = random.Random(seed)
+        users = range(1, 61 + seed * 20)
+        sessions = [
+            (*rng.sample(users, 2), rng.choice((0, 600)), rng.choice((0, 0, 300)))
+            for _ in range(400 + seed * 100)
+        ]
+        reviews = [(learner, teacher, rng.randint(1, 5)) for teacher, learner, _, _ in sessions if rng.random() < 0.5]
+        for frontier in (5, 20, 200):
+            graph = (sessions, reviews, set(users))
+            sparse_partners = partners._compute_sparse(*graph, 10, 3, frontier)
+            python_partners = partners._compute_python(*graph, 10, 3, frontier)
+            assert sparse_partners.keys() == python_partners.keys(), f'users differ for seed {seed}'
+            for user_id, row in python_partners.items():
+                assert same_ranking(sparse_partners[user_id], row), f'partners differ for {user_id} (seed {seed})'
+    print("✅ partner_paths_agree")
+
+
+CHECKS = [
+    check_skill_paths_agree,
+    check_skill_refresh_counts_written_users,
+    check_partner_paths_agree,
+]
+
+
+def verify():
+    return run_checks("Recommendations", CHECKS)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
@@ -0,0 +1,161 @@
+"""
+Regression checks for per-room event batching and coalescing (chat/batching.py).
+
+The batcher checks use a layer that records group sends; the socket check
+runs against a throwaway test database, so it never touches db.sqlite3.
+
+    python verify_room_events.py
+"""
+import asyncio
+import os
+import sys
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'link_and_learn.settings')
+django.setup()
+
+from channels.testing import WebsocketCommunicator
+from django.test import override_settings
+
+from chat.batching import RoomBatcher
+from chat.consumers import SessionChatConsumer
+from users.models import Session, User
+from verify_helpers import run_checks
+
+
+class RecordingLayer:
+    """Stands in for the channel layer; keeps every group message."""
+    
+    def __init__(self):
+        self.sent = []
+    
+    async def group_send(self, group, message):
+        self.sent.append(message)
+
+
+def whiteboard(kind, object_id, sender='alice', **fields):
+    if kind == 'remove':
+        op = {'type': kind, 'ids': [object_id]}
+    else:
+        op = {'type': kind, 'object': {'id': object_id, **fields}}
+    return {'type': 'whiteboard_update', 'data': op, 'sender_channel_name': sender}
+
+
+def code(sender, text, version):
+    return {
+        'type': 'code_update',
+        'ops': [{'offset': 0, 'length': 0, 'text': text}],
+        'version': version,
+        'language': 'python',
+        'sender_channel_name': sender,
+    }
+
+
+def batched(events, tick_ms=20):
+    """Queue `events` within one tick and return the group messages sent."""
+    layer = RecordingLayer()
+    
+    async def run():
+        batcher = RoomBatcher('room', layer)
+        for event in events:
+            await batcher.add(event)
+        await asyncio.sleep(tick_ms / 1000 * 3)
+    
+    with override_settings(ROOM_BATCH_TICK_MS=tick_ms):
+        asyncio.run(run())
+    return layer.sent
+
+
+def check_one_frame_per_tick():
+    sent = batched([whiteboard('add', i) for i in range(10)])
+    assert len(sent) == 1 and sent[0]['type'] == 'room_batch', sent
+    assert [event['data']['object']['id'] for event in sent[0]['events']] == list(range(10)), 'events reordered'
+    # With batching off every event goes out on its own
+    assert len(batched([whiteboard('add', i) for i in range(3)], tick_ms=0)) == 3
+    print("✅ one_frame_per_tick")
+
+
+def check_whiteboard_modifies_coalesce():
+    sent = batched([
+        whiteboard('add', 1),
+        whiteboard('modify', 1, left=1),
+        whiteboard('modify', 2, left=1),
+        whiteboard('modify', 1, left=2),
+        whiteboard('modify', 1, left=3),
+    ])
+    ops = [event['data'] for event in sent[0]['events']]
+    # The newest modify of object 1 replaces the older ones, at the newest position
+    assert ops == [
+        {'type': 'add', 'object': {'id': 1}},
+        {'type': 'modify', 'object': {'id': 2, 'left': 1}},
+        {'type': 'modify', 'object': {'id': 1, 'left': 3}},
+    ], ops
+    # A remove between two modifies keeps both, so peers see the same history
+    sent = batched([whiteboard('modify', 1, left=1), whiteboard('remove', 1), whiteboard('modify', 1, left=2)])
+    assert len(sent[0]['events']) == 3, 'merged across a remove'
+    print("✅ whiteboard_modifies_coalesce")
+
+
+def check_code_deltas_concatenate_per_sender():
+    sent = batched([code('alice', 'a', 1), code('alice', 'b', 2), code('bob', 'c', 3), code('alice', 'd', 4)])
+    merged = [
+        (event['sender_channel_name'], [op['text'] for op in event['ops']], event['version'])
+        for event in sent[0]['events']
+    ]
+    assert merged == [
+        ('alice', ['a', 'b'], 2),
+        ('bob', ['c'], 3),
+        ('alice', ['d'], 4),
+    ], 'only consecutive deltas from one sender merge'
+    video = {'type': 'video_signal_message', 'data': {'type': 'candidate'}, 'sender_channel_name': 'alice'}
+    assert len(batched([video, dict(video)])[0]['events']) == 2, 'video signals must not merge'
+    print("✅ code_deltas_concatenate_per_sender")
+
+
+def check_peers_receive_batches():
+    alice = User.objects.create_user(email='alice@example.com', name='Alice', password='x')
+    bob = User.objects.create_user(email='bob@example.com', name='Bob', password='x')
+    session = Session.objects.create(user1=alice, user2=bob)
+    
+    def socket(user):
+        communicator = WebsocketCommunicator(SessionChatConsumer.as_asgi(), f'/ws/session/{session.pk}/')
+        communicator.scope['url_route'] = {'kwargs': {'session_id': str(session.pk)}}
+        communicator.scope['user'] = user
+        return communicator
+    
+    async def exchange():
+        alice_socket, bob_socket = socket(alice), socket(bob)
+        await alice_socket.connect()
+        await bob_socket.connect()
+        try:
+            await alice_socket.send_json_to({'type': 'video_signal', 'data': {'type': 'offer'}})
+            await alice_socket.send_json_to({'type': 'video_signal', 'data': {'type': 'candidate'}})
+            frame = await bob_socket.receive_json_from(timeout=5)
+            assert frame['type'] == 'batch', frame
+            assert [event['data']['type'] for event in frame['events']] == ['offer', 'candidate']
+            # The sender does not get its own signals back
+            assert await alice_socket.receive_nothing(timeout=0.3)
+        finally:
+            await alice_socket.disconnect()
+            await bob_socket.disconnect()
+    
+    with override_settings(ROOM_BATCH_TICK_MS=100):
+        asyncio.run(exchange())
+    print("✅ peers_receive_batches")
+
+
+CHECKS = [
+    check_one_frame_per_tick,
+    check_whiteboard_modifies_coalesce,
+    check_code_deltas_concatenate_per_sender,
+    check_peers_receive_batches,
+]
+
+
+def verify():
+    return run_checks("Room Event Batching", CHECKS)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
@@ -0,0 +1,112 @@
+"""
+Regression checks for the full-text search index (link_and_learn/search.py).
+
+Runs against a throwaway test database, so it never touches db.sqlite3.
+
+    python verify_search.py
+"""
+import os
+import sys
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'link_and_learn.settings')
+django.setup()
+
+from link_and_learn import search
+from link_and_learn.pagination import KeysetPaginator
+from requests_app.models import LearningRequest
+from users.models import User
+from verify_helpers import run_checks
+
+
+def make_user(name):
+    return User.objects.create_user(email=f'{name.lower().replace(" ", ".")}@example.com', name=name, password='x')
+
+
+def found(**fields):
+    users, _ = search.search_users(User.objects.all(), **fields)
+    return {user.name for user in users}
+
+
+def check_triggers_keep_index_in_sync():
+    ann = make_user('Ann Lee')
+    request = LearningRequest.objects.create(creator=ann, topic_to_learn='Guitar', topic_to_teach='Welsh')
+    assert found(any='guit') == {'Ann Lee'}, 'prefix match on a new request'
+    assert found(name='ann') == {'Ann Lee'}
+    
+    ann.name = 'Annabel Lee'
+    ann.save()
+    assert found(name='annabel') == {'Annabel Lee'}, 'renamed user not reindexed'
+    
+    request.topic_to_teach = 'Gaelic'
+    request.save()
+    assert found(teach='welsh') == set() and found(teach='gaelic') == {'Annabel Lee'}, 'edited topic not reindexed'
+    
+    request.delete()
+    assert found(any='guitar') == set(), 'deleted request still indexed'
+    ann.delete()
+    assert found(name='annabel') == set(), 'deleted user still indexed'
+    print("✅ triggers_keep_index_in_sync")
+
+
+def check_columns_and_synonyms():
+    ben, cat = make_user('Ben'), make_user('Cat')
+    LearningRequest.objects.create(creator=ben, topic_to_learn='Cooking', topic_to_teach='JavaScript')
+    LearningRequest.objects.create(creator=cat, topic_to_learn='JS', topic_to_teach='Spanish')
+    assert found(teach='js') == {'Ben'}, 'normalized topics not searched'
+    assert found(learn='javascript') == {'Cat'}, 'columns not kept apart'
+    assert found(any='js', teach='spanish') == {'Cat'}, 'fields not combined with AND'
+    print("✅ columns_and_synonyms")
+
+
+def check_name_matches_rank_first():
+    dana = make_user('Dana Rust')
+    eve = make_user('Eve')
+    LearningRequest.objects.create(creator=eve, topic_to_learn='Rust', topic_to_teach='')
+    users, ordering = search.search_users(User.objects.all(), any='rust')
+    page = KeysetPaginator(users, ordering, per_page=10).page()
+    assert [user.pk for user in page] == [dana.pk, eve.pk], 'name match should outrank a topic match'
+    print("✅ name_matches_rank_first")
+
+
+def check_query_syntax_is_escaped():
+    for text in ('"', 'NEAR(a b)', 'a OR', '*', 'name:x', '-python', "O'Brien"):
+        list(search.search_users(User.objects.all(), any=text)[0])
+    print("✅ query_syntax_is_escaped")
+
+
+def check_fallback_matches_index():
+    fred = make_user('Fred')
+    LearningRequest.objects.create(creator=fred, topic_to_learn='Piano', topic_to_teach='Chess')
+    queries = [{'any': 'piano'}, {'teach': 'chess'}, {'name': 'fred'}, {'any': 'piano', 'teach': 'chess'}]
+    indexed = [found(**query) for query in queries]
+    search._available = False
+    try:
+        assert [found(**query) for query in queries] == indexed, 'icontains fallback disagrees with the index'
+    finally:
+        search._available = None
+    print("✅ fallback_matches_index")
+
+
+CHECKS = [
+    check_triggers_keep_index_in_sync,
+    check_columns_and_synonyms,
+    check_name_matches_rank_first,
+    check_query_syntax_is_escaped,
+    check_fallback_matches_index,
+]
+
+
+def unavailable():
+    if not search.is_available():
+        return "search index not available on this database"
+    return None
+
+
+def verify():
+    return run_checks("Search Index", CHECKS, unavailable=unavailable)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
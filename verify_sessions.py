@@ -0,0 +1,208 @@
+"""
+Regression checks for teaching sessions: per-teacher timer totals, the
+server-side timer actions sent over the session socket, and the compressed
+whiteboard/IDE state kept off the Session row.
+
+Runs against a throwaway test database, so it never touches db.sqlite3.
+
+    python verify_sessions.py
+"""
+import asyncio
+import json
+import os
+import sys
+from decimal import Decimal
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'link_and_learn.settings')
+django.setup()
+
+from channels.testing import WebsocketCommunicator
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+from django.utils import timezone
+
+from chat.consumers import SessionChatConsumer
+from users.models import Session, SessionState, SessionTimer, TimerError, User
+from verify_helpers import run_checks
+
+
+def make_session():
+    alice = User.objects.create_user(email='alice@example.com', name='Alice', password='x', credits=Decimal('20.00'))
+    bob = User.objects.create_user(email='bob@example.com', name='Bob', password='x', credits=Decimal('20.00'))
+    return Session.objects.create(user1=alice, user2=bob), alice, bob
+
+
+def timer(session, teacher, seconds):
+    """A running timer that started `seconds` ago."""
+    return SessionTimer.objects.create(
+        session=session, teacher=teacher, start_time=timezone.now() - timezone.timedelta(seconds=seconds)
+    )
+
+
+def check_stopped_timers_add_to_totals():
+    session, alice, bob = make_session()
+    for teacher, seconds in ((alice, 400), (bob, 90), (alice, 250)):
+        timer(session, teacher, seconds).stop()
+    session.refresh_from_db()
+    assert session.get_teaching_totals() == {alice.pk: 650, bob.pk: 90}
+    assert (session.stored_teaching_time(alice), session.stored_teaching_time(bob)) == (650, 90), (
+        'stored totals disagree with the timers'
+    )
+    credits = session.calculate_credits()
+    assert credits['user1_spent'] == 0 and credits['user2_spent'] == 2, 'learner pays per full 5 minutes taught'
+    print("✅ stopped_timers_add_to_totals")
+
+
+def check_double_stop_counted_once():
+    session, alice, _ = make_session()
+    running = timer(session, alice, 120)
+    # Two requests each loaded the running timer
+    other = SessionTimer.objects.get(pk=running.pk)
+    running.stop()
+    other.stop()
+    session.refresh_from_db()
+    assert session.user1_teaching_seconds == 120, 'timer counted twice'
+    assert other.end_time == running.end_time
+    print("✅ double_stop_counted_once")
+
+
+def check_totals_in_one_query():
+    session, alice, bob = make_session()
+    for teacher in (alice, bob, alice, bob):
+        timer(session, teacher, 60).stop()
+    with CaptureQueriesContext(connection) as queries:
+        session.get_teaching_totals()
+    assert len(queries) == 1, f'{len(queries)} queries for teaching totals'
+    print("✅ totals_in_one_query")
+
+
+def timer_error(session, user, action):
+    try:
+        Session.apply_timer_action(session.pk, user, action)
+    except TimerError as e:
+        return str(e)
+    return None
+
+
+def check_timer_actions_follow_rules():
+    session, alice, bob = make_session()
+    outsider = User.objects.create_user(email='eve@example.com', name='Eve', password='x')
+    assert timer_error(session, outsider, 'start') == 'Unauthorized'
+    assert timer_error(session, alice, 'stop') == 'No active timer'
+    assert timer_error(session, alice, 'pause') is not None
+    
+    state = Session.apply_timer_action(session.pk, alice, 'start')
+    assert state['active_teacher_id'] == alice.pk and state['active_started_at'] <= state['server_time']
+    # Bob taking over stops Alice's timer
+    state = Session.apply_timer_action(session.pk, bob, 'start')
+    assert state['active_teacher_id'] == bob.pk
+    assert session.timers.filter(end_time__isnull=True).count() == 1
+    state = Session.apply_timer_action(session.pk, bob, 'stop')
+    assert state['active_teacher_id'] is None
+    
+    User.objects.filter(pk=bob.pk).update(credits=Decimal('0.50'))
+    assert timer_error(session, alice, 'start').startswith('Learner has insufficient credits')
+    session.end_session()
+    assert timer_error(session, bob, 'start') == 'Session ended'
+    print("✅ timer_actions_follow_rules")
+
+
+def session_socket(session, user):
+    communicator = WebsocketCommunicator(SessionChatConsumer.as_asgi(), f'/ws/session/{session.pk}/')
+    communicator.scope['url_route'] = {'kwargs': {'session_id': str(session.pk)}}
+    communicator.scope['user'] = user
+    return communicator
+
+
+def check_timer_over_socket():
+    session, alice, bob = make_session()
+    
+    async def exchange():
+        alice_socket, bob_socket = session_socket(session, alice), session_socket(session, bob)
+        await alice_socket.connect()
+        await bob_socket.connect()
+        try:
+            await alice_socket.send_json_to({'type': 'timer', 'action': 'start'})
+            for socket in (alice_socket, bob_socket):
+                update = await socket.receive_json_from(timeout=5)
+                assert update['type'] == 'timer' and update['state']['active_teacher_id'] == alice.pk, update
+            # Errors go back to the sender only
+            await bob_socket.send_json_to({'type': 'timer', 'action': 'pause'})
+            assert (await bob_socket.receive_json_from(timeout=5))['type'] == 'timer_error'
+            assert await alice_socket.receive_nothing(timeout=0.2)
+        finally:
+            await alice_socket.disconnect()
+            await bob_socket.disconnect()
+    
+    asyncio.run(exchange())
+    assert session.get_active_timer().teacher_id == alice.pk, 'timer not started on the server'
+    print("✅ timer_over_socket")
+
+
+def check_state_saved_compressed():
+    session, alice, _ = make_session()
+    client = Client()
+    client.force_login(alice)
+    board = json.dumps({'objects': [{'id': i, 'type': 'rect', 'left': 10} for i in range(200)]})
+    response = client.post(
+        f'/session/{session.pk}/save-state/',
+        json.dumps({'whiteboard': board, 'ide_code': 'print("hi")\n' * 50, 'ide_language': 'python'}),
+        content_type='application/json',
+    )
+    assert response.status_code == 200, response.status_code
+    state = SessionState.objects.get(session=session)
+    assert (state.whiteboard, state.ide_code) == (board, 'print("hi")\n' * 50)
+    assert len(bytes(state.whiteboard_data)) < len(board) // 5, 'whiteboard stored uncompressed'
+    assert Session.objects.get(pk=session.pk).ide_language == 'python'
+    # The session row itself carries no blobs
+    assert not {'whiteboard_state', 'ide_code'} & {field.name for field in Session._meta.concrete_fields}
+    assert SessionState(session=session).ide_code == SessionState.DEFAULT_IDE_CODE
+    print("✅ state_saved_compressed")
+
+
+def check_state_migration_reverses():
+    session, _, _ = make_session()
+    state = SessionState(session=session)
+    state.whiteboard = '{"objects": []}'
+    state.ide_code = 'print(1)'
+    state.save()
+    executor = MigrationExecutor(connection)
+    executor.migrate([('users', '0006_session_teaching_totals')])
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT whiteboard_state, ide_code FROM users_session WHERE id = %s', [session.pk])
+            assert cursor.fetchone() == ('{"objects": []}', 'print(1)'), 'blobs not moved back to the session row'
+    finally:
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+    state = SessionState.objects.get(session=session)
+    assert (state.whiteboard, state.ide_code) == ('{"objects": []}', 'print(1)'), 'blobs lost migrating forward'
+    print("✅ state_migration_reverses")
+
+
+CHECKS = [
+    check_stopped_timers_add_to_totals,
+    check_double_stop_counted_once,
+    check_totals_in_one_query,
+    check_timer_actions_follow_rules,
+    check_timer_over_socket,
+    check_state_saved_compressed,
+    check_state_migration_reverses,
+]
+
+
+def clear_users():
+    User.objects.all().delete()
+
+
+def verify():
+    setup_test_environment()
+    return run_checks("Sessions", CHECKS, before_each=clear_users)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
@@ -0,0 +1,107 @@
+"""
+Regression checks for the denormalized review and session counters on User.
+
+Runs against a throwaway test database, so it never touches db.sqlite3.
+
+    python verify_user_stats.py
+"""
+import io
+import os
+import sys
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'link_and_learn.settings')
+django.setup()
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from users.models import Review, Session, User
+from verify_helpers import run_checks
+
+
+def make_user(name):
+    return User.objects.create_user(email=f'{name.lower()}@example.com', name=name, password='x')
+
+
+def review(reviewer, reviewee, rating):
+    session = Session.objects.create(user1=reviewer, user2=reviewee)
+    return Review.objects.create(session=session, reviewer=reviewer, reviewee=reviewee, rating=rating)
+
+
+def stats(user):
+    user.refresh_from_db()
+    return user.review_count, user.rating_sum, user.session_count
+
+
+def check_reviews_update_counters():
+    alice, bob, carol = make_user('Alice'), make_user('Bob'), make_user('Carol')
+    first = review(alice, bob, 5)
+    review(carol, bob, 2)
+    assert stats(bob)[:2] == (2, 7)
+    assert bob.average_rating == 3.5 and bob.total_reviews == 2
+    
+    first.rating = 3
+    first.save()
+    assert stats(bob)[:2] == (2, 5), 'edited rating not counted'
+    first.delete()
+    assert stats(bob)[:2] == (1, 2), 'deleted review still counted'
+    assert stats(alice)[:2] == (0, 0) and alice.average_rating is None
+    print("✅ reviews_update_counters")
+
+
+def check_session_counted_once():
+    alice, bob = make_user('Alice'), make_user('Bob')
+    session = Session.objects.create(user1=alice, user2=bob)
+    assert session.end_session() is True
+    # A second end (e.g. a double-clicked button in another request) is a no-op
+    again = Session.objects.get(pk=session.pk)
+    assert again.end_session() is False
+    assert stats(alice)[2] == 1 and stats(bob)[2] == 1, 'ended session counted twice'
+    assert alice.total_sessions == 1
+    print("✅ session_counted_once")
+
+
+def check_properties_do_not_query():
+    alice, bob = make_user('Alice'), make_user('Bob')
+    review(alice, bob, 4)
+    bob = User.objects.get(pk=bob.pk)
+    with CaptureQueriesContext(connection) as queries:
+        bob.average_rating, bob.total_reviews, bob.total_sessions
+    assert not queries, f'{len(queries)} queries for profile stats'
+    print("✅ properties_do_not_query")
+
+
+def check_rebuild_restores_counters():
+    alice, bob, carol = make_user('Alice'), make_user('Bob'), make_user('Carol')
+    review(alice, bob, 4)
+    Session.objects.create(user1=alice, user2=carol).end_session()
+    Session.objects.create(user1=bob, user2=carol).end_session()
+    expected = {user.pk: stats(user) for user in (alice, bob, carol)}
+    
+    User.objects.update(review_count=9, rating_sum=9, session_count=9)
+    call_command('rebuild_user_stats', stdout=io.StringIO())
+    assert {user.pk: stats(user) for user in (alice, bob, carol)} == expected, 'rebuild disagrees with live counters'
+    print("✅ rebuild_restores_counters")
+
+
+CHECKS = [
+    check_reviews_update_counters,
+    check_session_counted_once,
+    check_properties_do_not_query,
+    check_rebuild_restores_counters,
+]
+
+
+def clear_users():
+    User.objects.all().delete()
+
+
+def verify():
+    return run_checks("User Stats", CHECKS, before_each=clear_users)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
@@ -0,0 +1,130 @@
+"""
+Regression checks for the whiteboard op log and snapshot compaction
+(chat/models.py WhiteboardOp/WhiteboardSnapshot).
+
+Runs against a throwaway test database, so it never touches db.sqlite3.
+
+    python verify_whiteboard.py
+"""
+import asyncio
+import json
+import os
+import random
+import sys
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'link_and_learn.settings')
+django.setup()
+
+from channels.testing import WebsocketCommunicator
+from django.test import override_settings
+
+from chat.consumers import SessionChatConsumer
+from chat.models import WhiteboardOp, WhiteboardSnapshot, apply_whiteboard_op
+from users.models import Session, SessionState, User
+from verify_helpers import run_checks
+
+
+def make_session():
+    alice = User.objects.create_user(email='alice@example.com', name='Alice', password='x')
+    bob = User.objects.create_user(email='bob@example.com', name='Bob', password='x')
+    return Session.objects.create(user1=alice, user2=bob), alice
+
+
+def random_ops(rng, count):
+    ops = []
+    for _ in range(count):
+        kind = rng.choices(('add', 'modify', 'remove', 'clear'), weights=(5, 3, 2, 0.3))[0]
+        object_id = rng.randrange(8)
+        if kind in ('add', 'modify'):
+            ops.append({'type': kind, 'object': {'id': object_id, 'left': rng.randrange(100)}})
+        elif kind == 'remove':
+            ops.append({'type': kind, 'ids': [object_id]})
+        else:
+            ops.append({'type': kind})
+    return ops
+
+
+def replay(ops, state=None):
+    state = json.loads(json.dumps(state or {'objects': []}))
+    for op in ops:
+        apply_whiteboard_op(state, op)
+    return state
+
+
+def loaded_board(session_id):
+    board = WhiteboardSnapshot.load(session_id)
+    return replay([op['data'] for op in board['ops']], board['snapshot'])
+
+
+def check_compaction_matches_replay():
+    session, _ = make_session()
+    ops = random_ops(random.Random(9), 57)
+    with override_settings(WHITEBOARD_SNAPSHOT_EVERY=10):
+        seqs = [WhiteboardOp.append(session.pk, op) for op in ops]
+    assert seqs == list(range(1, 58)), 'ops not numbered consecutively'
+    assert list(WhiteboardSnapshot.objects.filter(session=session).values_list('seq', flat=True)) == [50]
+    assert list(WhiteboardOp.objects.filter(session=session).values_list('seq', flat=True)) == list(range(51, 58)), (
+        'compacted ops not pruned'
+    )
+    assert loaded_board(session.pk) == replay(ops), 'snapshot plus ops differs from a full replay'
+    print("✅ compaction_matches_replay")
+
+
+def check_legacy_board_seeds_first_snapshot():
+    session, _ = make_session()
+    legacy = {'objects': [{'id': 'old', 'left': 1}], 'background': 'white'}
+    state = SessionState(session=session)
+    state.whiteboard = json.dumps(legacy)
+    state.save()
+    ops = [{'type': 'add', 'object': {'id': 'new'}}, {'type': 'modify', 'object': {'id': 'old', 'left': 2}}]
+    for op in ops:
+        WhiteboardOp.append(session.pk, op)
+    WhiteboardSnapshot.compact(session.pk)
+    assert loaded_board(session.pk) == replay(ops, legacy), 'old autosaved board lost'
+    print("✅ legacy_board_seeds_first_snapshot")
+
+
+def check_sync_sends_missed_ops_or_snapshot():
+    session, alice = make_session()
+    with override_settings(WHITEBOARD_SNAPSHOT_EVERY=5):
+        for op in random_ops(random.Random(3), 7):
+            WhiteboardOp.append(session.pk, op)
+    
+    async def sync(since):
+        socket = WebsocketCommunicator(SessionChatConsumer.as_asgi(), f'/ws/session/{session.pk}/')
+        socket.scope['url_route'] = {'kwargs': {'session_id': str(session.pk)}}
+        socket.scope['user'] = alice
+        await socket.connect()
+        try:
+            await socket.send_json_to({'type': 'whiteboard_sync', 'since': since})
+            return await socket.receive_json_from(timeout=5)
+        finally:
+            await socket.disconnect()
+    
+    recent = asyncio.run(sync(6))
+    assert recent['snapshot'] is None and [op['seq'] for op in recent['ops']] == [7], 'caught-up client gets ops only'
+    behind = asyncio.run(sync(2))
+    assert behind['seq'] == 5 and behind['snapshot'] is not None, 'client behind the snapshot gets the snapshot'
+    assert [op['seq'] for op in behind['ops']] == [6, 7]
+    print("✅ sync_sends_missed_ops_or_snapshot")
+
+
+CHECKS = [
+    check_compaction_matches_replay,
+    check_legacy_board_seeds_first_snapshot,
+    check_sync_sends_missed_ops_or_snapshot,
+]
+
+
+def clear_users():
+    User.objects.all().delete()
+
+
+def verify():
+    return run_checks("Whiteboard Op Log", CHECKS, before_each=clear_users)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)